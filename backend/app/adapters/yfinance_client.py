@@ -1,7 +1,6 @@
 import logging
 import warnings
 import pandas as pd
-import yfinance as yf
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +31,10 @@ class YFinanceClient:
         Returns:
             pd.DataFrame: Cleaned and normalized market data.
         """
+        # Imported on first fetch: yfinance (and its HTTP stack) is slow to load
+        # and most requests only read local datasets
+        import yfinance as yf
+
         try:
             logger.info(f"Ingesting market data for {ticker} via Yahoo Finance API")
             
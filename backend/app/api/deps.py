@@ -0,0 +1,65 @@
+# app/api/deps.py
+"""
+Process-wide services for the API, built on first use and injected into
+endpoints with FastAPI's Depends (tests swap them via
+app.dependency_overrides).
+
+Importing this module is cheap: pandas, the dataset catalog and the HMM
+engine are only imported when a getter first runs, so `import app.main`
+and worker restarts do not pay for them. warm_up() runs every getter
+ahead of the first request when WARMUP_ON_STARTUP is set.
+"""
+import functools
+import threading
+
+
+def singleton(build):
+    """Cache build()'s result; concurrent first calls construct it only once"""
+    lock = threading.Lock()
+    instance = []
+
+    @functools.wraps(build)
+    def get():
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(build())
+        return instance[0]
+
+    return get
+
+
+@singleton
+def get_data_service():
+    from app.services.data_service import DataService
+    return DataService()
+
+
+@singleton
+def get_pipeline_executor():
+    from app.services.executor import PipelineExecutor
+    return PipelineExecutor()
+
+
+@singleton
+def get_signature_index():
+    from app.engine.signature_index import SignatureIndex
+    return SignatureIndex()
+
+
+@singleton
+def get_regime_breadth():
+    from app.engine.breadth import RegimeBreadth
+    return RegimeBreadth()
+
+
+@singleton
+def get_timeline_store():
+    from app.services.timeline_store import RegimeTimelineStore
+    return RegimeTimelineStore(get_data_service().data_dir)
+
+
+def warm_up():
+    """Build the services and start the pipeline workers (blocking; run in a thread)"""
+    get_data_service()
+    get_pipeline_executor().warm_up()
@@ -1,23 +1,45 @@
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException
-from app.services.data_service import DataService
-from app.services.pipeline_service import PipelineService
-from app.schemas.request import FetchRequest, AnalyzeRequest
-from app.schemas.response import MessageResponse, AnalysisResponse
-from app.engine.walk_forward import walk_forward_validation
-from app.engine.features import HMMPreprocessor
+import os
+from collections import deque
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from app.core.config import settings
+from app.api.deps import (
+    singleton, get_data_service, get_pipeline_executor,
+    get_signature_index, get_regime_breadth, get_timeline_store,
+)
+from app.schemas.request import (
+    FetchRequest, AnalyzeRequest, BacktestRequest, PanelAnalyzeRequest, PanelFeatureRequest, RollingRegimeRequest,
+    BreadthRequest, BootstrapRequest,
+)
+from app.schemas.response import (
+    MessageResponse, AnalysisResponse, BacktestResponse, PanelAnalysisResponse, RollingRegimeResponse,
+    BootstrapResponse,
+)
+from app.services.executor import (
+    OverloadedError, ExecutionTimeout,
+    run_analysis_task, run_walk_forward_task, run_backtest_task, run_panel_task,
+    run_bootstrap_task, run_panel_features_task, run_profiled_task,
+)
+from app.services.single_flight import SingleFlight, analysis_key
+from app.services.result_cache import ResultCache
+from app.services.scheduler import PrecomputeScheduler
 
 # Initialize logger for this module
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-# Dependency Injection is recommended here, but simple instantiation works for now
-data_service = DataService()
-pipeline_service = PipelineService()
+# Services come from app.api.deps (built on first use); CPU-bound pipeline
+# work (EM fits, walk-forward) runs off the event loop in the pipeline pool
+analysis_flights = SingleFlight("analyze")
+analysis_cache = ResultCache()
+# Refit decisions made by the pipeline workers, newest last
+refit_decisions = deque(maxlen=500)
 
 @router.post("/fetch", response_model=MessageResponse)
-def fetch_market_data(req: FetchRequest):
+def fetch_market_data(req: FetchRequest, data_service=Depends(get_data_service)):
     """
     Endpoint to fetch market data from external API (FMP) and save to local storage.
     Note: Using standard 'def' because underlying 'requests' library is synchronous.
@@ -40,7 +62,7 @@ def fetch_market_data(req: FetchRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/files")
-def list_data_files():
+def list_data_files(data_service=Depends(get_data_service)):
     """
     List all available datasets in the storage directory.
     """
@@ -52,48 +74,396 @@ def list_data_files():
         logger.error(f"❌ [Files] Error listing files: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Could not list files")
 
+@router.get("/catalog")
+def dataset_catalog(ticker: str = None, start_date: str = None, end_date: str = None,  # pyright: ignore[reportArgumentType]
+                    data_service=Depends(get_data_service)):
+    """
+    Catalog metadata (actual date range, rows, content hash, last analysis)
+    for the datasets of a ticker that cover [start_date, end_date].
+    """
+    try:
+        catalog = data_service.catalog
+        datasets = catalog.find(ticker=ticker, start_date=start_date, end_date=end_date)
+        for row in datasets:
+            row['last_analysis'] = catalog.last_analysis(row['filename'])
+        return {"datasets": datasets}
+    except Exception as e:
+        logger.error(f"❌ [Catalog] Error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _absorb_refit_decision(result: dict):
+    """Pipeline workers run in other processes; keep their refit decisions auditable here"""
+    decision = result.get('refit_decision')
+    if decision is not None:
+        refit_decisions.append(decision)
+
+async def _run_analysis(key: str, filename: str, time_budget: float, feature_set) -> dict:
+    result = await get_pipeline_executor().run(run_analysis_task, filename, None, time_budget, feature_set)
+    _absorb_refit_decision(result)
+    analysis_cache.put(key, result)
+    _index_analysis(result)
+    return result
+
+def _index_analysis(result: dict):
+    """
+    Keep the cross-ticker views (similarity index, breadth) current with
+    every fresh model; never fails the analysis itself.
+    """
+    try:
+        from app.services.regime_analytics import signature_from_analysis
+        ticker, layout, vector, meta = signature_from_analysis(result)
+        get_signature_index().upsert(ticker, layout, vector, meta)
+        get_regime_breadth().update(ticker, meta['current_probabilities'],
+                                    result['prediction']['state_probabilities'],
+                                    {'filename': result['filename'], 'current_regime': result['current_regime']})
+    except Exception as e:
+        logger.warning(f"⚠️ Cross-ticker indexes not updated for {result.get('filename')}: {e}")
+
+async def analyze_cached(filename: str, time_budget: float = None, feature_set=None) -> dict:  # pyright: ignore[reportArgumentType]
+    """
+    /analyze result for the current content of `filename`: served from the
+    response cache when precomputed, otherwise computed once for all
+    identical concurrent callers (same data, same parameters).
+    """
+    # Off the event loop: a stat() per call, but a full-file hash when the
+    # dataset is new or changed (and the catalog is built on first use)
+    content_hash = await asyncio.to_thread(lambda: get_data_service().catalog.content_hash(filename))
+    key = analysis_key(content_hash, filename, time_budget=time_budget, feature_set=feature_set)
+    cached = analysis_cache.get(key)
+    if cached is not None:
+        return cached
+    return await analysis_flights.run(
+        key, lambda: _run_analysis(key, filename, time_budget, feature_set)
+    )
+
+async def _run_profiled(token: str, label: str, mode: str, task, *args) -> dict:
+    """
+    One pipeline task under the profiler (?profile=true). Always computed:
+    the response cache and request coalescing are bypassed, and the
+    profile summary is returned under 'profile'.
+    """
+    from app.services.profiling import authorize, check_mode
+    authorize(token)
+    check_mode(mode)
+    out = await get_pipeline_executor().run(run_profiled_task, label, mode, task, *args)
+    return {**out['result'], 'profile': out['profile']}
+
+@singleton
+def get_precompute_scheduler() -> PrecomputeScheduler:
+    """Refreshes TRACKED_TICKERS through the same path; started by the app's lifespan"""
+    return PrecomputeScheduler(get_data_service(), analyze_cached)
+
+def _overload_http_error(e: Exception) -> HTTPException:
+    if isinstance(e, OverloadedError):
+        return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return HTTPException(status_code=503, detail=str(e))
+
 @router.post("/analyze", response_model=AnalysisResponse)
-def analyze_regime(req: AnalyzeRequest):
+async def analyze_regime(req: AnalyzeRequest, profile: bool = False, profile_mode: str = "sampling",
+                         x_profile_token: str = Header(None)):  # pyright: ignore[reportArgumentType]
     """
     Trigger the analysis pipeline (Hidden Markov Model) on a specific file.
+    Runs in the pipeline pool; 429 when the pool is saturated, 503 on timeout.
+    ?profile=true (with the X-Profile-Token header) profiles this run.
     """
     logger.info(f"📊 [Analyze] Request received for file: {req.filename}")
     
     try:
         # Run the pipeline logic
-        result = pipeline_service.run_analysis_on_file(req.filename)
+        time_budget = req.latency_budget_ms / 1000 if req.latency_budget_ms else None
+        if profile:
+            result = await _run_profiled(x_profile_token, f"analyze_{req.filename}", profile_mode,
+                                         run_analysis_task, req.filename, None, time_budget, req.feature_set)
+            _absorb_refit_decision(result)
+            _index_analysis(result)
+        else:
+            result = await analyze_cached(req.filename, time_budget, req.feature_set)
         logger.info("✅ [Analyze] Analysis completed successfully.")
         return result
     
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except (OverloadedError, ExecutionTimeout) as e:
+        logger.warning(f"⚠️ [Analyze] {e}")
+        raise _overload_http_error(e)
     except Exception as e:
         logger.error(f"❌ [Analyze] Error during analysis: {str(e)}", exc_info=True)
         raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/analyze/rolling", response_model=RollingRegimeResponse)
+async def analyze_rolling(req: RollingRegimeRequest):
+    """
+    Rolling persistence, empirical transition matrices and per-regime
+    return/volatility over the fitted analysis of a file (the same cached
+    result /analyze serves), every `step` bars over `window`-bar windows.
+    """
+    try:
+        time_budget = req.latency_budget_ms / 1000 if req.latency_budget_ms else None
+        analysis = await analyze_cached(req.filename, time_budget, req.feature_set)
+        # numpy-backed; imported on first use like the other heavy services
+        from app.services.regime_analytics import rolling_analytics
+        return await asyncio.to_thread(rolling_analytics, analysis, req.window, req.step)
+
+    except (OverloadedError, ExecutionTimeout) as e:
+        logger.warning(f"⚠️ [Rolling] {e}")
+        raise _overload_http_error(e)
+    except Exception as e:
+        logger.error(f"❌ [Rolling] Error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/analyze/bootstrap", response_model=BootstrapResponse)
+async def analyze_bootstrap(req: BootstrapRequest, pipeline_executor=Depends(get_pipeline_executor)):
+    """
+    Confidence intervals for transition probabilities, expected regime
+    durations and state means: stationary block bootstrap of the training
+    window, each replicate refit (warm-started from the fitted model) in
+    the pipeline worker (or its BOOTSTRAP_WORKERS pool) within `time_budget_s`.
+    """
+    logger.info(f"📊 [Bootstrap] Request received for file: {req.filename}")
+
+    try:
+        time_budget = req.time_budget_s or settings.BOOTSTRAP_TIME_BUDGET_S
+        result = await pipeline_executor.run(
+            run_bootstrap_task, req.filename, req.n_states, req.n_replicates, req.mean_block,
+            req.confidence, time_budget, req.feature_set,
+            # The base fit and aggregation come on top of the replicate budget
+            timeout=pipeline_executor.timeout + time_budget,
+            # The replicate pool counts against admission like other requests
+            slots=1 + settings.BOOTSTRAP_WORKERS,
+        )
+        logger.info(f"✅ [Bootstrap] {result['n_completed']}/{result['n_requested']} replicates")
+        return result
+
+    except (OverloadedError, ExecutionTimeout) as e:
+        logger.warning(f"⚠️ [Bootstrap] {e}")
+        raise _overload_http_error(e)
+    except Exception as e:
+        logger.error(f"❌ [Bootstrap] Error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/analyze/panel", response_model=PanelAnalysisResponse)
+async def analyze_panel(req: PanelAnalyzeRequest, pipeline_executor=Depends(get_pipeline_executor)):
+    """
+    Train one HMM on several tickers (pooled EM over per-ticker sequences)
+    and decode every ticker with the shared regime definitions.
+    """
+    logger.info(f"📊 [Panel] Request received for {len(req.filenames)} files: {req.filenames}")
+
+    try:
+        result = await pipeline_executor.run(run_panel_task, req.filenames, req.n_states, req.scaling)
+        logger.info("✅ [Panel] Analysis completed successfully.")
+        return result
+
+    except (OverloadedError, ExecutionTimeout) as e:
+        logger.warning(f"⚠️ [Panel] {e}")
+        raise _overload_http_error(e)
+    except Exception as e:
+        logger.error(f"❌ [Panel] Error during analysis: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
 @router.get("/")
 def market_root():
     return {"message": "Market router is alive"}
 @router.post("/validate")
-def validate_walk_forward(req: AnalyzeRequest):
+async def validate_walk_forward(req: AnalyzeRequest, profile: bool = False, profile_mode: str = "sampling",
+                                x_profile_token: str = Header(None),  # pyright: ignore[reportArgumentType]
+                                pipeline_executor=Depends(get_pipeline_executor)):
     """
     Run walk-forward validation on a dataset.
     Returns BIC stability and regime distribution across folds.
+    ?profile=true (with the X-Profile-Token header) profiles this run.
     """
     try:
-        df_raw = data_service.load_dataset(req.filename)
-        # ⚠️ DO NOT truncate here — pass the full data
-        prep_result = HMMPreprocessor.csv_to_features(df_raw)
-        df = prep_result['df']
-        feature_cols = prep_result['feature_cols']
-
-        summary = walk_forward_validation(
-            df=df,
-            feature_cols=feature_cols,
-            n_states=3,
-            train_size=500,
-            test_size=60,
-            step_size=60,
-            expanding=True,
-        )
-        return summary
+        time_budget = req.latency_budget_ms / 1000 if req.latency_budget_ms else None
+        if profile:
+            return await _run_profiled(x_profile_token, f"validate_{req.filename}", profile_mode,
+                                       run_walk_forward_task, req.filename, req.feature_set, time_budget)
+        return await pipeline_executor.run(run_walk_forward_task, req.filename, req.feature_set, time_budget)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except (OverloadedError, ExecutionTimeout) as e:
+        logger.warning(f"⚠️ Walk-forward: {e}")
+        raise _overload_http_error(e)
     except Exception as e:
         logger.error(f"❌ Walk-forward error: {str(e)}", exc_info=True)
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/backtest", response_model=BacktestResponse)
+async def backtest_regime_rules(req: BacktestRequest, pipeline_executor=Depends(get_pipeline_executor)):
+    """
+    Backtest regime-conditioned allocation rules on the walk-forward
+    out-of-sample regimes (positions lag the regime by one bar).
+    """
+    try:
+        return await pipeline_executor.run(run_backtest_task, req.filename, req.rules, req.cost_bps)
+    except (OverloadedError, ExecutionTimeout) as e:
+        logger.warning(f"⚠️ Backtest: {e}")
+        raise _overload_http_error(e)
+    except Exception as e:
+        logger.error(f"❌ Backtest error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/profiles")
+def list_profiles(x_profile_token: str = Header(None)):  # pyright: ignore[reportArgumentType]
+    """Summaries of stored request profiles (?profile=true), newest first"""
+    from app.services import profiling
+    try:
+        profiling.authorize(x_profile_token)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    return {"profiles": profiling.list_profiles()}
+
+@router.get("/profiles/{profile_id}")
+def download_profile(profile_id: str, x_profile_token: str = Header(None)):  # pyright: ignore[reportArgumentType]
+    """
+    A stored profile: collapsed stacks (text, one "frame;frame;... count"
+    per line, for flamegraph.pl / speedscope) or a cProfile .pstats dump.
+    """
+    from app.services import profiling
+    try:
+        profiling.authorize(x_profile_token)
+        path = profiling.profile_file(profile_id)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    media_type = "text/plain" if path.endswith(".collapsed") else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
+
+@router.get("/pipeline-status")
+def pipeline_status(pipeline_executor=Depends(get_pipeline_executor)):
+    """
+    Pipeline pool load, admission counters (accepted / rejected / timed out)
+    and how many /analyze computations were saved by request coalescing
+    or served from the precomputed response cache.
+    """
+    return {**pipeline_executor.status(), "coalescing": analysis_flights.status(),
+            "cache": analysis_cache.status()}
+
+@router.get("/precompute/runs")
+def precompute_runs(ticker: str = None, limit: int = 100,  # pyright: ignore[reportArgumentType]
+                    data_service=Depends(get_data_service),
+                    precompute_scheduler=Depends(get_precompute_scheduler)):
+    """
+    Scheduler state and the most recent precompute runs (status, duration),
+    newest first.
+    """
+    return {"scheduler": precompute_scheduler.status(),
+            "runs": data_service.catalog.runs(ticker=ticker, limit=limit)}
+
+@router.post("/precompute/run")
+async def precompute_now(precompute_scheduler=Depends(get_precompute_scheduler)):
+    """
+    Run one precompute cycle over TRACKED_TICKERS immediately.
+    """
+    if not precompute_scheduler.tickers:
+        raise HTTPException(status_code=400, detail="No TRACKED_TICKERS configured")
+    return await precompute_scheduler.run_cycle()
+
+@router.get("/similar")
+def similar_regimes(ticker: str, k: int = 10, signature_index=Depends(get_signature_index)):
+    """
+    Tickers whose current regime signature (filtered state probabilities,
+    state means/covariances, transition rows) is closest to `ticker`'s.
+    Covers every ticker analyzed since startup (or kept warm by the
+    precompute scheduler) with the same number of states and features.
+    """
+    try:
+        entry = signature_index.get(ticker)
+        if entry is None:
+            raise ValueError(f"{ticker} has no indexed analysis yet; run /analyze on one of its files")
+        neighbours = signature_index.query_key(ticker, k=k)
+        return {
+            "ticker": ticker,
+            **entry['meta'],
+            "neighbours": [{"ticker": key, "distance": distance, **meta}
+                           for key, distance, meta in neighbours],
+            "index": signature_index.status(),
+        }
+    except Exception as e:
+        logger.error(f"❌ Similarity error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/breadth")
+def regime_breadth(regime_breadth=Depends(get_regime_breadth)):
+    """
+    Share of the analyzed universe in each regime now and at t+1
+    (probability-weighted and by most likely regime), equal-weighted.
+    Maintained incrementally as tickers are analyzed or precomputed.
+    """
+    return {**regime_breadth.aggregate(), "universe": regime_breadth.status()}
+
+@router.post("/breadth")
+def regime_breadth_weighted(req: BreadthRequest, regime_breadth=Depends(get_regime_breadth)):
+    """
+    Breadth with per-ticker weights (e.g. market caps), per-group
+    summaries (e.g. sectors) and/or a restricted universe.
+    """
+    try:
+        return {**regime_breadth.aggregate(weights=req.weights, groups=req.groups, tickers=req.tickers),
+                "universe": regime_breadth.status()}
+    except Exception as e:
+        logger.error(f"❌ Breadth error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/timeline")
+def list_timelines(timeline_store=Depends(get_timeline_store)):
+    """
+    Tickers with a stored regime timeline (written by every /analyze).
+    """
+    return {"tickers": timeline_store.tickers()}
+
+@router.get("/timeline/{ticker}")
+def regime_timeline(ticker: str, start_date: str = None, end_date: str = None,  # pyright: ignore[reportArgumentType]
+                    daily: bool = False, timeline_store=Depends(get_timeline_store)):
+    """
+    Stored regime path of a ticker within [start_date, end_date] as
+    run-length segments, plus per-bar rows when daily=true.
+    """
+    try:
+        result = {**timeline_store.summary(ticker),
+                  "segments": timeline_store.segments(ticker, start_date, end_date)}
+        if daily:
+            result["history"] = timeline_store.history(ticker, start_date, end_date)
+        return result
+    except Exception as e:
+        logger.error(f"❌ Timeline error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/timeline/{ticker}/at")
+def regime_at(ticker: str, date: str, timeline_store=Depends(get_timeline_store)):
+    """
+    Regime of a ticker as of `date` (last stored bar on or before it),
+    with its state probabilities and the segment it belongs to.
+    """
+    try:
+        return timeline_store.at(ticker, date)
+    except Exception as e:
+        logger.error(f"❌ Timeline lookup error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/refit-log")
+def refit_audit_log(limit: int = 100):
+    """
+    Most recent refit-policy decisions (refit vs reuse, with reasons).
+    """
+    decisions = list(refit_decisions)
+    return {"decisions": decisions[-limit:][::-1]}
+
+@router.post("/features/panel")
+async def panel_features(req: PanelFeatureRequest, pipeline_executor=Depends(get_pipeline_executor)):
+    """
+    Build (or reuse from the worker's cache) the date-aligned multi-ticker
+    feature tensor. Returns its layout, per-ticker coverage and each
+    ticker's latest valid feature row.
+    """
+    try:
+        return await pipeline_executor.run(
+            run_panel_features_task, req.filenames, req.calendar, req.max_ffill,
+            req.vol_window, req.benchmark,
+        )
+    except (OverloadedError, ExecutionTimeout) as e:
+        logger.warning(f"⚠️ Panel features: {e}")
+        raise _overload_http_error(e)
+    except Exception as e:
+        logger.error(f"❌ Panel features error: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=400, detail=str(e))
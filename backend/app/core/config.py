@@ -1,5 +1,4 @@
 import os
-import logging
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
 
@@ -28,6 +27,60 @@ class Settings(BaseSettings):
         alias="DATA_DIR"
     )
     
+    # --- Execution / Admission Control ---
+    # CPU-bound pipeline work runs in a separate pool so the event loop and
+    # light endpoints stay responsive. "process" (default) or "thread".
+    pipeline_executor: str = Field(default="process", alias="PIPELINE_EXECUTOR")
+    # Requests running at once, and how many more may wait before new
+    # ones are turned away with 429
+    pipeline_workers: int = Field(default=2, alias="PIPELINE_WORKERS")
+    pipeline_queue_size: int = Field(default=8, alias="PIPELINE_QUEUE_SIZE")
+    # Seconds a request may wait + run before it is answered with 503
+    pipeline_timeout_s: float = Field(default=120.0, alias="PIPELINE_TIMEOUT_S")
+    
+    # --- Precomputation ---
+    # Comma-separated tickers whose newest dataset is analyzed in the background
+    # ("AAPL,NVDA,^GSPC"); empty disables the scheduler
+    tracked_tickers: str = Field(default="", alias="TRACKED_TICKERS")
+    precompute_interval_s: float = Field(default=6 * 3600, alias="PRECOMPUTE_INTERVAL_S")
+    # Tickers processed concurrently by the scheduler (leaves pool room for users)
+    precompute_workers: int = Field(default=1, alias="PRECOMPUTE_WORKERS")
+    precompute_history_days: int = Field(default=3650, alias="PRECOMPUTE_HISTORY_DAYS")
+    # Finished /analyze responses kept for identical (data, parameters) requests
+    analysis_cache_size: int = Field(default=64, alias="ANALYSIS_CACHE_SIZE")
+
+    # --- Walk-forward ---
+    # Finished folds kept in DATA_DIR/fold_cache.sqlite3 (reused across
+    # reruns, checkpoint for interrupted validations)
+    fold_cache_max_entries: int = Field(default=50_000, alias="FOLD_CACHE_MAX_ENTRIES")
+
+    # --- Bootstrap ---
+    # Processes refitting bootstrap replicates, a pool inside each pipeline
+    # worker. A bootstrap request holds 1 + N admission slots of the
+    # PIPELINE_WORKERS + PIPELINE_QUEUE_SIZE capacity; 0 = refit in the
+    # pipeline worker itself
+    bootstrap_workers: int = Field(default=2, alias="BOOTSTRAP_WORKERS")
+    # Seconds a /analyze/bootstrap run may spend on replicates
+    bootstrap_time_budget_s: float = Field(default=60.0, alias="BOOTSTRAP_TIME_BUDGET_S")
+
+    # --- Regime timelines ---
+    # Posterior probabilities in DATA_DIR/timelines: "float16" or "float32"
+    timeline_posterior_dtype: str = Field(default="float16", alias="TIMELINE_POSTERIOR_DTYPE")
+
+    # --- Profiling ---
+    # Shared secret for ?profile=true on /analyze and /validate (sent as the
+    # X-Profile-Token header); empty disables profiling altogether
+    profiling_token: str = Field(default="", alias="PROFILING_TOKEN")
+    # Stack sampling period of the "sampling" profiler in milliseconds
+    profile_sample_interval_ms: float = Field(default=5.0, alias="PROFILE_SAMPLE_INTERVAL_MS")
+    # Profiles kept in DATA_DIR/profiles (oldest removed first)
+    profile_max_stored: int = Field(default=50, alias="PROFILE_MAX_STORED")
+
+    # --- Startup ---
+    # Build services and start pipeline workers in the background right
+    # after startup instead of on the first request
+    warmup_on_startup: bool = Field(default=False, alias="WARMUP_ON_STARTUP")
+    
     @property
     def FMP_API_KEY(self) -> str:
         """Accessor for the Financial Modeling Prep API Key."""
@@ -38,14 +91,94 @@ class Settings(BaseSettings):
         """Provides the absolute path for the centralized data storage directory."""
         return self.data_dir
 
+    @property
+    def PIPELINE_EXECUTOR(self) -> str:
+        """Pool type for pipeline work: 'process' or 'thread'."""
+        return self.pipeline_executor
+
+    @property
+    def PIPELINE_WORKERS(self) -> int:
+        """Maximum concurrently running pipeline requests."""
+        return self.pipeline_workers
+
+    @property
+    def PIPELINE_QUEUE_SIZE(self) -> int:
+        """Maximum pipeline requests waiting for a worker."""
+        return self.pipeline_queue_size
+
+    @property
+    def PIPELINE_TIMEOUT_S(self) -> float:
+        """Per-request deadline (queueing + execution) in seconds."""
+        return self.pipeline_timeout_s
+
+    @property
+    def TRACKED_TICKERS(self) -> list:
+        """Tickers kept warm by the precompute scheduler."""
+        return [t.strip() for t in self.tracked_tickers.split(',') if t.strip()]
+
+    @property
+    def PRECOMPUTE_INTERVAL_S(self) -> float:
+        """Seconds between precompute cycles."""
+        return self.precompute_interval_s
+
+    @property
+    def PRECOMPUTE_WORKERS(self) -> int:
+        """Concurrent tickers per precompute cycle."""
+        return self.precompute_workers
+
+    @property
+    def PRECOMPUTE_HISTORY_DAYS(self) -> int:
+        """Calendar days of history fetched per tracked ticker."""
+        return self.precompute_history_days
+
+    @property
+    def ANALYSIS_CACHE_SIZE(self) -> int:
+        """Maximum cached /analyze responses."""
+        return self.analysis_cache_size
+
+    @property
+    def FOLD_CACHE_MAX_ENTRIES(self) -> int:
+        """Walk-forward folds kept in the persistent fold cache."""
+        return self.fold_cache_max_entries
+
+    @property
+    def BOOTSTRAP_WORKERS(self) -> int:
+        """Processes in each pipeline worker's bootstrap pool (0 = refit in-process)."""
+        return self.bootstrap_workers
+
+    @property
+    def BOOTSTRAP_TIME_BUDGET_S(self) -> float:
+        """Default time budget of a bootstrap run in seconds."""
+        return self.bootstrap_time_budget_s
+
+    @property
+    def TIMELINE_POSTERIOR_DTYPE(self) -> str:
+        """Storage dtype of timeline posteriors."""
+        if self.timeline_posterior_dtype not in ("float16", "float32"):
+            raise ValueError(f"TIMELINE_POSTERIOR_DTYPE must be 'float16' or 'float32', "
+                             f"got '{self.timeline_posterior_dtype}'")
+        return self.timeline_posterior_dtype
+
+    @property
+    def PROFILING_TOKEN(self) -> str:
+        """Token required to profile a request ('' = profiling disabled)."""
+        return self.profiling_token
+
+    @property
+    def PROFILE_SAMPLE_INTERVAL_MS(self) -> float:
+        """Sampling profiler period in milliseconds."""
+        return self.profile_sample_interval_ms
+
+    @property
+    def PROFILE_MAX_STORED(self) -> int:
+        """Number of stored profiles kept on disk."""
+        return self.profile_max_stored
+
+    @property
+    def WARMUP_ON_STARTUP(self) -> bool:
+        """Background warm-up of services and pipeline workers at startup."""
+        return self.warmup_on_startup
+
 # Singleton instance initialized with environment variables
+# (no filesystem side effects: DataService creates DATA_DIR when first built)
 settings = Settings()
-
-# --- Bootstrapping Logic ---
-# Ensures the requisite storage infrastructure is available upon application startup
-if not os.path.exists(settings.data_dir):
-    try:
-        os.makedirs(settings.data_dir, exist_ok=True)
-        logging.info(f"System: Initialized storage directory at {settings.data_dir}")
-    except Exception as e:
-        logging.critical(f"System: Critical failure during directory initialization: {e}")
\ No newline at end of file
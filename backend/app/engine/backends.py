@@ -0,0 +1,389 @@
+# app/engine/backends.py
+"""
+Inference backends for RegimeDetector.
+
+A backend runs the HMM hot loops — EM fitting, scoring, forward filtering,
+smoothing (posteriors) and Viterbi decoding — against the parameters held
+by a hmmlearn GaussianHMM (startprob_, transmat_, means_, covars_). The
+GaussianHMM stays the single parameter container, so everything built on
+RegimeDetector works the same whichever backend produced the numbers.
+
+- HmmlearnBackend: hmmlearn's Cython recursions (default).
+- NumpyBackend: log-space recursions over a (sequences × time × states)
+  tensor, so N equal-length windows / tickers run in one vectorized call.
+  Structural zeros in transmat_ (banded / sparse regimes, which EM keeps
+  at zero) turn each recursion step from O(K²) into O(K·W), W being the
+  most predecessors any state has.
+
+Every method accepts X as (T, d) or (N, T, d); outputs keep the same
+leading batch axis.
+
+Precision: float32 features stay float32 through the NumpyBackend emission
+evaluation (the (N, T, K, d) Mahalanobis tensor and the (N, T, K) log
+densities), while the forward/backward/Viterbi recursions and all sums of
+log-probabilities accumulate in float64. hmmlearn casts to float64 at its
+own boundary.
+"""
+import logging
+from abc import ABC, abstractmethod
+import numpy as np
+from hmmlearn import _hmmc
+from scipy.special import logsumexp
+
+logger = logging.getLogger(__name__)
+
+LOG_FLOOR = 1e-300
+# N·K² below which a recursion step is cheaper as a dense broadcast than
+# as a sparse gather (fancy indexing has a fixed per-step cost)
+SPARSE_MIN_WORK = 4096
+
+
+def _as_float(X) -> np.ndarray:
+    """float32 input stays float32, anything else becomes float64"""
+    X = np.asarray(X)
+    return X if X.dtype == np.float32 else X.astype(np.float64, copy=False)
+
+
+def _as_batch(X: np.ndarray) -> tuple:
+    """(T, d) → (1, T, d); returns (batch, was_single)"""
+    X = _as_float(X)
+    if X.ndim == 2:
+        return X[None], True
+    if X.ndim != 3:
+        raise ValueError(f"Expected (T, d) or (N, T, d) features, got shape {X.shape}")
+    return X, False
+
+
+def _unbatch(arr: np.ndarray, single: bool):
+    return arr[0] if single else arr
+
+
+def _logsumexp(a: np.ndarray, axis: int) -> np.ndarray:
+    """Max-shifted log-sum-exp without scipy's per-call overhead (hot loop)"""
+    peak = a.max(axis=axis, keepdims=True)
+    peak = np.where(np.isfinite(peak), peak, 0.0)
+    with np.errstate(divide="ignore"):
+        return np.log(np.exp(a - peak).sum(axis=axis)) + np.squeeze(peak, axis=axis)
+
+
+class HMMBackend(ABC):
+    """Interface: EM fit + score / forward filter / posteriors / Viterbi"""
+
+    name = "base"
+
+    @abstractmethod
+    def fit(self, model, X: np.ndarray, lengths=None):
+        """Run EM in place on `model`, reporting to model.monitor_"""
+
+    @abstractmethod
+    def log_emissions(self, model, X: np.ndarray) -> np.ndarray:
+        """Per-state log p(x_t | s_t)"""
+
+    @abstractmethod
+    def score(self, model, X: np.ndarray):
+        """log P(X) per sequence"""
+
+    @abstractmethod
+    def forward_filter(self, model, X: np.ndarray) -> tuple:
+        """(log P(s_t | x_1..t), log p(x_t | x_<t))"""
+
+    @abstractmethod
+    def posteriors(self, model, X: np.ndarray) -> np.ndarray:
+        """Smoothed P(s_t | x_1..T)"""
+
+    @abstractmethod
+    def decode(self, model, X: np.ndarray) -> np.ndarray:
+        """Viterbi state path"""
+
+
+class HmmlearnBackend(HMMBackend):
+    """hmmlearn's compiled recursions; batches are looped one sequence at a time"""
+
+    name = "hmmlearn"
+
+    def fit(self, model, X, lengths=None):
+        X, single = _as_batch(X)
+        if single:
+            model.fit(X[0], lengths)
+        else:
+            model.fit(X.reshape(-1, X.shape[-1]), [X.shape[1]] * X.shape[0])
+
+    def log_emissions(self, model, X):
+        X, single = _as_batch(X)
+        return _unbatch(np.stack([model._compute_log_likelihood(x) for x in X]), single)
+
+    def score(self, model, X):
+        X, single = _as_batch(X)
+        return _unbatch(np.array([model.score(x) for x in X]), single)
+
+    def forward_filter(self, model, X):
+        X, single = _as_batch(X)
+        filtered, norms = [], []
+        for x in X:
+            _, fwdlattice = _hmmc.forward_log(model.startprob_, model.transmat_,
+                                              model._compute_log_likelihood(x))
+            cumulative = logsumexp(fwdlattice, axis=1)
+            filtered.append(fwdlattice - cumulative[:, None])
+            norms.append(np.diff(cumulative, prepend=0.0))
+        return _unbatch(np.stack(filtered), single), _unbatch(np.stack(norms), single)
+
+    def posteriors(self, model, X):
+        X, single = _as_batch(X)
+        return _unbatch(np.stack([model.predict_proba(x) for x in X]), single)
+
+    def decode(self, model, X):
+        X, single = _as_batch(X)
+        return _unbatch(np.stack([model.predict(x) for x in X]), single)
+
+
+class NumpyBackend(HMMBackend):
+    """
+    Pure-NumPy log-space HMM. The time recursions loop over T only; each
+    step is vectorized over (sequences × states × states), and the E-step
+    sufficient statistics are single tensor contractions over all bars.
+
+    The M-step mirrors hmmlearn's GaussianHMM (same priors, same zero
+    preservation in startprob_/transmat_), so fits match hmmlearn up to
+    floating-point error when started from the same parameters.
+    """
+
+    name = "numpy"
+
+    # ── Emissions ────────────────────────────────────────────────────────
+    def log_emissions(self, model, X):
+        X, single = _as_batch(X)
+        return _unbatch(self._log_emissions(model.means_, model.covars_, X, model.min_covar), single)
+
+    @staticmethod
+    def _log_emissions(means: np.ndarray, covars: np.ndarray, X: np.ndarray,
+                       min_covar: float = 1e-3) -> np.ndarray:
+        """
+        log N(x_nt | mu_k, Sigma_k) → (N, T, K), via Cholesky factors.
+        Evaluated in X's dtype; the factorization itself is always float64.
+        A covariance that is not positive definite (a state left with a
+        handful of bars, common at large K) gets min_covar on its diagonal,
+        as hmmlearn does.
+        """
+        d = X.shape[-1]
+        dtype = X.dtype
+        try:
+            chol = np.linalg.cholesky(covars)                               # (K, d, d)
+        except np.linalg.LinAlgError:
+            chol = np.linalg.cholesky(covars + min_covar * np.eye(d))
+        chol_inv = np.linalg.inv(chol).astype(dtype, copy=False)
+        log_det = 2.0 * np.log(np.diagonal(chol, axis1=1, axis2=2)).sum(axis=1)
+        const = (-0.5 * (d * np.log(2 * np.pi) + log_det)).astype(dtype)
+        diff = X[:, :, None, :] - means.astype(dtype, copy=False)[None, None, :, :]  # (N, T, K, d)
+        maha = np.einsum('kij,ntkj->ntki', chol_inv, diff)
+        return const[None, None, :] - dtype.type(0.5) * (maha ** 2).sum(axis=-1)
+
+    # ── Recursions ───────────────────────────────────────────────────────
+    @staticmethod
+    def _transition_plan(log_A: np.ndarray, n_seq: int):
+        """
+        In-neighbour lists of the transition graph: (src (K, W), log weights
+        (K, W)) with src[j] the states that can move into j, so a recursion
+        step gathers W predecessors per state instead of all K. Padding
+        entries point at disallowed sources (weight -inf). None when the
+        matrix is too dense, or the batch too small, for the gather to beat
+        the K×K broadcast.
+        """
+        allowed = np.isfinite(log_A)
+        n_states = len(log_A)
+        width = int(allowed.sum(axis=0).max())
+        if width > n_states // 2 or n_seq * n_states ** 2 < SPARSE_MIN_WORK:
+            return None
+        src = np.argsort(~allowed, axis=0, kind="stable")[:width].T        # allowed sources first
+        return src, log_A[src, np.arange(n_states)[:, None]]
+
+    @classmethod
+    def _forward(cls, log_start: np.ndarray, log_A: np.ndarray, log_b: np.ndarray) -> np.ndarray:
+        """Unnormalized log alpha, (N, T, K)"""
+        n_seq, n_steps, _ = log_b.shape
+        plan = cls._transition_plan(log_A, n_seq)
+        log_alpha = np.empty(log_b.shape)                                   # float64 accumulator
+        log_alpha[:, 0] = log_start[None, :] + log_b[:, 0]
+        for t in range(1, n_steps):
+            if plan is None:
+                incoming = log_alpha[:, t - 1, :, None] + log_A[None]       # (N, K_from, K_to)
+                log_alpha[:, t] = _logsumexp(incoming, axis=1) + log_b[:, t]
+            else:
+                incoming = log_alpha[:, t - 1][:, plan[0]] + plan[1][None]  # (N, K_to, W)
+                log_alpha[:, t] = _logsumexp(incoming, axis=2) + log_b[:, t]
+        return log_alpha
+
+    @classmethod
+    def _backward(cls, log_A: np.ndarray, log_b: np.ndarray) -> np.ndarray:
+        """log beta, (N, T, K)"""
+        n_seq, n_steps, _ = log_b.shape
+        plan = cls._transition_plan(log_A.T, n_seq)                         # out-neighbours
+        log_beta = np.zeros(log_b.shape)
+        for t in range(n_steps - 2, -1, -1):
+            ahead = log_b[:, t + 1] + log_beta[:, t + 1]
+            if plan is None:
+                log_beta[:, t] = _logsumexp(log_A[None] + ahead[:, None, :], axis=2)
+            else:
+                log_beta[:, t] = _logsumexp(ahead[:, plan[0]] + plan[1][None], axis=2)
+        return log_beta
+
+    @staticmethod
+    def _log_params(model) -> tuple:
+        with np.errstate(divide="ignore"):
+            return np.log(model.startprob_), np.log(model.transmat_)
+
+    def _e_step(self, model, X: np.ndarray) -> tuple:
+        log_start, log_A = self._log_params(model)
+        log_b = self._log_emissions(model.means_, model.covars_, X, model.min_covar)
+        log_alpha = self._forward(log_start, log_A, log_b)
+        log_beta = self._backward(log_A, log_b)
+        log_prob = logsumexp(log_alpha[:, -1], axis=1)                      # (N,)
+        return log_b, log_alpha, log_beta, log_prob
+
+    def score(self, model, X):
+        X, single = _as_batch(X)
+        log_start, log_A = self._log_params(model)
+        log_b = self._log_emissions(model.means_, model.covars_, X, model.min_covar)
+        log_alpha = self._forward(log_start, log_A, log_b)
+        return _unbatch(logsumexp(log_alpha[:, -1], axis=1), single)
+
+    def forward_filter(self, model, X):
+        X, single = _as_batch(X)
+        log_start, log_A = self._log_params(model)
+        log_b = self._log_emissions(model.means_, model.covars_, X, model.min_covar)
+        log_alpha = self._forward(log_start, log_A, log_b)
+        cumulative = logsumexp(log_alpha, axis=2)                           # log p(x_1..t)
+        filtered = log_alpha - cumulative[:, :, None]
+        norms = np.diff(cumulative, axis=1, prepend=0.0)
+        return _unbatch(filtered, single), _unbatch(norms, single)
+
+    def posteriors(self, model, X):
+        X, single = _as_batch(X)
+        _, log_alpha, log_beta, log_prob = self._e_step(model, X)
+        return _unbatch(np.exp(log_alpha + log_beta - log_prob[:, None, None]), single)
+
+    def decode(self, model, X):
+        X, single = _as_batch(X)
+        log_start, log_A = self._log_params(model)
+        log_b = self._log_emissions(model.means_, model.covars_, X, model.min_covar)
+        n_seq, n_steps, n_states = log_b.shape
+
+        plan = self._transition_plan(log_A, n_seq)
+        rows, to_state = np.arange(n_seq), np.arange(n_states)[None, :]
+        delta = log_start[None, :] + log_b[:, 0].astype(np.float64)
+        backpointers = np.empty((n_seq, n_steps, n_states), dtype=np.intp)
+        for t in range(1, n_steps):
+            if plan is None:
+                candidates = delta[:, :, None] + log_A[None]                # (N, K_from, K_to)
+                backpointers[:, t] = candidates.argmax(axis=1)
+                delta = candidates.max(axis=1) + log_b[:, t]
+            else:
+                candidates = delta[:, plan[0]] + plan[1][None]              # (N, K_to, W)
+                best = candidates.argmax(axis=2)
+                backpointers[:, t] = plan[0][to_state, best]
+                delta = candidates[rows[:, None], to_state, best] + log_b[:, t]
+
+        path = np.empty((n_seq, n_steps), dtype=np.intp)
+        path[:, -1] = delta.argmax(axis=1)
+        for t in range(n_steps - 1, 0, -1):
+            path[:, t - 1] = backpointers[rows, t, path[:, t]]
+        return _unbatch(path, single)
+
+    # ── EM ───────────────────────────────────────────────────────────────
+    def fit(self, model, X, lengths=None):
+        """
+        Baum-Welch over a batch of equal-length sequences. `lengths` is only
+        accepted for a single (T, d) input when all lengths are equal.
+        """
+        X = _as_float(X)
+        if X.ndim == 2 and lengths is not None:
+            lengths = np.asarray(lengths)
+            if np.any(lengths != lengths[0]):
+                raise ValueError("NumpyBackend needs equal-length sequences")
+            X = X.reshape(len(lengths), lengths[0], X.shape[-1])
+        X, _ = _as_batch(X)
+        X_flat = X.reshape(-1, X.shape[-1])
+
+        # Same initialization semantics as GaussianHMM.fit (honours init_params)
+        model._init(X_flat, [X.shape[1]] * X.shape[0])
+        model._check()
+        model.monitor_._reset()
+
+        for _ in range(model.n_iter):
+            log_b, log_alpha, log_beta, log_prob = self._e_step(model, X)
+            self._m_step(model, X, log_b, log_alpha, log_beta, log_prob)
+            model.monitor_.report(float(log_prob.sum()))
+            if model.monitor_.converged:
+                break
+        return model
+
+    @staticmethod
+    def _m_step(model, X, log_b, log_alpha, log_beta, log_prob):
+        """hmmlearn GaussianHMM M-step from batched posteriors"""
+        gamma = np.exp(log_alpha + log_beta - log_prob[:, None, None])      # (N, T, K)
+        # Expected transition counts sum_t xi_t(i, j) without the (N, T, K, K)
+        # xi tensor: shift alpha_t and b_t+1·beta_t+1 per bar, exponentiate,
+        # and let one (K, N·T) @ (N·T, K) product do the sum over bars
+        ahead = log_b[:, 1:] + log_beta[:, 1:]
+        shift_a = log_alpha[:, :-1].max(axis=2, keepdims=True)
+        shift_b = ahead.max(axis=2, keepdims=True)
+        scale = np.exp(shift_a + shift_b - log_prob[:, None, None])         # (N, T-1, 1)
+        fwd = np.exp(log_alpha[:, :-1] - shift_a) * scale
+        bwd = np.exp(ahead - shift_b)
+        n_states = gamma.shape[-1]
+        trans_counts = model.transmat_ * (fwd.reshape(-1, n_states).T @ bwd.reshape(-1, n_states))
+
+        start = gamma[:, 0].sum(axis=0)
+        post = gamma.sum(axis=(0, 1))
+        obs = np.einsum('ntk,ntd->kd', gamma, X)
+
+        if 's' in model.params:
+            startprob = np.maximum(model.startprob_prior - 1 + start, 0)
+            startprob = np.where(model.startprob_ == 0, 0, startprob)
+            model.startprob_ = startprob / startprob.sum()
+        if 't' in model.params:
+            transmat = np.maximum(model.transmat_prior - 1 + trans_counts, 0)
+            transmat = np.where(model.transmat_ == 0, 0, transmat)
+            model.transmat_ = transmat / np.maximum(transmat.sum(axis=1, keepdims=True), LOG_FLOOR)
+
+        denom = post[:, None]
+        if 'm' in model.params:
+            model.means_ = ((model.means_weight * model.means_prior + obs)
+                            / (model.means_weight + denom))
+
+        if 'c' in model.params:
+            means = model.means_
+            meandiff = means - model.means_prior
+            cov_type = model.covariance_type
+            if cov_type in ('spherical', 'diag'):
+                obs2 = np.einsum('ntk,ntd->kd', gamma, X ** 2)
+                c_n = (model.means_weight * meandiff ** 2 + obs2
+                       - 2 * means * obs + means ** 2 * denom)
+                c_d = max(model.covars_weight - 1, 0) + denom
+                covars = (model.covars_prior + c_n) / np.maximum(c_d, 1e-5)
+                if cov_type == 'spherical':
+                    covars = covars.mean(axis=1)
+                model._covars_ = covars
+            else:
+                obs_outer = np.einsum('ntk,nti,ntj->kij', gamma, X, X)
+                obsmean = np.einsum('ki,kj->kij', obs, means)
+                c_n = (model.means_weight * np.einsum('ki,kj->kij', meandiff, meandiff)
+                       + obs_outer - obsmean - obsmean.transpose(0, 2, 1)
+                       + np.einsum('ki,kj->kij', means, means) * post[:, None, None])
+                cvweight = max(model.covars_weight - model.n_features, 0)
+                if cov_type == 'tied':
+                    model._covars_ = (model.covars_prior + c_n.sum(axis=0)) / (cvweight + post.sum())
+                else:
+                    model._covars_ = (model.covars_prior + c_n) / (cvweight + post[:, None, None])
+
+
+BACKENDS = {
+    HmmlearnBackend.name: HmmlearnBackend,
+    NumpyBackend.name: NumpyBackend,
+}
+
+
+def get_backend(name: str) -> HMMBackend:
+    """Instantiate a backend by name ("hmmlearn" / "numpy")"""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{name}', expected one of {list(BACKENDS)}")
+    return BACKENDS[name]()
@@ -0,0 +1,164 @@
+# app/engine/backtest.py
+import itertools
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+def build_allocation_grid(labels: list[str], levels: tuple = (0.0, 0.5, 1.0)) -> tuple:
+    """
+    Enumerate every "weight per regime" rule over the given exposure levels.
+    3 regimes x 3 levels → 27 rules, e.g. Bull=1.0 / Sideways=0.5 / Bear=0.0.
+
+    Returns (allocations [n_rules, n_labels], rule_names).
+    """
+    combos = list(itertools.product(levels, repeat=len(labels)))
+    allocations = np.asarray(combos, dtype=float)
+    names = [
+        "|".join(f"{label}={w:g}" for label, w in zip(labels, combo))
+        for combo in combos
+    ]
+    return allocations, names
+
+
+def run_vectorized_backtest(
+    regime_codes: np.ndarray,
+    log_returns: np.ndarray,
+    allocations: np.ndarray,
+    cost_bps: float = 0.0,
+    contiguous: np.ndarray = None,  # pyright: ignore[reportArgumentType]
+) -> dict:
+    """
+    Evaluate every allocation rule in one broadcasted pass.
+
+    regime_codes[t] is the regime known at the close of bar t, so the
+    position held over bar t is allocations[:, regime_codes[t-1]] — the
+    one-bar lag is what keeps this free of look-ahead.
+
+    Args:
+        regime_codes: (T,) int codes into the columns of `allocations`.
+        log_returns: (T,) Log_Return of each bar.
+        allocations: (R, K) exposure per rule and regime.
+        cost_bps: Cost per unit of turnover, in basis points.
+        contiguous: (T,) bool, False where bar t does not directly follow
+            bar t-1 (gap between folds). The position is flat on those bars.
+
+    Returns dict of (R,) arrays: total_return, annual_return, annual_vol,
+    sharpe, max_drawdown, turnover (annualized), plus the (R, T) net returns.
+    """
+    regime_codes = np.asarray(regime_codes, dtype=np.intp)
+    log_returns = np.asarray(log_returns, dtype=float)
+    allocations = np.atleast_2d(np.asarray(allocations, dtype=float))
+    n_bars = len(regime_codes)
+
+    if len(log_returns) != n_bars:
+        raise ValueError("regime_codes and log_returns must have the same length")
+    if n_bars < 2:
+        raise ValueError("Need at least 2 bars to backtest")
+    if not np.all(allocations > -1.0):
+        # A -100% (or shorter) position makes log1p of the net return undefined
+        raise ValueError("Allocations must be greater than -1")
+
+    # (R, T) target weight decided at each close; held over the NEXT bar
+    target = allocations[:, regime_codes]
+    held = np.zeros_like(target)
+    held[:, 1:] = target[:, :-1]
+    if contiguous is not None:
+        held[:, ~np.asarray(contiguous, dtype=bool)] = 0.0
+
+    turnover = np.abs(np.diff(held, axis=1, prepend=0.0))
+    simple_returns = np.expm1(log_returns)
+    net = held * simple_returns[None, :] - turnover * (cost_bps / 1e4)
+
+    log_equity = np.cumsum(np.log1p(net), axis=1)
+    running_peak = np.maximum.accumulate(np.maximum(log_equity, 0.0), axis=1)
+    drawdown = np.expm1(log_equity - running_peak)
+
+    years = n_bars / TRADING_DAYS_PER_YEAR
+    mean = net.mean(axis=1)
+    std = net.std(axis=1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS_PER_YEAR), 0.0)
+
+    total_return = np.expm1(log_equity[:, -1])
+    return {
+        "total_return": total_return,
+        "annual_return": np.expm1(log_equity[:, -1] / years),
+        "annual_vol": std * np.sqrt(TRADING_DAYS_PER_YEAR),
+        "sharpe": sharpe,
+        "max_drawdown": drawdown.min(axis=1),
+        "turnover": turnover.sum(axis=1) / years,
+        "net_returns": net,
+    }
+
+
+def backtest_walk_forward(
+    df: pd.DataFrame,
+    wf_summary: dict,
+    allocations: np.ndarray,
+    labels: list[str],
+    rule_names: list[str] = None,  # pyright: ignore[reportArgumentType]
+    cost_bps: float = 0.0,
+) -> dict:
+    """
+    Backtest allocation rules on the out-of-sample regime path returned by
+    walk_forward_validation(..., return_regime_path=True).
+
+    Overlapping folds (step_size < test_size) keep the first fold's
+    decision for a bar; gaps between folds are held flat.
+    """
+    path = wf_summary.get("regime_path")
+    if not path or not path["index"]:
+        raise ValueError("Walk-forward summary has no regime_path (run with return_regime_path=True)")
+
+    index = np.asarray(path["index"])
+    regimes = np.asarray(path["regimes"])
+    index, first = np.unique(index, return_index=True)
+    regimes = regimes[first]
+
+    unknown = set(regimes) - set(labels)
+    if unknown:
+        raise ValueError(f"Allocation rules missing regimes: {sorted(unknown)}")
+
+    label_codes = {label: i for i, label in enumerate(labels)}
+    codes = np.array([label_codes[r] for r in regimes], dtype=np.intp)
+    log_returns = df["Log_Return"].to_numpy()[index]
+    contiguous = np.concatenate([[True], np.diff(index) == 1])
+
+    allocations = np.atleast_2d(np.asarray(allocations, dtype=float))
+    rule_names = rule_names or [f"rule_{i}" for i in range(len(allocations))]
+
+    logger.info(f"📈 Backtesting {len(allocations)} rules over {len(index)} out-of-sample bars "
+                f"(cost={cost_bps} bps)")
+
+    metrics = run_vectorized_backtest(codes, log_returns, allocations, cost_bps, contiguous)
+
+    results = [
+        {
+            "rule": name,
+            "allocation": dict(zip(labels, map(float, allocations[i]))),
+            "total_return": float(metrics["total_return"][i]),
+            "annual_return": float(metrics["annual_return"][i]),
+            "annual_vol": float(metrics["annual_vol"][i]),
+            "sharpe": float(metrics["sharpe"][i]),
+            "max_drawdown": float(metrics["max_drawdown"][i]),
+            "turnover": float(metrics["turnover"][i]),
+        }
+        for i, name in enumerate(rule_names)
+    ]
+    results.sort(key=lambda r: r["sharpe"], reverse=True)
+
+    dates = df.index[index]
+    return {
+        "n_rules": len(results),
+        "n_bars": int(len(index)),
+        "start_date": dates[0].strftime('%Y-%m-%d'),
+        "end_date": dates[-1].strftime('%Y-%m-%d'),
+        "cost_bps": cost_bps,
+        "buy_and_hold_return": float(np.expm1(log_returns[1:].sum())),
+        "results": results,
+    }
@@ -0,0 +1,192 @@
+# app/engine/bootstrap.py
+"""
+Stationary block-bootstrap confidence intervals for a fitted HMM.
+
+Each replicate resamples the scaled feature sequence with the
+Politis–Romano stationary bootstrap (blocks start at uniform positions,
+lengths are geometric with mean `mean_block`, wrapping around the end),
+so short-range dependence and regime persistence survive inside a block.
+Blocks are passed to EM as separate sequences (`lengths`): the jump
+between two blocks is not a real bar-to-bar move and must not be counted
+as a transition.
+
+Refits are warm-started from the base parameters and capped at
+BOOTSTRAP_MAX_ITER iterations, then aligned to the base states by the
+assignment that minimises the distance between state means (EM may swap
+labels). Percentile intervals are reported for every transition
+probability, expected duration 1 / (1 - p_ii) and state mean.
+
+Replicates are independent module-level tasks, so any
+concurrent.futures executor (the service can pass a process pool) runs
+them in parallel. Only `max_in_flight` are submitted at a time (each
+submission pickles its own copy of the features); whatever finished by
+the deadline is aggregated.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+import numpy as np
+from app.engine.hmm_model import RegimeDetector
+from app.engine.model_config import model_config
+from app.engine.online_em import align_states
+
+
+def stationary_block_indices(n: int, mean_block: float, rng: np.random.Generator) -> tuple:
+    """
+    Indices of one stationary-bootstrap resample of a length-n series.
+    Returns (indices (n,), block lengths summing to n).
+    """
+    if n < 2:
+        raise ValueError("Need at least 2 observations to bootstrap")
+    p = 1.0 / max(float(mean_block), 1.0)
+    # Enough draws to cover n in all but astronomically unlikely cases; top up otherwise
+    lengths = rng.geometric(p, size=int(n * p * 2) + 16)
+    while lengths.sum() < n:
+        lengths = np.concatenate([lengths, rng.geometric(p, size=len(lengths))])
+    n_blocks = int(np.searchsorted(np.cumsum(lengths), n)) + 1
+    lengths = lengths[:n_blocks]
+    lengths[-1] -= lengths.sum() - n
+
+    starts = rng.integers(0, n, size=n_blocks)
+    # Position inside each block, then wrap around the end of the series
+    offsets = np.arange(n) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    indices = (np.repeat(starts, lengths) + offsets) % n
+    return indices, lengths
+
+
+def bootstrap_replicate(features: np.ndarray, base_params: dict, seed: int,
+                        mean_block: float, n_iter: int, deadline: float = None,  # pyright: ignore[reportArgumentType]
+                        backend: str = None) -> dict:  # pyright: ignore[reportArgumentType]
+    """
+    One resample + warm-started refit (runs in a pool worker). Returns the
+    aligned transition matrix and means, or None when the deadline passed
+    before the refit could start.
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        return None  # pyright: ignore[reportReturnType]
+
+    rng = np.random.default_rng(seed)
+    indices, lengths = stationary_block_indices(len(features), mean_block, rng)
+    n_states = len(base_params['start_probs'])
+    detector = RegimeDetector(n_states=n_states, random_state=seed % (2 ** 32), backend=backend)
+    detector.refit_from(base_params, features[indices], lengths=lengths.tolist(),
+                        n_iter=n_iter, deadline=deadline)
+
+    params = detector.get_model_params()
+    perm = align_states(np.asarray(base_params['means']), params['means'])
+    return {
+        'transition_matrix': params['transition_matrix'][np.ix_(perm, perm)],
+        'means': params['means'][perm],
+        'n_iter': detector.training_stats['n_iter'],
+        'converged': detector.training_stats['converged'],
+    }
+
+
+def _interval(samples: np.ndarray, point: np.ndarray, alpha: float) -> dict:
+    lower, upper = np.nanquantile(samples, [alpha / 2, 1 - alpha / 2], axis=0)
+    return {
+        'estimate': point,
+        'lower': lower,
+        'upper': upper,
+        'std': np.nanstd(samples, axis=0, ddof=1) if len(samples) > 1 else np.full_like(point, np.nan),
+    }
+
+
+def _expected_duration(transmat: np.ndarray) -> np.ndarray:
+    stay = np.diagonal(transmat, axis1=-2, axis2=-1)
+    with np.errstate(divide="ignore"):
+        return 1.0 / (1.0 - stay)
+
+
+def bootstrap_confidence_intervals(features: np.ndarray, base_params: dict,
+                                   n_replicates: int = None,  # pyright: ignore[reportArgumentType]
+                                   mean_block: float = None,  # pyright: ignore[reportArgumentType]
+                                   confidence: float = None,  # pyright: ignore[reportArgumentType]
+                                   time_budget: float = None,  # pyright: ignore[reportArgumentType]
+                                   executor=None, backend: str = None,  # pyright: ignore[reportArgumentType]
+                                   feature_scale: tuple = None,  # pyright: ignore[reportArgumentType]
+                                   random_state: int = None,  # pyright: ignore[reportArgumentType]
+                                   max_in_flight: int = 4) -> dict:
+    """
+    features: scaled (T, F) sequence the base model was fitted on;
+    base_params: its get_model_params(). executor: concurrent.futures
+    executor for the refits (None → run in this thread), fed at most
+    max_in_flight replicates at a time. time_budget
+    (seconds) bounds the whole run: replicates not finished by then are
+    cancelled and left out. feature_scale=(mean, scale) of the scaler maps
+    state means back to feature units.
+
+    Returns numpy arrays: transition_matrix / expected_duration / means,
+    each {'estimate', 'lower', 'upper', 'std'}, plus replicate counts.
+    """
+    n_replicates = n_replicates or model_config.BOOTSTRAP_REPLICATES
+    mean_block = mean_block or model_config.BOOTSTRAP_MEAN_BLOCK
+    confidence = confidence or model_config.BOOTSTRAP_CONFIDENCE
+    if not 0.0 < confidence < 1.0:
+        raise ValueError(f"confidence must be in (0, 1), got {confidence}")
+    if n_replicates < 1 or max_in_flight < 1:
+        raise ValueError("n_replicates and max_in_flight must be positive")
+    n_iter = model_config.BOOTSTRAP_MAX_ITER
+    seed = model_config.RANDOM_STATE if random_state is None else random_state
+
+    started = time.monotonic()
+    deadline = started + time_budget if time_budget is not None else None
+    features = np.asarray(features)
+    base_params = {k: np.asarray(v) for k, v in base_params.items()}
+    seeds = np.random.SeedSequence(seed).generate_state(n_replicates)
+    args = ((features, base_params, int(s), mean_block, n_iter, deadline, backend) for s in seeds)
+
+    replicates = []
+    timed_out = False
+    if executor is None:
+        for a in args:
+            if deadline is not None and time.monotonic() >= deadline:
+                timed_out = True
+                break
+            replicates.append(bootstrap_replicate(*a))
+    else:
+        pending = set()
+        while True:
+            while len(pending) < max_in_flight:
+                a = next(args, None)
+                if a is None:
+                    break
+                pending.add(executor.submit(bootstrap_replicate, *a))
+            if not pending:
+                break
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                timed_out = True
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            replicates.extend(f.result() for f in done)
+        for f in pending:
+            f.cancel()
+    replicates = [r for r in replicates if r is not None]
+    timed_out = timed_out or len(replicates) < n_replicates
+
+    if not replicates:
+        raise ValueError("No bootstrap replicate finished within the time budget")
+
+    transmats = np.stack([r['transition_matrix'] for r in replicates])
+    means = np.stack([r['means'] for r in replicates])
+    base_means = base_params['means']
+    if feature_scale is not None:
+        loc, scale = (np.asarray(v) for v in feature_scale)
+        means = means * scale + loc
+        base_means = base_means * scale + loc
+
+    alpha = 1.0 - confidence
+    base_transmat = base_params['transition_matrix']
+    return {
+        'transition_matrix': _interval(transmats, base_transmat, alpha),
+        'expected_duration': _interval(_expected_duration(transmats), _expected_duration(base_transmat), alpha),
+        'means': _interval(means, base_means, alpha),
+        'confidence': confidence,
+        'mean_block': float(mean_block),
+        'n_requested': n_replicates,
+        'n_completed': len(replicates),
+        'n_converged': int(sum(r['converged'] for r in replicates)),
+        'mean_refit_iterations': float(np.mean([r['n_iter'] for r in replicates])),
+        'timed_out': timed_out,
+        'elapsed_seconds': time.monotonic() - started,
+    }
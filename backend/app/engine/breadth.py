@@ -0,0 +1,142 @@
+# app/engine/breadth.py
+"""
+Market-wide regime breadth from each ticker's latest filtered state
+distribution and t+1 forecast.
+
+Tickers are rows of two flat matrices (current, next) whose columns are
+regime labels (the union over all models, so 2- and 3-state tickers mix).
+A refreshed ticker overwrites its row and adjusts running column totals
+by the difference, so the default equal-weight view is O(labels) per
+update and per read; weighted or grouped views are one vectorized pass
+(a weighted bincount per label) over the rows.
+"""
+import threading
+from datetime import datetime, timezone
+import numpy as np
+
+
+class RegimeBreadth:
+
+    def __init__(self, initial_capacity: int = 256):
+        self.labels = []
+        self._columns = {}
+        self._current = np.zeros((initial_capacity, 0))
+        self._next = np.zeros((initial_capacity, 0))
+        self._totals = {'current': np.zeros(0), 'next': np.zeros(0), 'dominant': np.zeros(0)}
+        self.tickers = []
+        self._rows = {}
+        self.meta = {}
+        self._lock = threading.Lock()
+
+    def _column(self, label: str) -> int:
+        col = self._columns.get(label)
+        if col is None:
+            col = self._columns[label] = len(self.labels)
+            self.labels.append(label)
+            pad = ((0, 0), (0, 1))
+            self._current = np.pad(self._current, pad)
+            self._next = np.pad(self._next, pad)
+            self._totals = {k: np.append(v, 0.0) for k, v in self._totals.items()}
+        return col
+
+    def _dominant(self, row: np.ndarray) -> np.ndarray:
+        onehot = np.zeros(len(self.labels))
+        if row.any():
+            onehot[row.argmax()] = 1.0
+        return onehot
+
+    def update(self, ticker: str, current: dict, forecast: dict, meta: dict = None):  # pyright: ignore[reportArgumentType]
+        """Replace `ticker`'s distributions ({label: probability}) and adjust totals"""
+        with self._lock:
+            cols = {label: self._column(label) for label in {**current, **forecast}}
+            row = self._rows.get(ticker)
+            if row is None:
+                row = len(self.tickers)
+                if row == len(self._current):
+                    self._current = np.concatenate([self._current, np.zeros_like(self._current)])
+                    self._next = np.concatenate([self._next, np.zeros_like(self._next)])
+                self.tickers.append(ticker)
+                self._rows[ticker] = row
+            else:
+                self._totals['current'] -= self._current[row]
+                self._totals['next'] -= self._next[row]
+                self._totals['dominant'] -= self._dominant(self._current[row])
+
+            self._current[row] = 0.0
+            self._next[row] = 0.0
+            for label, p in current.items():
+                self._current[row, cols[label]] = p
+            for label, p in forecast.items():
+                self._next[row, cols[label]] = p
+
+            self._totals['current'] += self._current[row]
+            self._totals['next'] += self._next[row]
+            self._totals['dominant'] += self._dominant(self._current[row])
+            self.meta[ticker] = {**(meta or {}), 'updated_at': datetime.now(timezone.utc).isoformat()}
+
+    def _summary(self, n: float, current: np.ndarray, forecast: np.ndarray, dominant: np.ndarray) -> dict:
+        share = lambda v: {label: float(v[i] / n) if n else 0.0 for i, label in enumerate(self.labels)}
+        current_share, next_share = share(current), share(forecast)
+        return {
+            'weight': float(n),
+            'current': current_share,
+            'next': next_share,
+            'dominant': share(dominant),
+            'net_breadth': current_share.get('Bull', 0.0) - current_share.get('Bear', 0.0),
+            'net_breadth_next': next_share.get('Bull', 0.0) - next_share.get('Bear', 0.0),
+        }
+
+    def aggregate(self, weights: dict = None, groups: dict = None,  # pyright: ignore[reportArgumentType]
+                  tickers: list = None) -> dict:  # pyright: ignore[reportArgumentType]
+        """
+        Probability-weighted regime shares (`current`, `next`) and the
+        share of tickers whose most likely regime is each label
+        (`dominant`). weights: {ticker: w} (missing → 0 when given);
+        groups: {ticker: name} adds per-group summaries; tickers restricts
+        the universe.
+        """
+        with self._lock:
+            n = len(self.tickers)
+            if weights is None and groups is None and tickers is None:
+                # Running totals: no pass over the universe
+                result = self._summary(n, *(self._totals[k] for k in ('current', 'next', 'dominant')))
+                result['n_tickers'] = n
+                return result
+
+            current, forecast = self._current[:n], self._next[:n]
+            dominant = np.zeros_like(current)
+            has_mass = current.any(axis=1)
+            dominant[np.arange(n)[has_mass], current[has_mass].argmax(axis=1)] = 1.0
+
+            w = np.ones(n)
+            if weights is not None:
+                w = np.array([float(weights.get(t, 0.0)) for t in self.tickers])
+            if tickers is not None:
+                w = w * np.isin(np.array(self.tickers, dtype=object), list(tickers))
+
+            result = self._summary(w.sum(), w @ current, w @ forecast, w @ dominant)
+            result['n_tickers'] = int((w > 0).sum())
+
+            if groups is not None:
+                names = sorted({groups[t] for t in self.tickers if t in groups})
+                gid = np.array([names.index(groups[t]) if t in groups else -1 for t in self.tickers])
+                in_group = gid >= 0
+                G = len(names)
+                sums = {}
+                for key, matrix in (('current', current), ('next', forecast), ('dominant', dominant)):
+                    sums[key] = np.stack([
+                        np.bincount(gid[in_group], weights=(w[:, None] * matrix)[in_group, j], minlength=G)
+                        for j in range(len(self.labels))
+                    ], axis=1) if self.labels else np.zeros((G, 0))
+                totals = np.bincount(gid[in_group], weights=w[in_group], minlength=G)
+                counts = np.bincount(gid[in_group], weights=(w[in_group] > 0), minlength=G)
+                result['groups'] = {
+                    name: {**self._summary(totals[g], sums['current'][g], sums['next'][g], sums['dominant'][g]),
+                           'n_tickers': int(counts[g])}
+                    for g, name in enumerate(names)
+                }
+            return result
+
+    def status(self) -> dict:
+        with self._lock:
+            return {'tickers': len(self.tickers), 'labels': list(self.labels)}
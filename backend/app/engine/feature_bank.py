@@ -0,0 +1,177 @@
+# app/engine/feature_bank.py
+"""
+Registry of vectorized OHLCV features for the HMM.
+
+Feature names are "<Base>" or "<Base>_<window>" (e.g. "Realized_Vol_20").
+Rolling sums come from one cumulative sum per input series, shared by
+every window that needs it, so adding windows costs O(T) each instead of
+another pandas rolling pass. Rolling maxima use sliding-window views.
+
+Available bases:
+    Log_Return            ln(C_t / C_t-1)
+    Volatility            realized vol at VOLATILITY_WINDOW (legacy name)
+    Realized_Vol_<w>      sample std of log returns
+    Parkinson_Vol_<w>     sqrt(mean(ln(H/L)^2) / (4 ln 2))
+    Garman_Klass_Vol_<w>  sqrt(mean(0.5 ln(H/L)^2 - (2 ln 2 - 1) ln(C/O)^2))
+    Volume_Z_<w>          z-score of log volume vs its trailing window
+    Drawdown_<w>          C_t / max(C over last w bars) - 1
+"""
+import logging
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from app.engine.model_config import model_config
+
+logger = logging.getLogger(__name__)
+
+LN2 = np.log(2.0)
+
+
+class RollingContext:
+    """
+    Per-frame cache of derived series and their cumulative sums.
+    window_sum(name, w)[t] = sum(series[t-w+1 .. t]); NaN until w values exist.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n = len(df)
+        self.open = df['Open'].to_numpy(dtype=float)
+        self.high = df['High'].to_numpy(dtype=float)
+        self.low = df['Low'].to_numpy(dtype=float)
+        self.close = df['Close'].to_numpy(dtype=float)
+        self.volume = df['Volume'].to_numpy(dtype=float)
+        self._series = {}
+        self._cumsums = {}
+
+    def series(self, name: str) -> np.ndarray:
+        if name not in self._series:
+            self._series[name] = SERIES[name](self)
+        return self._series[name]
+
+    def window_sum(self, name: str, window: int) -> np.ndarray:
+        if name not in self._cumsums:
+            x = self.series(name)
+            # NaNs (first return) break the running sum, so shift them out:
+            # cumsum over zero-filled values plus a running count of NaNs
+            c = np.concatenate([[0.0], np.cumsum(np.nan_to_num(x))])
+            bad = np.concatenate([[0], np.cumsum(np.isnan(x))])
+            self._cumsums[name] = (c, bad)
+
+        c, bad = self._cumsums[name]
+        out = np.full(self.n, np.nan)
+        if window <= self.n:
+            sums = c[window:] - c[:-window]
+            clean = (bad[window:] - bad[:-window]) == 0
+            out[window - 1:] = np.where(clean, sums, np.nan)
+        return out
+
+    def window_mean(self, name: str, window: int) -> np.ndarray:
+        return self.window_sum(name, window) / window
+
+    def window_std(self, name: str, window: int) -> np.ndarray:
+        """Sample std (ddof=1), matching pandas rolling().std()"""
+        s1 = self.window_sum(name, window)
+        s2 = self.window_sum(name + "^2", window)
+        var = (s2 - s1 * s1 / window) / (window - 1)
+        return np.sqrt(np.maximum(var, 0.0))
+
+    def window_max(self, name: str, window: int) -> np.ndarray:
+        out = np.full(self.n, np.nan)
+        if window <= self.n:
+            out[window - 1:] = sliding_window_view(self.series(name), window).max(axis=1)
+        return out
+
+
+def _log_return(ctx):
+    r = np.full(ctx.n, np.nan)
+    r[1:] = np.diff(np.log(ctx.close))
+    return r
+
+
+SERIES = {
+    'close': lambda ctx: ctx.close,
+    'log_return': _log_return,
+    'log_return^2': lambda ctx: ctx.series('log_return') ** 2,
+    'log_volume': lambda ctx: np.log(np.maximum(ctx.volume, 1.0)),
+    'log_volume^2': lambda ctx: ctx.series('log_volume') ** 2,
+    'parkinson_var': lambda ctx: np.log(ctx.high / ctx.low) ** 2 / (4 * LN2),
+    'garman_klass_var': lambda ctx: (0.5 * np.log(ctx.high / ctx.low) ** 2
+                                     - (2 * LN2 - 1) * np.log(ctx.close / ctx.open) ** 2),
+}
+
+
+def _realized_vol(ctx, window):
+    return ctx.window_std('log_return', window)
+
+
+def _volume_z(ctx, window):
+    std = ctx.window_std('log_volume', window)
+    z = (ctx.series('log_volume') - ctx.window_mean('log_volume', window)) / np.where(std > 0, std, np.nan)
+    return z
+
+
+FEATURES = {
+    'Log_Return': (lambda ctx, window: ctx.series('log_return'), False),
+    'Volatility': (lambda ctx, window: _realized_vol(ctx, model_config.VOLATILITY_WINDOW), False),
+    'Realized_Vol': (_realized_vol, True),
+    'Parkinson_Vol': (lambda ctx, w: np.sqrt(ctx.window_mean('parkinson_var', w)), True),
+    'Garman_Klass_Vol': (lambda ctx, w: np.sqrt(np.maximum(ctx.window_mean('garman_klass_var', w), 0.0)), True),
+    'Volume_Z': (_volume_z, True),
+    'Drawdown': (lambda ctx, w: ctx.close / ctx.window_max('close', w) - 1.0, True),
+}
+
+
+def parse_feature(name: str) -> tuple:
+    """'Realized_Vol_20' → ('Realized_Vol', 20); 'Log_Return' → ('Log_Return', None)"""
+    if name in FEATURES:
+        if FEATURES[name][1]:
+            raise ValueError(f"Feature '{name}' needs a window suffix, e.g. '{name}_20'")
+        return name, None
+
+    base, _, suffix = name.rpartition('_')
+    if base in FEATURES and FEATURES[base][1] and suffix.isdigit() and int(suffix) >= 2:
+        return base, int(suffix)
+    raise ValueError(f"Unknown feature '{name}'. Available: {sorted(FEATURES)} "
+                     f"(windowed ones as '<name>_<window>')")
+
+
+def resolve_feature_set(feature_set) -> list:
+    """A FEATURE_SETS name or an explicit list of feature names → validated list"""
+    if feature_set is None:
+        return list(model_config.FEATURES)
+    if isinstance(feature_set, str):
+        if feature_set not in model_config.FEATURE_SETS:
+            raise ValueError(f"Unknown feature set '{feature_set}'. "
+                             f"Available: {sorted(model_config.FEATURE_SETS)}")
+        names = list(model_config.FEATURE_SETS[feature_set])
+    else:
+        names = list(feature_set)
+
+    if not names or len(set(names)) != len(names):
+        raise ValueError(f"Feature set must list distinct features: {names}")
+    for name in names:
+        parse_feature(name)
+    return names
+
+
+def compute_feature_frame(df: pd.DataFrame, feature_names: list) -> pd.DataFrame:
+    """
+    Compute the requested features on a clean OHLCV frame (FeatureEngine.load_ohlc).
+    Log_Return and Volatility are always included (regime naming uses them);
+    rows with any NaN in the output features are dropped.
+    """
+    ctx = RollingContext(df)
+    out = df.copy()
+
+    columns = list(dict.fromkeys(['Log_Return', 'Volatility', *feature_names]))
+    for name in columns:
+        base, window = parse_feature(name)
+        out[name] = FEATURES[base][0](ctx, window)
+    out['Volatility_Annualized'] = out['Volatility'] * np.sqrt(252)
+
+    initial_len = len(out)
+    out = out.replace([np.inf, -np.inf], np.nan).dropna(subset=columns)
+    out = out.astype({col: model_config.get_compute_dtype() for col in columns})
+    logger.info(f"   ✅ Feature bank: {len(feature_names)} features, "
+                f"dropped {initial_len - len(out)} warm-up rows, {len(out)} rows ready")
+    return out
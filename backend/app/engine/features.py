@@ -4,6 +4,7 @@ import numpy as np
 import logging
 from sklearn.preprocessing import StandardScaler
 from app.engine.model_config import model_config
+from app.engine.feature_bank import resolve_feature_set, compute_feature_frame
 
 logger = logging.getLogger(__name__)
 
@@ -85,6 +86,7 @@ class FeatureEngine:
         # Drop NaN rows (from shift and rolling)
         initial_len = len(df)
         df = df.dropna()
+        df = df.astype({col: model_config.get_compute_dtype() for col in ['Log_Return', 'Volatility']})
         dropped = initial_len - len(df)
         
         logger.info(f"   ✅ Dropped {dropped} NaN rows, {len(df)} rows ready")
@@ -110,7 +112,7 @@ class FeatureEngine:
         
         # Standardize (mean=0, std=1)
         scaler = StandardScaler()
-        features_scaled = scaler.fit_transform(features_raw)
+        features_scaled = scaler.fit_transform(features_raw).astype(model_config.get_compute_dtype(), copy=False)
         
         logger.info(f"   ✅ Scaled: mean≈0, std≈1")
         
@@ -123,11 +125,13 @@ class HMMPreprocessor:
     """
     
     @staticmethod
-    def csv_to_features(df: pd.DataFrame, vol_window: int = None) -> dict:
+    def csv_to_features(df: pd.DataFrame, vol_window: int = None,
+                        feature_set=None) -> dict:
         """
         Execute full pipeline:
         1. Load & clean OHLC
-        2. Engineer features (log returns, volatility)
+        2. Engineer features (log returns, volatility), or the given
+           feature_set (FEATURE_SETS name or list of feature-bank names)
         3. Scale features
         
         Returns dict with:
@@ -147,10 +151,15 @@ class HMMPreprocessor:
             df_clean = FeatureEngine.load_ohlc(df)
             
             # Step 2: Feature engineering
-            df_features = FeatureEngine.prepare_features(df_clean, vol_window=vol_window)
+            if feature_set is None:
+                df_features = FeatureEngine.prepare_features(df_clean, vol_window=vol_window)
+                feature_cols = None
+            else:
+                feature_cols = resolve_feature_set(feature_set)
+                df_features = compute_feature_frame(df_clean, feature_cols)
             
             # Step 3: Scaling
-            scaled_features, scaler, feature_cols = FeatureEngine.scale_features(df_features)
+            scaled_features, scaler, feature_cols = FeatureEngine.scale_features(df_features, feature_cols)
             
             logger.info("="*60)
             logger.info("✅ PREPROCESSING COMPLETE")
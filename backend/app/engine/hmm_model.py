@@ -1,53 +1,180 @@
 # app/engine/hmm_model.py
 from hmmlearn import hmm
+from hmmlearn.base import ConvergenceMonitor
+import time
 import numpy as np
 import pandas as pd
 from app.engine.model_config import model_config
+from app.engine.backends import get_backend
+from app.engine.initialization import (
+    INIT_METHODS, TRANSITION_STRUCTURES, kmeanspp_subsample_init, quantile_init,
+    sticky_transmat, banded_transmat, principal_order,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def set_covariances(model: hmm.GaussianHMM, covars: np.ndarray, weights: np.ndarray = None):  # pyright: ignore[reportArgumentType]
+    """
+    Assign (K, d, d) full covariances to a GaussianHMM in the layout its
+    covariance_type expects (hmmlearn's covars_ setter is type-specific).
+    """
+    if model.covariance_type == "full":
+        model.covars_ = covars
+    elif model.covariance_type == "diag":
+        model.covars_ = np.diagonal(covars, axis1=1, axis2=2)
+    elif model.covariance_type == "spherical":
+        model.covars_ = np.diagonal(covars, axis1=1, axis2=2).mean(axis=1)
+    else:  # tied
+        model.covars_ = np.average(covars, axis=0, weights=weights)
+
+class DeadlineMonitor(ConvergenceMonitor):
+    """
+    ConvergenceMonitor that also stops EM at a wall-clock deadline
+    (time.monotonic() seconds) and remembers the best parameters seen.
+
+    hmmlearn reports log P(X | params before the M-step) *after* the M-step,
+    so each report scores the snapshot taken at the previous report.
+    """
+
+    def __init__(self, tol, n_iter, verbose, model=None):
+        super().__init__(tol, n_iter, verbose)
+        self.model = model
+        self.deadline = None
+        self.timed_out = False
+        self.best_log_prob = -np.inf
+        self.best_params = None
+        self._pending = None
+
+    def snapshot(self) -> dict:
+        """Copy of the model's fitted parameters"""
+        return {name: np.copy(getattr(self.model, name))
+                for name in ('startprob_', 'transmat_', 'means_', '_covars_')}
+
+    def _reset(self):
+        super()._reset()
+        self.timed_out = False
+        self.best_log_prob = -np.inf
+        self.best_params = None
+        # Called by hmmlearn right after initialization → initial params
+        self._pending = self.snapshot() if self.model is not None else None
+
+    def report(self, log_prob):
+        super().report(log_prob)
+        if self.model is None:
+            return
+        if log_prob > self.best_log_prob:
+            self.best_log_prob = log_prob
+            self.best_params = self._pending
+        self._pending = self.snapshot()
+
+    def restore(self, params: dict):
+        """Put a snapshot (e.g. best_params) back into the model"""
+        for name, value in params.items():
+            setattr(self.model, name, value)
+
+    @property
+    def tol_converged(self) -> bool:
+        """Converged in the EM sense (tolerance or n_iter), ignoring the deadline"""
+        return super().converged
+
+    @property
+    def converged(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.timed_out = not super().converged
+            return True
+        return super().converged
+
+
 class RegimeDetector:
     """
     HMM Model for Regime Detection
     Steps 4-8: Chọn n_states → Fit → Decode → Meaning → Validate
     """
     
-    def __init__(self, n_states: int = None, random_state: int = None): # pyright: ignore[reportArgumentType]
+    def __init__(self, n_states: int = None, random_state: int = None, # pyright: ignore[reportArgumentType]
+                 init_method: str = None, covariance_type: str = None, # pyright: ignore[reportArgumentType]
+                 fit_mode: str = None, backend: str = None, # pyright: ignore[reportArgumentType]
+                 transition_structure: str = None, bandwidth: int = None): # pyright: ignore[reportArgumentType]
         """
         Step 4: Initialize HMM with config
+
+        init_method: "kmeans" (hmmlearn default, full-data KMeans),
+        "kmeans++_subsample" or "quantile" (see app.engine.initialization).
+        fit_mode: "direct" (one EM run) or "staged" (diagonal prefit →
+        full-covariance refinement, only applies to covariance_type="full").
+        backend: inference backend for EM / decoding ("hmmlearn" or "numpy",
+        see app.engine.backends).
+        transition_structure: "dense" or "banded" (each state only reaches
+        the `bandwidth` nearest states; the numpy backend then runs sparse
+        recursions, which is what makes 8-20 state models affordable).
         """
         self.n_states = n_states or model_config.DEFAULT_N_STATES
         self.random_state = random_state if random_state is not None else model_config.RANDOM_STATE
+        self.init_method = init_method or model_config.INIT_METHOD
+        if self.init_method not in INIT_METHODS:
+            raise ValueError(f"Unknown init_method '{self.init_method}', expected one of {INIT_METHODS}")
+        self.fit_mode = fit_mode or model_config.FIT_MODE
+        if self.fit_mode not in ("direct", "staged"):
+            raise ValueError(f"Unknown fit_mode '{self.fit_mode}', expected 'direct' or 'staged'")
+        self.backend = get_backend(backend or model_config.INFERENCE_BACKEND)
+        self.transition_structure = transition_structure or model_config.TRANSITION_STRUCTURE
+        if self.transition_structure not in TRANSITION_STRUCTURES:
+            raise ValueError(f"Unknown transition_structure '{self.transition_structure}', "
+                             f"expected one of {TRANSITION_STRUCTURES}")
+        self.bandwidth = bandwidth or model_config.TRANSITION_BANDWIDTH
 
         
         logger.info(f"🤖 Initializing HMM with {self.n_states} states")
         
         self.model = hmm.GaussianHMM(
             n_components=self.n_states,
-            covariance_type=model_config.COVARIANCE_TYPE,
+            covariance_type=covariance_type or model_config.COVARIANCE_TYPE,
             n_iter=model_config.MAX_EM_ITERATIONS,
             random_state=self.random_state,
             tol=model_config.CONVERGENCE_TOLERANCE,
             verbose=False
         )
+        self.model.monitor_ = DeadlineMonitor(
+            self.model.tol, self.model.n_iter, self.model.verbose, model=self.model
+        )
         
         self.is_trained = False
         self.training_stats = {}
         self.regime_mapping = {}
+        self.online = None
     
-    def fit(self, features: np.ndarray, verbose: bool = True):
+    def fit(self, features: np.ndarray, verbose: bool = True,
+            deadline: float = None, time_budget: float = None,  # pyright: ignore[reportArgumentType]
+            lengths: list = None):  # pyright: ignore[reportArgumentType]
         """
         Step 5: Fit HMM using EM algorithm
+
+        lengths splits `features` into independent sequences (e.g. one per
+        ticker) that share a single set of parameters.
+
+        deadline (time.monotonic() seconds) or time_budget (seconds from now)
+        turn EM into an anytime algorithm: when time runs out, iteration
+        stops and the best-scoring parameters seen so far are kept.
         """
         if verbose:
             logger.info(f"🤖 Training HMM: {features.shape[0]} samples, {features.shape[1]} features, {self.n_states} states")
         
+        started = time.monotonic()
+        if time_budget is not None:
+            deadline = started + time_budget if deadline is None else min(deadline, started + time_budget)
+        monitor = self.model.monitor_
+
         # Train model
-        self.model.fit(features)
+        if self.fit_mode == "staged" and self.model.covariance_type == "full":
+            log_likelihood, stages, converged = self._fit_staged(features, deadline, lengths)
+        else:
+            self._initialize_parameters(features)
+            log_likelihood = self._run_em(features, deadline, lengths=lengths)
+            stages, converged = None, monitor.tol_converged
         
         # Calculate metrics
-        log_likelihood = self.model.score(features)
         n_params = self._count_parameters()
         n_samples = features.shape[0]
         
@@ -59,18 +186,221 @@ class RegimeDetector:
             'aic': aic,
             'bic': bic,
             'n_params': n_params,
-            'n_iter': self.model.monitor_.iter,
-            'converged': self.model.monitor_.converged
+            'n_iter': sum(st['n_iter'] for st in stages) if stages else monitor.iter,
+            'converged': converged,
+            'timed_out': monitor.timed_out,
+            'fit_seconds': time.monotonic() - started,
+            'log_likelihood_trace': [float(v) for v in monitor.history],
         }
+        if stages:
+            self.training_stats['fit_mode'] = "staged"
+            self.training_stats['stages'] = stages
         
         if verbose:
+            if monitor.timed_out:
+                logger.warning(f"   ⏱️ EM stopped at deadline after {monitor.iter} iterations")
             logger.info(f"   ✅ Converged: {self.training_stats['converged']}, "
                        f"Iterations: {self.training_stats['n_iter']}, "
                        f"BIC: {bic:.2f}")
         
         self.is_trained = True
         return self
-    
+
+    def refit_from(self, params: dict, features: np.ndarray, lengths: list = None,  # pyright: ignore[reportArgumentType]
+                   n_iter: int = None, deadline: float = None):  # pyright: ignore[reportArgumentType]
+        """
+        Warm-started EM: continue from `params` (get_model_params() of
+        another fit, e.g. on the original sample) instead of a fresh
+        initialization. Near a good optimum this needs a handful of
+        iterations, which is what makes bootstrap refits affordable.
+        """
+        started = time.monotonic()
+        self.model.n_features = features.shape[1]
+        self.model.startprob_ = np.asarray(params['start_probs'])
+        self.model.transmat_ = np.asarray(params['transition_matrix'])
+        self.model.means_ = np.asarray(params['means'])
+        set_covariances(self.model, np.asarray(params['covariances']))
+        self.model.init_params = ""
+        log_likelihood = self._run_em(features, deadline, n_iter=n_iter, lengths=lengths)
+
+        monitor = self.model.monitor_
+        self.training_stats = {
+            'log_likelihood': log_likelihood,
+            'n_iter': monitor.iter,
+            'converged': monitor.tol_converged,
+            'timed_out': monitor.timed_out,
+            'fit_seconds': time.monotonic() - started,
+        }
+        self.is_trained = True
+        return self
+
+    def _run_em(self, features: np.ndarray, deadline: float = None,  # pyright: ignore[reportArgumentType]
+                n_iter: int = None, lengths: list = None) -> float:  # pyright: ignore[reportArgumentType]
+        """
+        One EM run from the model's current initialization settings.
+        Returns the final log-likelihood (best snapshot if the deadline hit).
+        """
+        monitor = self.model.monitor_
+        monitor.deadline = deadline
+        n_iter = n_iter or model_config.MAX_EM_ITERATIONS
+        self.model.n_iter = monitor.n_iter = n_iter
+        try:
+            self.backend.fit(self.model, features, lengths)
+        finally:
+            self.model.n_iter = monitor.n_iter = model_config.MAX_EM_ITERATIONS
+
+        log_likelihood = self.score(features, lengths)
+        if monitor.timed_out and monitor.best_log_prob > log_likelihood:
+            # Last M-step made things worse (badly conditioned window) → roll back
+            monitor.restore(monitor.best_params)
+            log_likelihood = self.score(features, lengths)
+        return log_likelihood
+
+    def score(self, features: np.ndarray, lengths: list = None) -> float:  # pyright: ignore[reportArgumentType]
+        """Total log-likelihood; with lengths, the sum over independent sequences"""
+        if lengths is None:
+            return float(self.backend.score(self.model, features))
+        bounds = np.cumsum(lengths)[:-1]
+        return float(sum(self.backend.score(self.model, seq) for seq in np.split(features, bounds)))
+
+    def _fit_staged(self, features: np.ndarray, deadline: float = None,  # pyright: ignore[reportArgumentType]
+                    lengths: list = None) -> tuple:  # pyright: ignore[reportArgumentType]
+        """
+        Coarse-to-fine EM:
+          1. diagonal-covariance HMM on every STAGED_DECIMATION-th bar,
+          2. full-covariance EM on all bars, started from stage 1 and capped
+             at STAGED_MAX_REFINE_ITERATIONS.
+        Decimation changes the bar spacing, so stage 1's transition matrix
+        is only reused when no decimation is applied.
+
+        If refinement fails its sanity checks (did not converge within the
+        cap, or ends below the diagonal model's likelihood on the same data),
+        a direct full fit is run as well and the better of the two is kept.
+        Returns (log_likelihood, per-stage stats, converged).
+        """
+        monitor = self.model.monitor_
+        decimation = max(1, model_config.STAGED_DECIMATION)
+        stages = []
+
+        t0 = time.monotonic()
+        coarse = RegimeDetector(n_states=self.n_states, random_state=self.random_state,
+                                init_method=self.init_method, covariance_type="diag",
+                                fit_mode="direct", backend=self.backend.name,
+                                transition_structure=self.transition_structure,
+                                bandwidth=self.bandwidth)
+        # Decimation breaks sequence boundaries anyway; its transmat is discarded
+        coarse.fit(features[::decimation], verbose=False, deadline=deadline,
+                   lengths=lengths if decimation == 1 else None)
+        stages.append({
+            'stage': 'diag_prefit',
+            'n_samples': int(len(features[::decimation])),
+            'n_iter': coarse.training_stats['n_iter'],
+            'seconds': time.monotonic() - t0,
+            'log_likelihood': float(coarse.training_stats['log_likelihood']),
+        })
+
+        t0 = time.monotonic()
+        self.model.n_features = features.shape[1]
+        self.model.startprob_ = coarse.model.startprob_
+        self.model.transmat_ = (coarse.model.transmat_ if decimation == 1
+                                else self._initial_transmat())
+        self.model.means_ = coarse.model.means_
+        set_covariances(self.model, coarse.model.covars_)
+        self.model.init_params = ""
+        log_likelihood = self._run_em(features, deadline, n_iter=model_config.STAGED_MAX_REFINE_ITERATIONS,
+                                      lengths=lengths)
+        stages.append({
+            'stage': 'full_refine',
+            'n_samples': int(len(features)),
+            'n_iter': monitor.iter,
+            'seconds': time.monotonic() - t0,
+            'log_likelihood': float(log_likelihood),
+        })
+        converged = monitor.tol_converged
+
+        diag_log_likelihood = coarse.score(features, lengths)
+        refine_ok = monitor.tol_converged and monitor.iter < model_config.STAGED_MAX_REFINE_ITERATIONS
+        if not monitor.timed_out and (not refine_ok or log_likelihood < diag_log_likelihood):
+            logger.warning("   ⚠️ Staged refinement looks off, running a direct full fit as fallback")
+            refined = monitor.snapshot()
+            t0 = time.monotonic()
+            self._initialize_parameters(features)
+            direct_log_likelihood = self._run_em(features, deadline, lengths=lengths)
+            stages.append({
+                'stage': 'direct_fallback',
+                'n_samples': int(len(features)),
+                'n_iter': monitor.iter,
+                'seconds': time.monotonic() - t0,
+                'log_likelihood': float(direct_log_likelihood),
+                'kept': bool(direct_log_likelihood >= log_likelihood),
+            })
+            if direct_log_likelihood >= log_likelihood:
+                log_likelihood = direct_log_likelihood
+                converged = monitor.tol_converged
+            else:
+                monitor.restore(refined)
+
+        return log_likelihood, stages, converged
+
+    def _initialize_parameters(self, features: np.ndarray):
+        """
+        Seed EM with a custom initializer, or leave it to hmmlearn ("kmeans").
+        """
+        if self.init_method == "kmeans":
+            self.model.init_params = "stmc"
+            if self.transition_structure == "dense":
+                return
+            # hmmlearn's k-means seeding now, so the band can be laid over it
+            self.model._init(features)
+            params = {'means': self.model.means_, 'covars': self.model.covars_}
+        elif self.init_method == "quantile":
+            params = quantile_init(features, self.n_states, min_covar=self.model.min_covar)
+        else:
+            params = kmeanspp_subsample_init(
+                features, self.n_states,
+                subsample_size=model_config.INIT_SUBSAMPLE_SIZE,
+                random_state=self.random_state,
+                min_covar=self.model.min_covar,
+            )
+
+        means, covars = params['means'], params['covars']
+        if self.transition_structure == "banded":
+            order = principal_order(means)
+            means, covars = means[order], covars[order]
+
+        self.model.n_features = features.shape[1]
+        self.model.startprob_ = np.full(self.n_states, 1.0 / self.n_states)
+        self.model.transmat_ = self._initial_transmat()
+        self.model.means_ = means
+        set_covariances(self.model, covars)
+        self.model.init_params = ""
+
+    def _initial_transmat(self) -> np.ndarray:
+        """Sticky starting matrix; its zeros fix the transition structure for EM"""
+        if self.transition_structure == "banded":
+            return banded_transmat(self.n_states, model_config.INIT_STICKY_PROB, self.bandwidth)
+        return sticky_transmat(self.n_states, model_config.INIT_STICKY_PROB)
+
+    def enable_online_updates(self, history: np.ndarray, decay: float = None,  # pyright: ignore[reportArgumentType]
+                              refit_every: int = None):  # pyright: ignore[reportArgumentType]
+        """
+        Switch to online EM: later bars go through partial_fit() instead of
+        a full refit. `history` is the (scaled) data the model was fit on.
+        """
+        from app.engine.online_em import OnlineEM
+
+        self.online = OnlineEM(self, history, decay=decay, refit_every=refit_every)
+        return self.online
+
+    def partial_fit(self, features: np.ndarray) -> np.ndarray:
+        """
+        Update parameters with new (scaled) bars in O(K²) per bar.
+        Returns the filtered state probabilities of the new bars.
+        """
+        if self.online is None:
+            raise ValueError("Online mode is off! Call enable_online_updates() trước.")
+        return self.online.update_many(features)
+
     def _count_parameters(self) -> int:
         """Count total HMM parameters"""
         n = self.n_states
@@ -89,7 +419,9 @@ class RegimeDetector:
         else:
             cov_params = n * d  # safe fallback
 
-        n_params = n * (n - 1) + (n - 1) + n * d + cov_params
+        # Free transition probabilities: allowed moves minus one per row
+        trans_params = np.count_nonzero(self._initial_transmat()) - n
+        n_params = trans_params + (n - 1) + n * d + cov_params
         return n_params
     
     def predict_states(self, features: np.ndarray) -> np.ndarray:
@@ -100,76 +432,107 @@ class RegimeDetector:
             raise ValueError("Model chưa được train! Call fit() trước.")
         
         logger.info("🔮 Decoding states with Viterbi...")
-        states = self.model.predict(features)
+        states = self.backend.decode(self.model, features)
         
         logger.info(f"   ✅ Decoded {len(states)} states, unique: {np.unique(states)}")
         return states
-    
+
+    def predict_states_batch(self, windows: np.ndarray) -> np.ndarray:
+        """
+        Viterbi-decode N equal-length (scaled) windows at once.
+        windows: (N, T, d) → (N, T) states. Vectorized with the numpy backend.
+        """
+        if not self.is_trained:
+            raise ValueError("Model chưa được train! Call fit() trước.")
+        return self.backend.decode(self.model, np.asarray(windows))
+
+    def predict_filtered_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Causal state probabilities P(s_t | x_1..x_t) via the forward pass.
+        Unlike Viterbi / predict_proba, row t never looks at bars after t,
+        so it is safe to trade on.
+        """
+        log_filtered, _ = self._forward_filter(features)
+        return np.exp(log_filtered)
+
+    def conditional_log_likelihood(self, features: np.ndarray) -> np.ndarray:
+        """
+        Per-bar predictive log-likelihood log p(x_t | x_1..x_t-1).
+        Sums to model.score(features); a drop on recent bars means the
+        model no longer explains incoming data.
+        """
+        _, log_norms = self._forward_filter(features)
+        return log_norms
+
+    def _forward_filter(self, features: np.ndarray) -> tuple:
+        """Normalized forward recursion → (log filtered probs, log normalizers)"""
+        if not self.is_trained:
+            raise ValueError("Model chưa được train! Call fit() trước.")
+        return self.backend.forward_filter(self.model, features)
+
     def assign_regime_meaning(self, df: pd.DataFrame, states: np.ndarray) -> dict:
         """
         Step 7: Assign semantic meaning (Bear/Bull/Sideways) to states
         based on average returns
         """
         logger.info("🏷️  Assigning regime meanings...")
-        
-        df_copy = df.copy()
-        df_copy['State'] = states
-        
-        # Calculate stats for each state
-        state_stats = {}
-        for state in range(self.n_states):
-            state_data = df_copy[df_copy['State'] == state]
-            
-            if len(state_data) > 0:
-                state_stats[state] = {
-                    'count': len(state_data),
-                    'mean_return': state_data['Log_Return'].mean(),
-                    'std_return': state_data['Log_Return'].std(),
-                    'mean_volatility': state_data['Volatility'].mean(),
-                    'std_volatility': state_data['Volatility'].std(),
-                }
-            else:
-                state_stats[state] = {
-                    'count': 0,
-                    'mean_return': 0,
-                    'std_return': 0,
-                    'mean_volatility': 0,
-                    'std_volatility': 0,
-                }
-        
-        # Sort states by mean return (low to high)
-        sorted_states = sorted(state_stats.items(), 
-                              key=lambda x: x[1]['mean_return'])
-        
-        # Assign labels based on n_states
-        self.regime_mapping = {}
-        
-        if self.n_states == 2:
-            self.regime_mapping = {
-                sorted_states[0][0]: "Bear",
-                sorted_states[1][0]: "Bull"
-            }
-        elif self.n_states == 3:
-            self.regime_mapping = {
-                sorted_states[0][0]: "Bear",
-                sorted_states[1][0]: "Sideways",
-                sorted_states[2][0]: "Bull"
+
+        # Per-state count / mean / sample std of each column in one
+        # bincount pass (NaNs skipped like pandas), whatever K is
+        states = np.asarray(states, dtype=np.int64)
+        K = self.n_states
+
+        def moments(values: np.ndarray) -> tuple:
+            valid = np.isfinite(values)
+            v = np.where(valid, values, 0.0)
+            n = np.bincount(states, weights=valid, minlength=K)
+            total = np.bincount(states, weights=v, minlength=K)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = total / n
+                var = (np.bincount(states, weights=v * v, minlength=K) - n * mean ** 2) / (n - 1)
+            std = np.sqrt(np.clip(var, 0.0, None))
+            std[n < 2] = np.nan
+            return mean, std
+
+        counts = np.bincount(states, minlength=K)
+        mean_return, std_return = moments(df['Log_Return'].to_numpy(dtype=np.float64))
+        mean_volatility, std_volatility = moments(df['Volatility'].to_numpy(dtype=np.float64))
+        empty = counts == 0
+        for arr in (mean_return, std_return, mean_volatility, std_volatility):
+            arr[empty] = 0
+
+        state_stats = {
+            state: {
+                'count': int(counts[state]),
+                'mean_return': float(mean_return[state]),
+                'std_return': float(std_return[state]),
+                'mean_volatility': float(mean_volatility[state]),
+                'std_volatility': float(std_volatility[state]),
             }
-        elif self.n_states == 4:
-            # For 4 states, consider volatility too
-            mid_states = sorted(sorted_states[1:3], 
-                              key=lambda x: x[1]['mean_volatility'])
+            for state in range(K)
+        }
+
+        # States by mean return (low to high); ties keep state order
+        by_return = np.argsort(mean_return, kind="stable")
+        named = {
+            2: ["Bear", "Bull"],
+            3: ["Bear", "Sideways", "Bull"],
+        }
+        if K in named:
+            self.regime_mapping = {int(state): name for state, name in zip(by_return, named[K])}
+        elif K == 4:
+            # For 4 states, the middle two are split by volatility
+            mid = by_return[1:3][np.argsort(mean_volatility[by_return[1:3]], kind="stable")]
             self.regime_mapping = {
-                sorted_states[0][0]: "Bear",
-                mid_states[0][0]: "Low_Volatility",
-                mid_states[1][0]: "High_Volatility", 
-                sorted_states[3][0]: "Bull"
+                int(by_return[0]): "Bear",
+                int(mid[0]): "Low_Volatility",
+                int(mid[1]): "High_Volatility",
+                int(by_return[3]): "Bull",
             }
         else:
-            # Generic naming for n>4
-            for i, (state, _) in enumerate(sorted_states):
-                self.regime_mapping[state] = f"Regime_{i}"
-        
+            # Generic naming for n>4: rank by mean return
+            self.regime_mapping = {int(state): f"Regime_{rank}" for rank, state in enumerate(by_return)}
+
         logger.info(f"   ✅ Mapped: {self.regime_mapping}")
         return state_stats
     
@@ -180,48 +543,30 @@ class RegimeDetector:
         """
         logger.info("✅ Validating persistence...")
         
-        # Count regime switches
-        n_switches = np.sum(np.diff(states) != 0)
-        
-        # Calculate regime durations
-        regime_lengths = []
-        current_length = 1
-        
-        for i in range(1, len(states)):
-            if states[i] == states[i-1]:
-                current_length += 1
-            else:
-                regime_lengths.append(current_length)
-                current_length = 1
-        regime_lengths.append(current_length)
-        
+        # Runs of identical states (RLE): one pass, no per-bar Python loop
+        states = np.asarray(states)
+        change = np.flatnonzero(np.diff(states)) + 1
+        n_switches = len(change)
+        run_starts = np.concatenate([[0], change])
+        regime_lengths = np.diff(np.append(run_starts, len(states)))
+        run_states = states[run_starts].astype(np.int64)
+
         avg_duration = np.mean(regime_lengths)
         min_duration = np.min(regime_lengths)
         max_duration = np.max(regime_lengths)
         median_duration = np.median(regime_lengths)
         persistence_score = avg_duration / len(states)
-        
+
         # Calculate duration by regime
-        duration_by_regime = {}
-        current_state = states[0]
-        current_dur = 1
-        durations_dict = {i: [] for i in range(self.n_states)}
-        
-        for i in range(1, len(states)):
-            if states[i] == current_state:
-                current_dur += 1
-            else:
-                durations_dict[current_state].append(current_dur)
-                current_state = states[i]
-                current_dur = 1
-        durations_dict[current_state].append(current_dur)
-        
-        for state in range(self.n_states):
-            if len(durations_dict[state]) > 0:
-                duration_by_regime[self.regime_mapping[state]] = {
-                    'avg': np.mean(durations_dict[state]),
-                    'count': len(durations_dict[state])
-                }
+        run_counts = np.bincount(run_states, minlength=self.n_states)
+        run_totals = np.bincount(run_states, weights=regime_lengths, minlength=self.n_states)
+        duration_by_regime = {
+            self.regime_mapping[state]: {
+                'avg': float(run_totals[state] / run_counts[state]),
+                'count': int(run_counts[state]),
+            }
+            for state in np.flatnonzero(run_counts).tolist()
+        }
         
         # Quality assessment using config thresholds
         if persistence_score > model_config.GOOD_PERSISTENCE_THRESHOLD:
@@ -272,14 +617,21 @@ class HMMPredictor:
         self.state_stats = state_stats
         self.regime_mapping = detector.regime_mapping
     
-    def predict_next_proba(self, features: np.ndarray) -> np.ndarray:
+    def predict_current_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        State distribution at the last bar. Smoothing has no future bars
+        to use there, so this is also the filtered (causal) distribution.
+        """
+        return self.detector.backend.posteriors(self.model, features)[-1]
+
+    def predict_next_proba(self, features: np.ndarray,
+                           current_prob: np.ndarray = None) -> np.ndarray:  # pyright: ignore[reportArgumentType]
         """
         Predict probability distribution for next state
         Formula: P(s_t+1) = P(s_t) @ A (transition matrix)
         """
         # Get current state probabilities
-        state_probs = self.model.predict_proba(features)
-        last_prob = state_probs[-1]
+        last_prob = current_prob if current_prob is not None else self.predict_current_proba(features)
         
         # Apply transition matrix
         A = self.model.transmat_
@@ -294,7 +646,8 @@ class HMMPredictor:
         """
         logger.info("🔮 Predicting t+1...")
         
-        next_prob = self.predict_next_proba(features)
+        current_prob = self.predict_current_proba(features)
+        next_prob = self.predict_next_proba(features, current_prob)
         next_state = int(np.argmax(next_prob))
         next_regime = self.regime_mapping[next_state]
         
@@ -305,15 +658,9 @@ class HMMPredictor:
         }
         
         # Calculate expected return and volatility
-        expected_return = sum(
-            next_prob[i] * self.state_stats[i]['mean_return']
-            for i in range(len(next_prob))
-        )
-        
-        expected_vol = sum(
-            next_prob[i] * self.state_stats[i]['mean_volatility']
-            for i in range(len(next_prob))
-        )
+        state_means = np.array([[self.state_stats[i]['mean_return'], self.state_stats[i]['mean_volatility']]
+                                for i in range(len(next_prob))])
+        expected_return, expected_vol = next_prob @ state_means
         
         confidence = float(np.max(next_prob))
         
@@ -325,7 +672,10 @@ class HMMPredictor:
             'state_probabilities': regime_probs,
             'expected_return': float(expected_return),
             'expected_volatility': float(expected_vol),
-            'confidence': confidence
+            'confidence': confidence,
+            'current_probabilities': {
+                self.regime_mapping[i]: float(prob) for i, prob in enumerate(current_prob)
+            },
         }
 
 
@@ -0,0 +1,106 @@
+# app/engine/initialization.py
+"""
+Cheap EM starting points for GaussianHMM.
+
+hmmlearn's default initialization runs KMeans (n_init=10) over the full
+training matrix on every fit. These initializers seed means/covariances
+from a small stratified subsample or from Log_Return quantiles instead,
+and start EM from a sticky transition matrix — dense, or banded so that a
+state can only move to its `bandwidth` nearest neighbours along the
+principal axis of the state means (EM keeps the zeros, which is what lets
+large-K models use the sparse recursions).
+"""
+import logging
+import numpy as np
+from sklearn.cluster import KMeans
+
+logger = logging.getLogger(__name__)
+
+INIT_METHODS = ("kmeans", "kmeans++_subsample", "quantile")
+TRANSITION_STRUCTURES = ("dense", "banded")
+
+
+def sticky_transmat(n_states: int, stay_prob: float) -> np.ndarray:
+    """Transition matrix with `stay_prob` on the diagonal, the rest spread evenly"""
+    if n_states == 1:
+        return np.ones((1, 1))
+    transmat = np.full((n_states, n_states), (1.0 - stay_prob) / (n_states - 1))
+    np.fill_diagonal(transmat, stay_prob)
+    return transmat
+
+
+def banded_transmat(n_states: int, stay_prob: float, bandwidth: int) -> np.ndarray:
+    """
+    Sticky transition matrix whose off-diagonal mass is spread evenly over
+    the states at most `bandwidth` positions away; all others stay at 0
+    """
+    distance = np.abs(np.subtract.outer(np.arange(n_states), np.arange(n_states)))
+    band = (distance > 0) & (distance <= bandwidth)
+    n_out = band.sum(axis=1, keepdims=True)
+    transmat = np.where(band, (1.0 - stay_prob) / np.maximum(n_out, 1), 0.0)
+    np.fill_diagonal(transmat, np.where(n_out[:, 0] > 0, stay_prob, 1.0))
+    return transmat
+
+
+def principal_order(means: np.ndarray) -> np.ndarray:
+    """
+    State order along the first principal axis of the state means, oriented
+    so the first feature (Log_Return) increases: neighbours in this order
+    are the similar regimes a banded matrix connects.
+    """
+    centred = means - means.mean(axis=0)
+    _, _, vt = np.linalg.svd(centred, full_matrices=False)
+    axis = vt[0] if vt[0][0] >= 0 else -vt[0]
+    return np.argsort(centred @ axis, kind="stable")
+
+
+def stratified_subsample(n_samples: int, size: int, rng: np.random.Generator) -> np.ndarray:
+    """One random bar from each of `size` equal time strata (keeps every era represented)"""
+    if n_samples <= size:
+        return np.arange(n_samples)
+    edges = np.linspace(0, n_samples, size + 1).astype(int)
+    return edges[:-1] + (rng.random(size) * np.diff(edges)).astype(int)
+
+
+def _cluster_covariances(X: np.ndarray, labels: np.ndarray, n_states: int, min_covar: float) -> np.ndarray:
+    """Per-cluster full covariances; tiny clusters fall back to the global covariance"""
+    d = X.shape[1]
+    global_cov = np.atleast_2d(np.cov(X.T))
+    covars = np.empty((n_states, d, d))
+    for k in range(n_states):
+        members = X[labels == k]
+        covars[k] = np.atleast_2d(np.cov(members.T)) if len(members) > d + 1 else global_cov
+    return covars + min_covar * np.eye(d)[None, :, :]
+
+
+def kmeanspp_subsample_init(X: np.ndarray, n_states: int, subsample_size: int,
+                            random_state: int, min_covar: float = 1e-3) -> dict:
+    """
+    k-means++ + Lloyd on a stratified subsample, then one assignment pass
+    over the full matrix to estimate per-state covariances.
+    """
+    rng = np.random.default_rng(random_state)
+    idx = stratified_subsample(len(X), subsample_size, rng)
+
+    kmeans = KMeans(n_clusters=n_states, init="k-means++", n_init=1,
+                    max_iter=50, random_state=random_state)
+    kmeans.fit(X[idx])
+    means = kmeans.cluster_centers_
+
+    labels = ((X[:, None, :] - means[None, :, :]) ** 2).sum(axis=-1).argmin(axis=1)
+    return {'means': means, 'covars': _cluster_covariances(X, labels, n_states, min_covar)}
+
+
+def quantile_init(X: np.ndarray, n_states: int, return_col: int = 0,
+                  min_covar: float = 1e-3) -> dict:
+    """
+    Sort bars by the return feature and cut into n_states equal-count bins
+    (Bear ... Bull); each bin's moments seed one state. No clustering at all.
+    """
+    order = np.argsort(X[:, return_col], kind="stable")
+    labels = np.empty(len(X), dtype=int)
+    for k, chunk in enumerate(np.array_split(order, n_states)):
+        labels[chunk] = k
+
+    means = np.array([X[labels == k].mean(axis=0) for k in range(n_states)])
+    return {'means': means, 'covars': _cluster_covariances(X, labels, n_states, min_covar)}
@@ -12,6 +12,11 @@ class ModelConfig:
     # --- Feature Engineering Parameters ---
     # Lookback window for rolling volatility to filter out high-frequency noise
     VOLATILITY_WINDOW = 60 
+    # Multi-ticker panels: longest gap bridged by carrying the last close,
+    # share of a rolling window that must be real bars, cached panels kept
+    PANEL_MAX_FFILL = 3
+    PANEL_MIN_COVERAGE = 0.8
+    PANEL_CACHE_SIZE = 16
     
     # --- HMM Hyperparameters ---
     # Optimal state count for financial markets: typically Bear, Sideways, and Bull
@@ -19,7 +24,49 @@ class ModelConfig:
     COVARIANCE_TYPE = "full"  # Allows for more complex relationship between features
     MAX_EM_ITERATIONS = 1000  # Maximum Expectation-Maximization cycles
     CONVERGENCE_TOLERANCE = 1e-4
+    # Inference backend: "hmmlearn" (compiled, per sequence) or "numpy"
+    # (log-space, batched over sequences × time × states)
+    INFERENCE_BACKEND = "hmmlearn"
+    # EM starting point: "kmeans" (hmmlearn default); "kmeans++_subsample"
+    # and "quantile" are opt-in (compare with benchmarks/bench_initialization.py)
+    INIT_METHOD = "kmeans"
+    INIT_SUBSAMPLE_SIZE = 500  # bars drawn (one per time stratum) for k-means++
+    INIT_STICKY_PROB = 0.95    # initial self-transition probability for custom inits
+    # "dense" or "banded": with many fine-grained states, a banded matrix
+    # lets each state reach only its TRANSITION_BANDWIDTH nearest neighbours
+    # (fewer parameters, O(K·bandwidth) instead of O(K²) recursions)
+    TRANSITION_STRUCTURE = "dense"
+    TRANSITION_BANDWIDTH = 2
+    # "direct" = one full-covariance EM; "staged" = diagonal prefit on a
+    # decimated series, then a short full-covariance refinement
+    FIT_MODE = "direct"
+    STAGED_DECIMATION = 2
+    STAGED_MAX_REFINE_ITERATIONS = 100
+    # Share of an /analyze latency budget given to the main fit; the rest
+    # (minus preprocessing) is split across walk-forward folds
+    MAIN_FIT_BUDGET_SHARE = 0.3
     RANDOM_STATE = 42
+    # Precision of feature arrays, scaled features and (numpy backend)
+    # emission log-densities: "float64" or "float32" (half the memory and
+    # bandwidth). Forward/backward accumulation always runs in float64.
+    COMPUTE_DTYPE = "float64"
+    
+    # --- Online / Incremental EM ---
+    # Per-bar decay of sufficient statistics (effective memory ≈ 1 / (1 - decay) bars)
+    ONLINE_EM_DECAY = 0.995
+    # Full EM refit on the retained history after this many online updates
+    ONLINE_REFIT_EVERY = 20
+    
+    # --- Drift-Triggered Refit Policy ---
+    # Refit when new bars fit worse than training bars by this many nats/bar
+    REFIT_LL_DROP_THRESHOLD = 1.0
+    # Refit when new bars sit this far (avg, in std units) from every state mean
+    REFIT_MAHALANOBIS_THRESHOLD = 3.0
+    # CUSUM slack (k) and decision interval (h) on z-scored features
+    REFIT_CUSUM_K = 0.5
+    REFIT_CUSUM_H = 8.0
+    # Refit regardless of drift after this many unseen bars
+    REFIT_MAX_STALE_BARS = 60
     
     # --- Automated Model Selection (AIC/BIC) ---
     MIN_N_STATES = 2
@@ -36,6 +83,21 @@ class ModelConfig:
     # --- Data Windowing ---
     # Limits training to the most recent window to account for market structural shifts
     MAX_TRAINING_DAYS = 2520
+    # Streaming CSV ingestion: rows per chunk, and the most recent rows
+    # handed to walk-forward validation (bounds memory on intraday files)
+    STREAM_CHUNK_ROWS = 100_000
+    WALK_FORWARD_MAX_ROWS = 100_000
+
+    # --- Bootstrap Confidence Intervals ---
+    # Stationary block bootstrap: replicates, mean block length (bars) and
+    # two-sided percentile interval level. Blocks should outlast a typical
+    # regime; each block is a separate EM sequence, so short blocks also
+    # make every refit slower. Refits start from the base fit, so a few EM
+    # iterations usually suffice.
+    BOOTSTRAP_REPLICATES = 200
+    BOOTSTRAP_MEAN_BLOCK = 50
+    BOOTSTRAP_CONFIDENCE = 0.90
+    BOOTSTRAP_MAX_ITER = 50
     
     # --- Semantic Regime Mapping ---
     # Maps latent HMM states to financial terminology based on mean return/volatility
@@ -63,8 +125,42 @@ class ModelConfig:
     
     # --- Data Normalization ---
     FEATURES = ["Log_Return", "Volatility"]
+    # Named feature sets selectable per request (see app/engine/feature_bank.py)
+    FEATURE_SETS = {
+        "default": ["Log_Return", "Volatility"],
+        "range": ["Log_Return", "Parkinson_Vol_20", "Garman_Klass_Vol_20"],
+        "multiscale": ["Log_Return", "Realized_Vol_5", "Realized_Vol_20", "Realized_Vol_60"],
+        "extended": ["Log_Return", "Volatility", "Garman_Klass_Vol_20", "Volume_Z_20", "Drawdown_60"],
+    }
     SCALING_METHOD = "standard"  # Z-score normalization for stationary features
+
+    # Settings that never change what a fit on given data returns (panels,
+    # streaming, budgets, online updates, refit policy, bootstrap). Every
+    # other setting is part of fit_fingerprint().
+    _NON_FIT_SETTINGS = frozenset({
+        "PANEL_MAX_FFILL", "PANEL_MIN_COVERAGE", "PANEL_CACHE_SIZE", "MAIN_FIT_BUDGET_SHARE",
+        "ONLINE_EM_DECAY", "ONLINE_REFIT_EVERY", "REFIT_LL_DROP_THRESHOLD",
+        "REFIT_MAHALANOBIS_THRESHOLD", "REFIT_CUSUM_K", "REFIT_CUSUM_H", "REFIT_MAX_STALE_BARS",
+        "STREAM_CHUNK_ROWS", "WALK_FORWARD_MAX_ROWS", "BOOTSTRAP_REPLICATES",
+        "BOOTSTRAP_MEAN_BLOCK", "BOOTSTRAP_CONFIDENCE", "BOOTSTRAP_MAX_ITER",
+    })
     
+    def get_compute_dtype(self) -> str:
+        """Validated COMPUTE_DTYPE (usable directly as a numpy dtype)"""
+        if self.COMPUTE_DTYPE not in ("float32", "float64"):
+            raise ValueError(f"COMPUTE_DTYPE must be 'float32' or 'float64', got '{self.COMPUTE_DTYPE}'")
+        return self.COMPUTE_DTYPE
+
+    def fit_fingerprint(self) -> dict:
+        """
+        {name: value} of every setting that can change a fit, for cache
+        keys. Collected by exclusion, so a newly added setting invalidates
+        cached fits instead of being silently left out of the key.
+        """
+        self.get_compute_dtype()
+        return {name: getattr(self, name) for name in dir(self)
+                if name.isupper() and not name.startswith("_") and name not in self._NON_FIT_SETTINGS}
+
     @classmethod
     def get_config_summary(cls) -> dict:
         """
@@ -77,6 +173,7 @@ class ModelConfig:
             "good_threshold": cls.GOOD_PERSISTENCE_THRESHOLD,
             "moderate_threshold": cls.MODERATE_PERSISTENCE_THRESHOLD,
             "features": cls.FEATURES,
+            "compute_dtype": cls.COMPUTE_DTYPE,
         }
 
 # Singleton instance for global access across the engine
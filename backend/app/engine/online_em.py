@@ -0,0 +1,190 @@
+# app/engine/online_em.py
+import logging
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.special import logsumexp
+from app.engine.hmm_model import RegimeDetector, set_covariances
+from app.engine.model_config import model_config
+
+logger = logging.getLogger(__name__)
+
+
+def align_states(ref_means: np.ndarray, means: np.ndarray) -> np.ndarray:
+    """
+    Permutation `perm` such that means[perm[k]] is the state matching
+    ref_means[k] (Hungarian match on squared centroid distance).
+    """
+    cost = ((ref_means[:, None, :] - means[None, :, :]) ** 2).sum(axis=-1)
+    _, perm = linear_sum_assignment(cost)
+    return perm
+
+
+def parameter_drift(params_a: dict, params_b: dict) -> dict:
+    """
+    Distance between two sets of HMM parameters (as returned by
+    RegimeDetector.get_model_params) after aligning state labels.
+    """
+    perm = align_states(params_a['means'], params_b['means'])
+    means_b = params_b['means'][perm]
+    covars_b = params_b['covariances'][perm]
+    transmat_b = params_b['transition_matrix'][np.ix_(perm, perm)]
+
+    return {
+        'max_mean_diff': float(np.abs(params_a['means'] - means_b).max()),
+        'max_covar_diff': float(np.abs(params_a['covariances'] - covars_b).max()),
+        'max_transmat_diff': float(np.abs(params_a['transition_matrix'] - transmat_b).max()),
+        'state_permutation': perm.tolist(),
+    }
+
+
+class OnlineEM:
+    """
+    Incremental EM for a trained RegimeDetector.
+
+    Keeps exponentially decayed sufficient statistics (state occupancy,
+    first/second moments, transition counts) and the forward-filtered state
+    belief. Each new bar costs O(K² + K·d²): one forward step, one E-step on
+    the (prev state, state) pair and a closed-form M-step. A full EM refit
+    over the retained history runs every `refit_every` bars, and the drift
+    between the online parameters and that refit is recorded. The last
+    `max_history` bars are kept in a preallocated ring buffer.
+
+    Features must already be scaled with the scaler used for the base fit.
+    """
+
+    def __init__(self, detector: RegimeDetector, history: np.ndarray,
+                 decay: float = None, refit_every: int = None,  # pyright: ignore[reportArgumentType]
+                 max_history: int = None):  # pyright: ignore[reportArgumentType]
+        if not detector.is_trained:
+            raise ValueError("RegimeDetector must be trained first!")
+
+        self.detector = detector
+        self.model = detector.model
+        self.decay = decay or model_config.ONLINE_EM_DECAY
+        self.refit_every = refit_every or model_config.ONLINE_REFIT_EVERY
+        self.max_history = max_history or model_config.MAX_TRAINING_DAYS
+
+        # Retained bars in a fixed ring buffer: appending a bar is O(d)
+        history = np.asarray(history, dtype=float)[-self.max_history:]
+        self._ring = np.empty((self.max_history, history.shape[1]))
+        self._ring[:len(history)] = history
+        self._size = len(history)
+        self._head = len(history) % self.max_history   # next write position
+        self.bars_since_refit = 0
+        self.n_updates = 0
+        self.drift_log = []
+
+        self._seed_statistics()
+
+    @property
+    def history(self) -> np.ndarray:
+        """Retained bars in time order (a copy once the ring has wrapped)"""
+        if self._size < self.max_history:
+            return self._ring[:self._size]
+        return np.concatenate([self._ring[self._head:], self._ring[:self._head]])
+
+    def _append(self, x: np.ndarray):
+        self._ring[self._head] = x
+        self._head = (self._head + 1) % self.max_history
+        self._size = min(self._size + 1, self.max_history)
+
+    def _seed_statistics(self):
+        """Initialize decayed statistics from smoothed posteriors of the history"""
+        X = self.history
+        n = len(X)
+        weights = self.decay ** np.arange(n - 1, -1, -1)
+
+        posteriors = self.detector.backend.posteriors(self.model, X)
+        wpost = posteriors * weights[:, None]
+
+        self.s_post = wpost.sum(axis=0)
+        self.s_obs = wpost.T @ X
+        self.s_obs2 = np.einsum('tk,ti,tj->kij', wpost, X, X)
+        # Expected transition counts consistent with the current transmat_
+        self.s_trans = self.model.transmat_ * wpost[:-1].sum(axis=0)[:, None]
+
+        self.log_alpha = np.log(np.maximum(self.detector.predict_filtered_proba(X)[-1], 1e-300))
+
+    def update(self, x: np.ndarray) -> dict:
+        """
+        Absorb one new (scaled) bar and return its filtered state probabilities.
+        """
+        x = np.asarray(x, dtype=float).reshape(1, -1)
+        log_b = self.model._compute_log_likelihood(x)[0]
+        log_A = np.log(np.maximum(self.model.transmat_, 1e-300))
+
+        # E-step on the newest transition: xi(i, j) ∝ alpha_{t-1}(i) A_ij b_t(j)
+        log_xi = self.log_alpha[:, None] + log_A + log_b[None, :]
+        log_norm = logsumexp(log_xi)
+        xi = np.exp(log_xi - log_norm)
+        gamma = xi.sum(axis=0)
+
+        lam = self.decay
+        self.s_trans = lam * self.s_trans + xi
+        self.s_post = lam * self.s_post + gamma
+        self.s_obs = lam * self.s_obs + gamma[:, None] * x
+        self.s_obs2 = lam * self.s_obs2 + gamma[:, None, None] * (x.T @ x)[None, :, :]
+
+        self._do_mstep()
+
+        self.log_alpha = np.log(np.maximum(gamma, 1e-300))
+        self._append(x[0])
+        self.n_updates += 1
+        self.bars_since_refit += 1
+        self.detector.training_stats['online_updates'] = self.n_updates
+
+        if self.bars_since_refit >= self.refit_every:
+            self.refit()
+
+        return {'filtered_proba': gamma, 'log_likelihood': float(log_norm)}
+
+    def update_many(self, X: np.ndarray) -> np.ndarray:
+        """Absorb a block of bars in order; returns (n, K) filtered probabilities"""
+        return np.array([self.update(x)['filtered_proba'] for x in np.asarray(X)])
+
+    def _do_mstep(self):
+        """Closed-form M-step from the decayed statistics"""
+        post = np.maximum(self.s_post, 1e-10)
+
+        transmat = self.s_trans / np.maximum(self.s_trans.sum(axis=1, keepdims=True), 1e-10)
+        means = self.s_obs / post[:, None]
+        covars = (self.s_obs2 / post[:, None, None]
+                  - np.einsum('ki,kj->kij', means, means))
+        covars += self.model.min_covar * np.eye(means.shape[1])[None, :, :]
+
+        self.model.transmat_ = transmat
+        self.model.means_ = means
+        set_covariances(self.model, covars, weights=post)
+
+    def refit(self) -> dict:
+        """
+        Full EM refit on the retained history. Records how far the online
+        parameters had drifted from the refit before adopting it.
+        """
+        online_params = {k: np.array(v) for k, v in self.detector.get_model_params().items()}
+
+        logger.info(f"🔁 Scheduled full refit after {self.bars_since_refit} online updates "
+                    f"({len(self.history)} bars)")
+        self.detector.fit(self.history, verbose=False)
+
+        drift = parameter_drift(self.detector.get_model_params(), online_params)
+        drift['n_online_updates'] = self.bars_since_refit
+        self.drift_log.append(drift)
+        self.detector.training_stats['online_drift'] = drift
+
+        logger.info(f"   Online vs refit drift: means={drift['max_mean_diff']:.4f}, "
+                    f"transmat={drift['max_transmat_diff']:.4f}")
+
+        self.bars_since_refit = 0
+        self._seed_statistics()
+        return drift
+
+    def drift_against_refit(self) -> dict:
+        """
+        Compare the current online parameters against a fresh full fit on the
+        same history without replacing them (audit / monitoring).
+        """
+        reference = RegimeDetector(n_states=self.detector.n_states,
+                                   random_state=self.detector.random_state)
+        reference.fit(self.history, verbose=False)
+        return parameter_drift(reference.get_model_params(), self.detector.get_model_params())
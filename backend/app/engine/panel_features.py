@@ -0,0 +1,169 @@
+# app/engine/panel_features.py
+"""
+Date-aligned multi-ticker feature tensor.
+
+Every ticker is put on one shared trading calendar and all rolling
+statistics run along the time axis for all assets at once, so the
+result is a single contiguous (assets × time × features) float array
+plus an (assets × time) validity mask.
+
+Gap handling:
+    - calendar="union": every date any ticker traded; "intersection":
+      only dates every ticker traded.
+    - A ticker missing a calendar date carries its last close forward for
+      up to `max_ffill` bars. Carried bars are masked out, and the first
+      real bar after the gap gets the whole multi-day log return.
+    - Longer gaps (and dates before listing / after delisting) stay masked.
+    - Rolling windows use only valid bars and need `min_coverage` of the
+      window to be valid.
+Masked entries are 0.0 in the tensor; always use the mask. The tensor
+dtype follows ModelConfig.COMPUTE_DTYPE.
+"""
+import logging
+import numpy as np
+import pandas as pd
+from app.engine.features import FeatureEngine
+from app.engine.model_config import model_config
+
+logger = logging.getLogger(__name__)
+
+CALENDARS = ("union", "intersection")
+
+
+def align_close_panel(frames: dict, calendar: str = "union",
+                      max_ffill: int = None) -> dict:  # pyright: ignore[reportArgumentType]
+    """
+    Align the Close series of several OHLCV frames on one calendar.
+
+    Returns {'tickers', 'dates', 'close' (A, T) with carried prices,
+    'observed' (A, T) bool: the ticker really traded that date}.
+    """
+    if calendar not in CALENDARS:
+        raise ValueError(f"Unknown calendar '{calendar}'. Choose one of {CALENDARS}")
+    if not frames:
+        raise ValueError("No datasets to align")
+    max_ffill = model_config.PANEL_MAX_FFILL if max_ffill is None else max_ffill
+
+    closes = {ticker: FeatureEngine.load_ohlc(df)['Close'] for ticker, df in frames.items()}
+
+    dates = None
+    for series in closes.values():
+        if dates is None:
+            dates = series.index
+        elif calendar == "union":
+            dates = dates.union(series.index)
+        else:
+            dates = dates.intersection(series.index)
+    if dates is None or len(dates) == 0:
+        raise ValueError("Tickers share no trading dates")
+
+    aligned = pd.DataFrame({ticker: series.reindex(dates) for ticker, series in closes.items()})
+    observed = aligned.notna().to_numpy().T
+    close = aligned.ffill(limit=max_ffill).to_numpy(dtype=float).T
+
+    return {
+        'tickers': list(closes),
+        'dates': dates,
+        'close': close,
+        'observed': observed,
+    }
+
+
+def rolling_std(values: np.ndarray, valid: np.ndarray, window: int,
+                min_periods: int) -> tuple:
+    """
+    Rolling sample std along axis 1 of an (A, T) array, over valid entries
+    only, from cumulative sums (O(A·T) regardless of window).
+
+    Returns (std, ok) where ok marks windows with >= min_periods valid bars.
+    """
+    x = np.where(valid, values, 0.0)
+    n = valid.astype(float)
+
+    def window_sum(a):
+        c = np.cumsum(a, axis=1)
+        c[:, window:] = c[:, window:] - c[:, :-window].copy()
+        return c
+
+    count = window_sum(n)
+    s1 = window_sum(x)
+    s2 = window_sum(x * x)
+
+    ok = count >= max(min_periods, 2)
+    safe = np.maximum(count, 2.0)
+    var = (s2 - s1 * s1 / safe) / (safe - 1.0)
+    return np.sqrt(np.maximum(var, 0.0)), ok
+
+
+def build_panel_tensor(frames: dict, calendar: str = "union",
+                       max_ffill: int = None,  # pyright: ignore[reportArgumentType]
+                       vol_window: int = None,  # pyright: ignore[reportArgumentType]
+                       min_coverage: float = None,  # pyright: ignore[reportArgumentType]
+                       benchmark: str = None) -> dict:  # pyright: ignore[reportArgumentType]
+    """
+    Args:
+        frames: {ticker: raw OHLCV DataFrame as returned by DataService}.
+        calendar: "union" or "intersection".
+        max_ffill: Longest gap (bars) bridged by carrying the last close.
+        vol_window: Rolling volatility window.
+        min_coverage: Fraction of a window that must be valid bars.
+        benchmark: Ticker (key of `frames`) for cross-asset features:
+            Excess_Return = r - r_benchmark,
+            Relative_Volatility = vol / vol_benchmark.
+
+    Returns dict with:
+        - features: (A, T, F) C-contiguous, COMPUTE_DTYPE
+        - mask: (A, T) bool, True where every feature is valid
+        - tickers, dates, feature_names
+        - coverage: {ticker: fraction of calendar dates that are valid}
+    """
+    vol_window = vol_window or model_config.VOLATILITY_WINDOW
+    min_coverage = min_coverage or model_config.PANEL_MIN_COVERAGE
+    if benchmark is not None and benchmark not in frames:
+        raise ValueError(f"Benchmark '{benchmark}' is not part of the panel")
+
+    aligned = align_close_panel(frames, calendar=calendar, max_ffill=max_ffill)
+    tickers = aligned['tickers']
+    close = aligned['close']
+    observed = aligned['observed']
+
+    # Log returns along time for all assets; carried bars return 0 and are
+    # masked, the next real bar absorbs the gap
+    log_close = np.log(close)
+    log_ret = np.full_like(log_close, np.nan)
+    log_ret[:, 1:] = np.diff(log_close, axis=1)
+    ret_valid = observed & np.isfinite(log_ret)
+
+    vol, vol_ok = rolling_std(log_ret, ret_valid, vol_window,
+                              min_periods=int(np.ceil(min_coverage * vol_window)))
+    vol_valid = ret_valid & vol_ok
+
+    columns = [log_ret, vol]
+    valids = [ret_valid, vol_valid]
+    feature_names = ['Log_Return', 'Volatility']
+
+    if benchmark is not None:
+        b = tickers.index(benchmark)
+        excess = log_ret - log_ret[b][None, :]
+        rel_vol = vol / np.where(vol[b] > 0, vol[b], np.nan)[None, :]
+        columns += [excess, rel_vol]
+        valids += [ret_valid & ret_valid[b][None, :],
+                   vol_valid & vol_valid[b][None, :] & np.isfinite(rel_vol)]
+        feature_names += ['Excess_Return', 'Relative_Volatility']
+
+    mask = np.logical_and.reduce(valids)
+    features = np.ascontiguousarray(np.stack(columns, axis=-1), dtype=model_config.get_compute_dtype())
+    features[~mask] = 0.0
+
+    coverage = dict(zip(tickers, mask.mean(axis=1).round(4).tolist()))
+    logger.info(f"🧮 Panel tensor {features.shape} ({calendar} calendar, "
+                f"{len(aligned['dates'])} dates), coverage={coverage}")
+
+    return {
+        'features': features,
+        'mask': mask,
+        'tickers': tickers,
+        'dates': aligned['dates'],
+        'feature_names': feature_names,
+        'coverage': coverage,
+    }
@@ -0,0 +1,146 @@
+# app/engine/refit_policy.py
+import logging
+from collections import deque
+from datetime import datetime, timezone
+import numpy as np
+from app.engine.hmm_model import RegimeDetector
+from app.engine.model_config import model_config
+
+logger = logging.getLogger(__name__)
+
+
+class RefitPolicy:
+    """
+    Decide whether incoming bars justify a full EM refit of a cached model.
+
+    Three cheap drift monitors, all evaluated on features scaled with the
+    cached model's scaler:
+      - Log-likelihood drop: mean log p(x_t | x_<t) of the new bars vs the
+        training bars (nats per bar).
+      - Mahalanobis distance of each new bar to its closest state mean.
+      - Two-sided CUSUM on the model's standardized one-step-ahead
+        innovations of each feature (a regime the model already knows
+        about does not accumulate; a shift it cannot explain does).
+    Any monitor crossing its threshold, or too many bars since the last
+    fit, triggers a refit. Every decision is logged and kept for audit.
+    """
+
+    def __init__(self,
+                 ll_drop_threshold: float = None,  # pyright: ignore[reportArgumentType]
+                 mahalanobis_threshold: float = None,  # pyright: ignore[reportArgumentType]
+                 cusum_k: float = None,  # pyright: ignore[reportArgumentType]
+                 cusum_h: float = None,  # pyright: ignore[reportArgumentType]
+                 max_stale_bars: int = None,  # pyright: ignore[reportArgumentType]
+                 audit_size: int = 500):
+        self.ll_drop_threshold = ll_drop_threshold or model_config.REFIT_LL_DROP_THRESHOLD
+        self.mahalanobis_threshold = mahalanobis_threshold or model_config.REFIT_MAHALANOBIS_THRESHOLD
+        self.cusum_k = cusum_k or model_config.REFIT_CUSUM_K
+        self.cusum_h = cusum_h or model_config.REFIT_CUSUM_H
+        self.max_stale_bars = max_stale_bars or model_config.REFIT_MAX_STALE_BARS
+        self.audit_log = deque(maxlen=audit_size)
+
+    @staticmethod
+    def min_mahalanobis(detector: RegimeDetector, features: np.ndarray) -> np.ndarray:
+        """Distance of each bar to the closest state mean under that state's covariance"""
+        means = detector.model.means_
+        precisions = np.linalg.inv(detector.model.covars_)
+        diff = features[:, None, :] - means[None, :, :]                # (T, K, d)
+        d2 = np.einsum('tki,kij,tkj->tk', diff, precisions, diff)
+        return np.sqrt(np.maximum(d2, 0.0)).min(axis=1)
+
+    @staticmethod
+    def innovations(detector: RegimeDetector, features: np.ndarray, log_filtered: np.ndarray) -> np.ndarray:
+        """(x_t - E[x_t | x_<t]) / sd[x_t | x_<t] per feature under the HMM mixture"""
+        model = detector.model
+        filtered = np.exp(log_filtered)
+        predicted = np.vstack([model.startprob_, filtered[:-1] @ model.transmat_])   # (T, K)
+
+        means = model.means_                                                          # (K, d)
+        variances = np.diagonal(model.covars_, axis1=1, axis2=2)                      # (K, d)
+        pred_mean = predicted @ means
+        pred_var = predicted @ (variances + means ** 2) - pred_mean ** 2
+        return (features - pred_mean) / np.sqrt(np.maximum(pred_var, 1e-12))
+
+    def cusum(self, z: np.ndarray) -> float:
+        """Largest two-sided CUSUM excursion over all features"""
+        pos = np.zeros(z.shape[1])
+        neg = np.zeros(z.shape[1])
+        peak = 0.0
+        for row in z:
+            pos = np.maximum(0.0, pos + row - self.cusum_k)
+            neg = np.maximum(0.0, neg - row - self.cusum_k)
+            peak = max(peak, float(pos.max()), float(neg.max()))
+        return peak
+
+    def evaluate(self, detector: RegimeDetector, features: np.ndarray, n_new: int,
+                 train_ll_per_bar: float, bars_since_fit: int = None,  # pyright: ignore[reportArgumentType]
+                 key: str = "") -> dict:
+        """
+        Args:
+            detector: Cached, trained model.
+            features: Full window scaled with the cached scaler; the last
+                `n_new` rows are the bars the model has not seen.
+            n_new: Number of unseen bars at the end of `features`.
+            train_ll_per_bar: Mean conditional log-likelihood on the training bars.
+            bars_since_fit: Bars absorbed without refit (defaults to n_new).
+            key: Label for the audit trail (ticker, dataset...).
+
+        Returns a decision dict: {'refit', 'reasons', 'stats', ...}.
+        """
+        bars_since_fit = n_new if bars_since_fit is None else bars_since_fit
+        reasons = []
+        stats = {'n_new_bars': int(n_new), 'bars_since_fit': int(bars_since_fit)}
+
+        if n_new > 0:
+            # Filter through the whole window so new bars are conditioned on history
+            log_filtered, log_norms = detector._forward_filter(features)
+            cond_ll = log_norms[-n_new:]
+            new_features = features[-n_new:]
+            z = self.innovations(detector, features, log_filtered)[-n_new:]
+
+            stats['ll_drop'] = float(train_ll_per_bar - cond_ll.mean())
+            stats['mahalanobis'] = float(self.min_mahalanobis(detector, new_features).mean())
+            stats['cusum'] = self.cusum(z)
+
+            if stats['ll_drop'] > self.ll_drop_threshold:
+                reasons.append(f"log-likelihood dropped {stats['ll_drop']:.3f} nats/bar "
+                               f"(> {self.ll_drop_threshold})")
+            if stats['mahalanobis'] > self.mahalanobis_threshold:
+                reasons.append(f"mean Mahalanobis distance {stats['mahalanobis']:.2f} "
+                               f"(> {self.mahalanobis_threshold})")
+            if stats['cusum'] > self.cusum_h:
+                reasons.append(f"CUSUM {stats['cusum']:.2f} (> {self.cusum_h})")
+
+        if bars_since_fit >= self.max_stale_bars:
+            reasons.append(f"{bars_since_fit} bars since last fit (>= {self.max_stale_bars})")
+
+        decision = {
+            'key': key,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'refit': bool(reasons),
+            'reasons': reasons or ["no drift detected"],
+            'stats': stats,
+        }
+        self.record(decision)
+        return decision
+
+    def force(self, key: str, reason: str) -> dict:
+        """Record an unconditional refit (no usable cached model)"""
+        decision = {
+            'key': key,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'refit': True,
+            'reasons': [reason],
+            'stats': {},
+        }
+        self.record(decision)
+        return decision
+
+    def record(self, decision: dict):
+        """Append a decision to the audit trail and log it"""
+        self.audit_log.append(decision)
+        if decision['refit']:
+            logger.info(f"🔁 [RefitPolicy] {decision['key']}: REFIT — {'; '.join(decision['reasons'])}")
+        else:
+            logger.info(f"♻️  [RefitPolicy] {decision['key']}: reuse cached model — "
+                        f"{'; '.join(decision['reasons'])} {decision['stats']}")
@@ -0,0 +1,104 @@
+# app/engine/rolling_regimes.py
+"""
+Rolling regime analytics from cumulative sums.
+
+The decoded state path is turned once into a one-hot occupancy tensor
+(T, K) and a one-hot transition tensor (T-1, K²), plus value-weighted
+one-hots for per-regime return / volatility moments. Prefix sums of
+those tensors give every window's statistics by differencing two rows,
+so all windows together cost O(T·K²) instead of one
+validate_persistence / assign_regime_meaning pass per slice.
+"""
+import numpy as np
+
+
+def _prefix(x: np.ndarray) -> np.ndarray:
+    """Cumulative sum along time with a leading zero row (float64 accumulation)"""
+    out = np.zeros((len(x) + 1,) + x.shape[1:], dtype=np.float64)
+    np.cumsum(x, axis=0, out=out[1:])
+    return out
+
+
+def _window_moments(onehot: np.ndarray, values: np.ndarray, starts: np.ndarray,
+                    ends: np.ndarray) -> tuple:
+    """Per-window, per-state count / mean / sample std of `values` (NaNs ignored)"""
+    valid = np.isfinite(values)
+    v = np.where(valid, values, 0.0)[:, None]
+    w = onehot * valid[:, None]
+    count, s1, s2 = (_prefix(a) for a in (w, w * v, w * v * v))
+    n = count[ends] - count[starts]
+    total = s1[ends] - s1[starts]
+    total_sq = s2[ends] - s2[starts]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / n
+        var = (total_sq - n * mean ** 2) / (n - 1)
+    std = np.sqrt(np.clip(var, 0.0, None))
+    mean[n < 1] = np.nan
+    std[n < 2] = np.nan
+    return n, mean, std
+
+
+def rolling_regime_stats(states: np.ndarray, n_states: int, window: int, step: int = 1,
+                         returns: np.ndarray = None,  # pyright: ignore[reportArgumentType]
+                         volatility: np.ndarray = None) -> dict:  # pyright: ignore[reportArgumentType]
+    """
+    Statistics of every window [end - window + 1, end], for end = window-1,
+    window-1+step, ... (the last bar is always included).
+
+    Returns a dict of arrays, N windows:
+        ends (N,)                 index of each window's last bar
+        occupancy (N, K)          share of bars in each state
+        switches (N,)             state changes inside the window
+        transition_counts (N,K,K) transitions with both bars in the window
+        transition_matrix (N,K,K) row-normalised counts (NaN rows: state
+                                  never left-or-stayed inside the window)
+        expected_duration (N, K)  1 / (1 - p_ii) from the empirical matrix
+        mean_return / std_return / mean_volatility (N, K), when the
+        series are given (NaN where the state has too few bars)
+    """
+    states = np.asarray(states, dtype=np.int64)
+    T, K = len(states), n_states
+    if window < 2 or window > T:
+        raise ValueError(f"window must be between 2 and the series length ({T}), got {window}")
+    if step < 1:
+        raise ValueError(f"step must be >= 1, got {step}")
+    if states.min() < 0 or states.max() >= K:
+        raise ValueError(f"states must lie in [0, {K})")
+
+    ends = np.arange(T - 1, window - 2, -step)[::-1]
+    starts = ends + 1 - window
+
+    onehot = np.zeros((T, K), dtype=np.float64)
+    onehot[np.arange(T), states] = 1.0
+    occ = _prefix(onehot)
+    occupancy = (occ[ends + 1] - occ[starts]) / window
+
+    # Transition t-1 → t lives at row t-1; a window [s, e] holds rows s..e-1
+    pairs = np.zeros((T - 1, K * K), dtype=np.float64)
+    pairs[np.arange(T - 1), states[:-1] * K + states[1:]] = 1.0
+    trans = _prefix(pairs)
+    counts = (trans[ends] - trans[starts]).reshape(-1, K, K)
+
+    diag = np.einsum("nkk->nk", counts)
+    switches = (window - 1) - diag.sum(axis=1)
+    row_totals = counts.sum(axis=2, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        transmat = counts / row_totals
+        stay = np.einsum("nkk->nk", transmat)
+        expected_duration = 1.0 / (1.0 - stay)
+
+    result = {
+        'ends': ends,
+        'occupancy': occupancy,
+        'switches': switches.astype(np.int64),
+        'transition_counts': counts.astype(np.int64),
+        'transition_matrix': transmat,
+        'expected_duration': expected_duration,
+    }
+    if returns is not None:
+        _, result['mean_return'], result['std_return'] = _window_moments(
+            onehot, np.asarray(returns, dtype=np.float64), starts, ends + 1)
+    if volatility is not None:
+        _, result['mean_volatility'], _ = _window_moments(
+            onehot, np.asarray(volatility, dtype=np.float64), starts, ends + 1)
+    return result
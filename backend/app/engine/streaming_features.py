@@ -0,0 +1,95 @@
+# app/engine/streaming_features.py
+import logging
+import numpy as np
+import pandas as pd
+from app.engine.features import FeatureEngine
+from app.engine.model_config import model_config
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalFeatureEngine:
+    """
+    Log returns and rolling volatility over a stream of OHLCV chunks.
+
+    Carries only the last close and the last (window - 1) returns between
+    chunks, so results match FeatureEngine.prepare_features on the whole
+    series while memory stays O(chunk + window).
+    """
+
+    def __init__(self, vol_window: int = None):  # pyright: ignore[reportArgumentType]
+        self.window = vol_window or model_config.VOLATILITY_WINDOW
+        self.last_close = np.nan
+        self.carry = np.empty(0)        # last window-1 returns (may hold NaN)
+        self.n_seen = 0
+
+    def update(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Features for one chunk (rows still inside the warm-up keep NaN)"""
+        df = FeatureEngine.load_ohlc(chunk).copy()
+        close = df['Close'].to_numpy(dtype=float)
+        n, w = len(close), self.window
+
+        prev = np.concatenate([[self.last_close], close[:-1]])
+        log_ret = np.log(close / prev)
+
+        # Rolling sample std over [carry | chunk] from cumulative sums; any
+        # NaN inside a window (start of the series) makes that window NaN
+        ext = np.concatenate([self.carry, log_ret])
+        nan = np.isnan(ext)
+        vals = np.where(nan, 0.0, ext)
+        c1 = np.concatenate([[0.0], np.cumsum(vals)])
+        c2 = np.concatenate([[0.0], np.cumsum(vals * vals)])
+        cn = np.concatenate([[0], np.cumsum(nan)])
+
+        vol_ext = np.full(len(ext), np.nan)
+        if len(ext) >= w:
+            s1 = c1[w:] - c1[:-w]
+            s2 = c2[w:] - c2[:-w]
+            var = (s2 - s1 * s1 / w) / (w - 1)
+            vol_ext[w - 1:] = np.where(cn[w:] - cn[:-w] == 0, np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+        df['Log_Return'] = log_ret
+        df['Volatility'] = vol_ext[len(self.carry):]
+        df['Volatility_Annualized'] = df['Volatility'] * np.sqrt(252)
+
+        if n:
+            self.last_close = close[-1]
+            self.carry = ext[-(w - 1):] if w > 1 else np.empty(0)
+        self.n_seen += n
+        return df
+
+
+def stream_feature_frame(chunks, vol_window: int = None,  # pyright: ignore[reportArgumentType]
+                         tail_rows: int = None,  # pyright: ignore[reportArgumentType]
+                         start_date: str = None) -> pd.DataFrame:  # pyright: ignore[reportArgumentType]
+    """
+    Consume raw OHLCV chunks and return the feature frame (NaN rows
+    dropped, features in COMPUTE_DTYPE), keeping at most `tail_rows`
+    rows and none before `start_date` (earlier rows only warm up windows).
+    """
+    engine = IncrementalFeatureEngine(vol_window)
+    start_ts = pd.Timestamp(start_date) if start_date is not None else None
+    kept = []
+    n_kept = 0
+
+    for chunk in chunks:
+        df = engine.update(chunk).dropna()
+        if start_ts is not None:
+            df = df[df.index >= start_ts]
+        if df.empty:
+            continue
+        kept.append(df)
+        n_kept += len(df)
+        # Drop whole chunks that fell out of the tail window
+        while tail_rows is not None and kept and n_kept - len(kept[0]) >= tail_rows:
+            n_kept -= len(kept.pop(0))
+
+    if not kept:
+        raise ValueError("No complete feature rows in the requested window")
+
+    out = pd.concat(kept)
+    if tail_rows is not None:
+        out = out.tail(tail_rows)
+    dtype = model_config.get_compute_dtype()
+    logger.info(f"   ✅ Streamed {engine.n_seen} rows, {len(out)} feature rows ready")
+    return out.astype({'Log_Return': dtype, 'Volatility': dtype})
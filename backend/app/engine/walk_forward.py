@@ -1,9 +1,13 @@
 # app/engine/walk_forward.py
+import time
+import json
+import hashlib
 import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
 from typing import Optional, Tuple
 from app.engine.hmm_model import RegimeDetector
+from app.engine.model_config import model_config
 import logging
 
 logger = logging.getLogger(__name__)
@@ -49,6 +53,49 @@ def _resolve_label_flip(
     return new_mapping, reference_signatures  # keep original as reference
 
 
+def _fold_plan(n_total: int, train_size: int, test_size: int, step_size: int,
+               expanding: bool) -> list:
+    """(train_start, train_end, test_end) of every fold that fits in n_total bars"""
+    plan = []
+    train_end = train_size
+    while train_end + test_size <= n_total:
+        plan.append((0 if expanding else train_end - train_size, train_end, train_end + test_size))
+        train_end += step_size
+    return plan
+
+
+def _fold_keys(df: pd.DataFrame, feature_cols: list, plan: list, params: dict) -> list:
+    """
+    Cache key per fold: hash of the data prefix the fold reads (rows
+    [0, test_end) of the index and every column it uses) plus its range and
+    the model/window parameters. The prefix digest is built incrementally,
+    one pass over the data for all folds; appending bars leaves the keys of
+    existing folds unchanged.
+    """
+    cols = list(dict.fromkeys(list(feature_cols) + ["Log_Return", "Volatility"]))
+    values = np.ascontiguousarray(df[cols].to_numpy(dtype=np.float64))
+    index = np.ascontiguousarray(df.index.asi8 if hasattr(df.index, "asi8") else np.arange(len(df)))
+    params_json = json.dumps({**params, "columns": cols}, sort_keys=True, default=str)
+
+    running = hashlib.sha256()
+    hashed_to = 0
+    keys = []
+    for train_start, train_end, test_end in plan:
+        running.update(index[hashed_to:test_end].tobytes())
+        running.update(values[hashed_to:test_end].tobytes())
+        hashed_to = test_end
+        prefix = running.copy().hexdigest()
+        keys.append(hashlib.sha256(
+            f"{prefix}:{train_start}:{train_end}:{test_end}:{params_json}".encode()
+        ).hexdigest())
+    return keys
+
+
+def _jsonable(value):
+    """numpy scalars → Python, so cached and fresh folds look the same"""
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
 def walk_forward_validation(
     df: pd.DataFrame,
     feature_cols: list[str],
@@ -57,6 +104,9 @@ def walk_forward_validation(
     test_size: int = 60,      # bars per fold
     step_size: int = 60,      # how far to advance each fold
     expanding: bool = True,   # True = expanding window, False = rolling
+    return_regime_path: bool = False,  # attach causal out-of-sample regimes
+    time_budget: Optional[float] = None,  # seconds shared by all fold fits
+    fold_cache=None,          # get(key) / put(key, value) store of finished folds
 ) -> dict:                    # ✅ FIXED: returns ONE dict, not a tuple
     """
     Walk-forward validation for HMM regime detection.
@@ -66,6 +116,21 @@ def walk_forward_validation(
       - BIC per fold (model quality)
       - Regime distribution per fold (stability check)
       - Convergence per fold
+
+    With return_regime_path=True the summary also carries "regime_path":
+    the test-window regimes decoded with the forward filter (no look-ahead
+    inside the window), keyed by positional index into df. This is what
+    the backtester consumes.
+
+    With a time_budget, each fold's EM gets an equal share of the time
+    that is left, so early fast folds donate their slack to later ones.
+
+    With a fold_cache, folds whose data prefix, range and parameters were
+    seen before are taken from the cache and only new (typically trailing)
+    folds are fitted; the summary is re-aggregated over all of them. Each
+    fold is stored as soon as it finishes, so an interrupted run resumes
+    from the last completed fold. Folds cut short by the time budget are
+    not cached.
     """
     logger.info("=" * 60)
     logger.info("Walk-Forward Validation")
@@ -78,14 +143,43 @@ def walk_forward_validation(
 
     fold_results = []
     reference_signatures = None
+    path_index, path_regimes = [], []
 
-    fold = 0
-    train_end = train_size
+    plan = _fold_plan(n_total, train_size, test_size, step_size, expanding)
+    cached = [None] * len(plan)
+    keys = [None] * len(plan)
+    if fold_cache is not None and plan:
+        keys = _fold_keys(df, feature_cols, plan, {
+            "n_states": n_states, "train_size": train_size, "test_size": test_size,
+            "step_size": step_size, "expanding": expanding,
+            # Engine settings that change what a fit returns
+            "fit": model_config.fit_fingerprint(),
+        })
+        for i, key in enumerate(keys):
+            entry = fold_cache.get(key)
+            # Folds cached without a regime path cannot serve a backtest
+            if entry is not None and (not return_regime_path or "regime_path" in entry):
+                cached[i] = entry
+    n_reused = sum(entry is not None for entry in cached)
+    if n_reused:
+        logger.info(f"  Reusing {n_reused}/{len(plan)} cached folds")
 
-    while train_end + test_size <= n_total:
-        train_start = 0 if expanding else (train_end - train_size)
-        test_start  = train_end
-        test_end    = train_end + test_size
+    n_planned = len(plan) - n_reused
+    n_fitted = 0
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
+
+    for fold, (train_start, train_end, test_end) in enumerate(plan):
+        test_start = train_end
+
+        entry = cached[fold]
+        if entry is not None:
+            if reference_signatures is None:
+                reference_signatures = entry["reference_signatures"]
+            fold_results.append(entry["fold_info"])
+            if return_regime_path:
+                path_index.extend(range(test_start, test_end))
+                path_regimes.extend(entry["regime_path"])
+            continue
 
         X_train = features_all[train_start:train_end]
         X_test  = features_all[test_start:test_end]
@@ -98,7 +192,10 @@ def walk_forward_validation(
 
         # ── Train HMM on TRAIN window ─────────────────────────────────────
         detector = RegimeDetector(n_states=n_states)
-        detector.fit(X_train_sc, verbose=False)
+        fold_budget = None
+        if deadline is not None:
+            fold_budget = max(0.0, deadline - time.monotonic()) / max(1, n_planned - n_fitted)
+        detector.fit(X_train_sc, verbose=False, time_budget=fold_budget)
 
         # ── Decode TRAIN states (for label assignment, no leakage) ────────
         train_states = detector.predict_states(X_train_sc)
@@ -137,6 +234,16 @@ def walk_forward_validation(
         df_test["State"]  = test_states
         df_test["Regime"] = [stable_mapping[s] for s in test_states]
 
+        fold_path = None
+        if return_regime_path:
+            # Filter through train+test so the test window starts from the
+            # train-conditioned state belief, not the stationary prior.
+            filtered = detector.predict_filtered_proba(np.vstack([X_train_sc, X_test_sc]))
+            causal_states = filtered[len(X_train_sc):].argmax(axis=1)
+            fold_path = [stable_mapping[s] for s in causal_states]
+            path_index.extend(range(test_start, test_end))
+            path_regimes.extend(fold_path)
+
         # ── Honest metrics (no fake ground truth) ────────────────────────
         # HMM is UNSUPERVISED — we cannot compare against "true" labels.
         # Instead, track regime distribution and BIC stability across folds.
@@ -154,9 +261,17 @@ def walk_forward_validation(
             "bic":           round(detector.training_stats["bic"], 2),
             "converged":     detector.training_stats["converged"],
             "n_iter":        detector.training_stats["n_iter"],
+            "timed_out":     detector.training_stats["timed_out"],
         }
         fold_results.append(fold_info)
 
+        if fold_cache is not None and not detector.training_stats["timed_out"]:
+            entry = {"fold_info": fold_info, "reference_signatures": reference_signatures}
+            if fold_path is not None:
+                entry["regime_path"] = fold_path
+            # Round-trip through JSON: cached and fresh folds carry the same types
+            fold_cache.put(keys[fold], json.loads(json.dumps(entry, default=_jsonable)))
+
         logger.info(
             f"  Fold {fold+1:02d} | train [{train_start}:{train_end}] "
             f"test [{test_start}:{test_end}] | "
@@ -165,8 +280,7 @@ def walk_forward_validation(
             f"converged={detector.training_stats['converged']}"
         )
 
-        fold += 1
-        train_end += step_size
+        n_fitted += 1
 
     # ── Aggregate summary ─────────────────────────────────────────────────
     bics = [r["bic"] for r in fold_results]
@@ -181,8 +295,13 @@ def walk_forward_validation(
         "max_bic":         round(float(np.max(bics)), 2),
         "mean_switches":   round(float(np.mean(switches)), 2),  # avg regime switches per fold
         "converged_folds": converged_count,                      # how many folds converged
+        "reused_folds":    n_reused,                             # served from the fold cache
         "fold_results":    fold_results,
     }
+    if return_regime_path:
+        # Labels of the reference fold's mapping, lowest mean return first
+        labels = sorted(reference_signatures or {}, key=lambda label: reference_signatures[label][0])  # pyright: ignore[reportOptionalSubscript]
+        summary["regime_path"] = {"index": path_index, "regimes": path_regimes, "labels": labels}
 
     logger.info("=" * 60)
     logger.info(
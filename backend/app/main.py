@@ -1,11 +1,40 @@
 import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.router import api_router
+from app.api.deps import get_pipeline_executor, warm_up
+from app.api.v1.endpoints.market import get_precompute_scheduler
+from app.core.config import settings
 import sys
 
-app = FastAPI(title="Market Regime Detection API")
+logger = logging.getLogger(__name__)
+
+async def _background_warm_up():
+    try:
+        await asyncio.to_thread(warm_up)
+    except Exception as e:
+        # Warm-up is an optimization: the first request builds whatever is missing
+        logger.warning(f"⚠️ Startup warm-up failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Services are built lazily (app.api.deps); nothing heavy happens here
+    # unless warm-up or the precompute scheduler is enabled
+    warm_task = asyncio.create_task(_background_warm_up()) if settings.WARMUP_ON_STARTUP else None
+    scheduler = get_precompute_scheduler() if settings.TRACKED_TICKERS else None
+    if scheduler is not None:
+        scheduler.start()
+    yield
+    if warm_task is not None:
+        warm_task.cancel()
+    if scheduler is not None:
+        await scheduler.stop()
+    get_pipeline_executor().shutdown()
+
+app = FastAPI(title="Market Regime Detection API", lifespan=lifespan)
 
 # CORS
 app.add_middleware(
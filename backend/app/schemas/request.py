@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional, Union
 
 class FetchRequest(BaseModel):
     ticker: str
@@ -6,4 +7,58 @@ class FetchRequest(BaseModel):
     end_date: str
 
 class AnalyzeRequest(BaseModel):
-    filename: str
\ No newline at end of file
+    filename: str
+    # Wall-clock budget for model fitting; EM stops early and keeps the
+    # best parameters found when it runs out. None = no limit.
+    latency_budget_ms: Optional[float] = None
+    # Named set from model_config.FEATURE_SETS ("range", "extended", ...)
+    # or an explicit list such as ["Log_Return", "Parkinson_Vol_20"].
+    feature_set: Optional[Union[str, List[str]]] = None
+
+class BacktestRequest(BaseModel):
+    filename: str
+    # {"rule name": {"Bull": 1.0, "Sideways": 0.5, "Bear": 0.0}, ...}
+    # When omitted, every 0 / 0.5 / 1 combination per regime is evaluated.
+    rules: Optional[Dict[str, Dict[str, float]]] = None
+    cost_bps: float = 0.0
+
+class PanelAnalyzeRequest(BaseModel):
+    filenames: List[str]
+    n_states: Optional[int] = None
+    # "per_ticker": each ticker standardized on its own (relative regimes)
+    # "pooled": one scaler over all tickers (absolute return/vol levels)
+    scaling: str = "per_ticker"
+
+class PanelFeatureRequest(BaseModel):
+    filenames: List[str]
+    # "union": every date any ticker traded; "intersection": common dates only
+    calendar: str = "union"
+    max_ffill: Optional[int] = None
+    vol_window: Optional[int] = None
+    # Ticker used for Excess_Return / Relative_Volatility (e.g. "^GSPC")
+    benchmark: Optional[str] = None
+
+class RollingRegimeRequest(AnalyzeRequest):
+    # Bars per window and bars between consecutive window ends
+    window: int = 120
+    step: int = 20
+
+class BootstrapRequest(BaseModel):
+    filename: str
+    n_states: Optional[int] = None
+    feature_set: Optional[Union[str, List[str]]] = None
+    # Defaults from model_config (BOOTSTRAP_*); mean_block in bars
+    n_replicates: Optional[int] = Field(default=None, gt=0, le=5000)
+    mean_block: Optional[float] = Field(default=None, ge=1, le=10_000)
+    confidence: Optional[float] = Field(default=None, gt=0, lt=1)
+    # Seconds spent on replicates; unfinished ones are dropped
+    # (default BOOTSTRAP_TIME_BUDGET_S)
+    time_budget_s: Optional[float] = Field(default=None, gt=0, le=3600)
+
+class BreadthRequest(BaseModel):
+    # {ticker: weight}, e.g. market caps; tickers left out get weight 0
+    weights: Optional[Dict[str, float]] = None
+    # {ticker: group}, e.g. sectors; adds per-group breadth
+    groups: Optional[Dict[str, str]] = None
+    # Restrict the universe to these tickers
+    tickers: Optional[List[str]] = None
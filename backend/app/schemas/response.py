@@ -30,6 +30,8 @@ class PredictionResponse(BaseModel):
     expected_return: float
     expected_volatility: float
     confidence: float
+    # Filtered state distribution at the last bar (what the t+1 forecast starts from)
+    current_probabilities: Optional[Dict[str, float]] = None
 class FoldResult(BaseModel):
     """Result from a single walk-forward fold."""
     fold: int
@@ -40,6 +42,7 @@ class FoldResult(BaseModel):
     bic: float
     converged: bool
     n_iter: int
+    timed_out: bool = False
 
 class WalkForwardSummary(BaseModel):
     """Summary of walk-forward validation across all folds."""
@@ -76,3 +79,103 @@ class AnalysisResponse(BaseModel):
     regime_history: List[RegimeHistoryItem]
     model_params: Dict[str, Any]
     walk_forward: Optional[WalkForwardSummary] = None
+    refit_decision: Optional[Dict[str, Any]] = None
+    profile: Optional[Dict[str, Any]] = None
+
+
+class BacktestRuleResult(BaseModel):
+    """Performance of one regime-conditioned allocation rule."""
+    rule: str
+    allocation: Dict[str, float]
+    total_return: float
+    annual_return: float
+    annual_vol: float
+    sharpe: float
+    max_drawdown: float
+    turnover: float
+
+class BacktestResponse(BaseModel):
+    """Out-of-sample backtest of many allocation rules, sorted by Sharpe."""
+    n_rules: int
+    n_bars: int
+    start_date: str
+    end_date: str
+    cost_bps: float
+    buy_and_hold_return: float
+    results: List[BacktestRuleResult]
+
+
+class PanelTickerResult(BaseModel):
+    """One ticker decoded with the shared panel model."""
+    filename: str
+    total_days: int
+    current_state: int
+    current_regime: str
+    regime_distribution: Dict[str, float]
+    persistence: PersistenceMetrics
+    prediction: PredictionResponse
+    regime_history: List[RegimeHistoryItem]
+
+class PanelAnalysisResponse(BaseModel):
+    """A single HMM trained on several tickers at once (shared state definitions)."""
+    model_config = ConfigDict(protected_namespaces=())
+
+    filenames: List[str]
+    n_states: int
+    scaling: str
+    total_days: int
+    features_used: List[str]
+    training_stats: Dict[str, Any]
+    regime_mapping: Dict[int, str]
+    state_statistics: Dict[int, Dict[str, float]]
+    model_params: Dict[str, Any]
+    tickers: List[PanelTickerResult]
+
+
+class RollingRegimeResponse(BaseModel):
+    """
+    Rolling regime statistics over a fitted analysis. Per-regime arrays are
+    [window][regime] in `regimes` order; null where a regime has no data
+    inside the window.
+    """
+    filename: str
+    window: int
+    step: int
+    regimes: List[str]
+    dates: List[str]
+    occupancy: List[List[float]]
+    switches: List[int]
+    transition_matrix: List[List[List[Optional[float]]]]
+    expected_duration: List[List[Optional[float]]]
+    mean_return: Optional[List[List[Optional[float]]]] = None
+    std_return: Optional[List[List[Optional[float]]]] = None
+    mean_volatility: Optional[List[List[Optional[float]]]] = None
+
+class BootstrapInterval(BaseModel):
+    estimate: Any
+    lower: Any
+    upper: Any
+    std: Any
+
+class BootstrapResponse(BaseModel):
+    """
+    Percentile confidence intervals from a stationary block bootstrap.
+    transition_matrix bounds are [from][to] in `regimes` order; state_means
+    are per regime and feature, in feature units.
+    """
+    filename: str
+    n_states: int
+    total_days: int
+    regimes: List[str]
+    features: List[str]
+    transition_matrix: BootstrapInterval
+    expected_duration: Dict[str, BootstrapInterval]
+    state_means: Dict[str, Dict[str, BootstrapInterval]]
+    confidence: float
+    mean_block: float
+    n_requested: int
+    n_completed: int
+    n_converged: int
+    mean_refit_iterations: float
+    timed_out: bool
+    elapsed_seconds: float
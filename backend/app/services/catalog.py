@@ -0,0 +1,331 @@
+# app/services/catalog.py
+import os
+import json
+import hashlib
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timezone
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILENAME = "catalog.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    filename      TEXT PRIMARY KEY,
+    ticker        TEXT NOT NULL,
+    start_date    TEXT,
+    end_date      TEXT,
+    n_rows        INTEGER NOT NULL,
+    content_hash  TEXT NOT NULL,
+    format        TEXT NOT NULL,
+    size_bytes    INTEGER NOT NULL,
+    mtime         REAL NOT NULL,
+    registered_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_datasets_ticker_range ON datasets (ticker, start_date, end_date);
+CREATE INDEX IF NOT EXISTS idx_datasets_hash ON datasets (content_hash);
+
+CREATE TABLE IF NOT EXISTS analyses (
+    filename     TEXT NOT NULL,
+    kind         TEXT NOT NULL,
+    fingerprint  TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    params       TEXT NOT NULL,
+    analyzed_at  TEXT NOT NULL,
+    PRIMARY KEY (filename, kind)
+);
+
+CREATE TABLE IF NOT EXISTS precompute_runs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    cycle_id    TEXT NOT NULL,
+    ticker      TEXT NOT NULL,
+    filename    TEXT,
+    status      TEXT NOT NULL,
+    detail      TEXT,
+    started_at  TEXT NOT NULL,
+    duration_s  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_precompute_runs_ticker ON precompute_runs (ticker, started_at);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def scan_csv(path: str, block: int = 1 << 20) -> dict:
+    """
+    One pass over the bytes: SHA-256 and row count. The date range comes
+    from the first and last data rows (datasets are stored in date order).
+    """
+    digest = hashlib.sha256()
+    n_lines = 0
+    last_byte = b""
+    with open(path, 'rb') as f:
+        header = f.readline()
+        first = f.readline()
+        f.seek(0)
+        while True:
+            buf = f.read(block)
+            if not buf:
+                break
+            digest.update(buf)
+            n_lines += buf.count(b"\n")
+            last_byte = buf[-1:]
+
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        lines = [ln for ln in f.read().splitlines() if ln.strip()]
+        last = lines[-1] if lines else b""
+
+    if last_byte and last_byte != b"\n":
+        n_lines += 1                      # final row without trailing newline
+    columns = header.decode().strip().split(',')
+    n_rows = max(n_lines - 1, 0)
+
+    start_date = end_date = None
+    if 'Date' in columns and n_rows > 0:
+        idx = columns.index('Date')
+        start_date = pd.Timestamp(first.decode().split(',')[idx].strip('"')).strftime('%Y-%m-%d')
+        end_date = pd.Timestamp(last.decode().split(',')[idx].strip('"')).strftime('%Y-%m-%d')
+
+    return {
+        'n_rows': n_rows,
+        'content_hash': digest.hexdigest(),
+        'start_date': start_date,
+        'end_date': end_date,
+        'size_bytes': size,
+    }
+
+
+class DatasetCatalog:
+    """
+    SQLite index of the datasets under DATA_DIR: ticker, actual date range,
+    row count, content hash and format, plus the fingerprint of the last
+    analysis run on each file. Listing and lookups are indexed queries
+    instead of directory scans and filename parsing.
+
+    The catalog is derived state: when the database file is missing it is
+    rebuilt from the directory, and sync() reconciles it with files that
+    were added, changed or removed behind the service's back.
+    """
+
+    def __init__(self, data_dir: str, db_path: str = None):  # pyright: ignore[reportArgumentType]
+        self.data_dir = data_dir
+        self.db_path = db_path or os.path.join(data_dir, CATALOG_FILENAME)
+        self._lock = threading.Lock()
+        self._dir_mtime = None   # DATA_DIR mtime at the last sync/rebuild
+
+        missing = not os.path.exists(self.db_path)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+        if missing:
+            logger.info(f"🗂️ Dataset catalog not found, rebuilding from {data_dir}")
+            self.rebuild()
+        else:
+            self.sync()
+
+    # ── Maintenance ──────────────────────────────────────────────────────
+    def _dir_mtime_ns(self):
+        try:
+            return os.stat(self.data_dir).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def refresh(self):
+        """
+        sync() when DATA_DIR's mtime moved (a file was added, removed or
+        renamed since the last scan); one stat() otherwise. Content
+        rewritten in place is caught per file by content_hash().
+        """
+        if self._dir_mtime_ns() != self._dir_mtime:
+            self.sync()
+
+    def _dataset_files(self) -> dict:
+        """{filename: os.stat_result} for every CSV in the data directory"""
+        # Taken before listing: a change during the scan triggers another one
+        self._dir_mtime = self._dir_mtime_ns()
+        try:
+            names = [f for f in os.listdir(self.data_dir) if f.endswith('.csv')]
+        except FileNotFoundError:
+            logger.warning("Target data directory does not exist.")
+            return {}
+        return {f: os.stat(os.path.join(self.data_dir, f)) for f in names}
+
+    def register(self, filename: str) -> dict:
+        """(Re)index one dataset file and return its catalog row"""
+        path = os.path.join(self.data_dir, filename)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Requested dataset not found: {filename}")
+
+        meta = scan_csv(path)
+        row = {
+            'filename': filename,
+            'ticker': filename.split('_')[0],
+            'format': os.path.splitext(filename)[1].lstrip('.').lower(),
+            'mtime': os.path.getmtime(path),
+            'registered_at': _now(),
+            **meta,
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO datasets (filename, ticker, start_date, end_date, n_rows, "
+                "content_hash, format, size_bytes, mtime, registered_at) VALUES "
+                "(:filename, :ticker, :start_date, :end_date, :n_rows, :content_hash, :format, "
+                ":size_bytes, :mtime, :registered_at)", row)
+        return row
+
+    def unregister(self, filename: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM datasets WHERE filename = ?", (filename,))
+            self._conn.execute("DELETE FROM analyses WHERE filename = ?", (filename,))
+
+    def rebuild(self) -> int:
+        """Drop every row and re-index the whole directory"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM datasets")
+        indexed = 0
+        for filename in self._dataset_files():
+            indexed += self._try_register(filename)
+        logger.info(f"🗂️ Catalog rebuilt: {indexed} datasets")
+        return indexed
+
+    def _try_register(self, filename: str) -> bool:
+        try:
+            self.register(filename)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ Could not index {filename}: {e}")
+            return False
+
+    def sync(self) -> dict:
+        """Index new or modified files (by size/mtime) and forget deleted ones"""
+        files = self._dataset_files()
+        with self._lock:
+            known = {r['filename']: r for r in self._conn.execute(
+                "SELECT filename, size_bytes, mtime FROM datasets")}
+
+        added, updated = [], []
+        for filename, st in files.items():
+            row = known.get(filename)
+            if row is None:
+                added.append(filename)
+            elif row['size_bytes'] != st.st_size or row['mtime'] != st.st_mtime:
+                updated.append(filename)
+        removed = [f for f in known if f not in files]
+
+        for filename in added + updated:
+            self._try_register(filename)
+        for filename in removed:
+            self.unregister(filename)
+
+        if added or updated or removed:
+            logger.info(f"🗂️ Catalog sync: +{len(added)} ~{len(updated)} -{len(removed)}")
+        return {'added': added, 'updated': updated, 'removed': removed}
+
+    # ── Queries ──────────────────────────────────────────────────────────
+    def list_filenames(self) -> list:
+        self.refresh()
+        with self._lock:
+            return [r['filename'] for r in self._conn.execute(
+                "SELECT filename FROM datasets ORDER BY filename")]
+
+    def get(self, filename: str) -> dict:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM datasets WHERE filename = ?", (filename,)).fetchone()
+        return dict(row) if row is not None else None  # pyright: ignore[reportReturnType]
+
+    def find(self, ticker: str = None, start_date: str = None,  # pyright: ignore[reportArgumentType]
+             end_date: str = None) -> list:  # pyright: ignore[reportArgumentType]
+        """
+        Datasets for `ticker` whose actual data covers [start_date, end_date]
+        (either bound optional), longest history first.
+        """
+        self.refresh()
+        clauses, args = [], []
+        if ticker is not None:
+            clauses.append("ticker = ?")
+            args.append(ticker)
+        if start_date is not None:
+            clauses.append("start_date <= ?")
+            args.append(pd.Timestamp(start_date).strftime('%Y-%m-%d'))
+        if end_date is not None:
+            clauses.append("end_date >= ?")
+            args.append(pd.Timestamp(end_date).strftime('%Y-%m-%d'))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT * FROM datasets {where} ORDER BY n_rows DESC, filename", args).fetchall()
+        return [dict(r) for r in rows]
+
+    def content_hash(self, filename: str) -> str:
+        """
+        Indexed cache-invalidation key for a dataset. Costs one stat():
+        a file added or rewritten in DATA_DIR since it was indexed (size or
+        mtime differ from the row) is re-hashed before its key is returned.
+        """
+        try:
+            st = os.stat(os.path.join(self.data_dir, filename))
+        except FileNotFoundError:
+            self.unregister(filename)
+            raise FileNotFoundError(f"Requested dataset not found: {filename}") from None
+        row = self.get(filename)
+        if row is None or row['size_bytes'] != st.st_size or row['mtime'] != st.st_mtime:
+            row = self.register(filename)
+        return row['content_hash']
+
+    # ── Analysis fingerprints ────────────────────────────────────────────
+    def record_analysis(self, filename: str, kind: str, params: dict) -> str:
+        """
+        Store the fingerprint of an analysis: hash of the dataset content
+        plus the parameters it ran with. Returns the fingerprint.
+        """
+        content_hash = self.content_hash(filename)
+        params_json = json.dumps(params, sort_keys=True, default=str)
+        fingerprint = hashlib.sha256(f"{content_hash}:{kind}:{params_json}".encode()).hexdigest()[:16]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (filename, kind, fingerprint, content_hash, params, analyzed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (filename, kind, fingerprint, content_hash, params_json, _now()))
+        return fingerprint
+
+    def last_analysis(self, filename: str, kind: str = "analyze") -> dict:
+        """Last recorded analysis; 'stale' is True when the data changed since"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT a.*, d.content_hash AS current_hash FROM analyses a "
+                "LEFT JOIN datasets d ON d.filename = a.filename "
+                "WHERE a.filename = ? AND a.kind = ?", (filename, kind)).fetchone()
+        if row is None:
+            return None  # pyright: ignore[reportReturnType]
+        result = dict(row)
+        result['params'] = json.loads(result['params'])
+        result['stale'] = result.pop('current_hash') != result['content_hash']
+        return result
+
+    # ── Precompute run history ───────────────────────────────────────────
+    def record_run(self, cycle_id: str, ticker: str, filename: str, status: str,
+                   started_at: str, duration_s: float, detail: str = None):  # pyright: ignore[reportArgumentType]
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO precompute_runs (cycle_id, ticker, filename, status, detail, started_at, duration_s) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cycle_id, ticker, filename, status, detail, started_at, duration_s))
+
+    def runs(self, ticker: str = None, limit: int = 100) -> list:  # pyright: ignore[reportArgumentType]
+        """Most recent precompute runs, newest first"""
+        query, args = "SELECT * FROM precompute_runs", []
+        if ticker is not None:
+            query += " WHERE ticker = ?"
+            args.append(ticker)
+        query += " ORDER BY id DESC LIMIT ?"
+        args.append(limit)
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(query, args)]
@@ -1,8 +1,10 @@
 import os
 import logging
 import pandas as pd
+from app.engine.model_config import model_config
 from app.adapters.yfinance_client import YFinanceClient
 from app.core.config import settings
+from app.services.catalog import DatasetCatalog
 
 logger = logging.getLogger(__name__)
 
@@ -12,15 +14,19 @@ class DataService:
     external financial APIs and local storage.
     """
     
-    def __init__(self):
+    def __init__(self, data_dir: str = None):  # pyright: ignore[reportArgumentType]
         self.client = YFinanceClient()
-        self.data_dir = settings.DATA_DIR
+        self.data_dir = data_dir or settings.DATA_DIR
         
         # Ensure the storage directory exists upon service initialization
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
 
-    def fetch_and_save(self, ticker: str, start_date: str, end_date: str) -> str:
+        # Metadata index (rebuilt from the directory if the database is missing)
+        self.catalog = DatasetCatalog(self.data_dir)
+
+    def fetch_and_save(self, ticker: str, start_date: str, end_date: str,
+                       filename: str = None) -> str:  # pyright: ignore[reportArgumentType]
         """
         Retrieves historical market data and serializes it to a local CSV file.
 
@@ -28,6 +34,9 @@ class DataService:
             ticker (str): The financial instrument symbol (e.g., 'AAPL', 'BTC-USD').
             start_date (str): ISO 8601 formatted start date.
             end_date (str): ISO 8601 formatted end date.
+            filename (str): Target file name; defaults to
+                '{ticker}_{start_date}_{end_date}.csv'. An existing file is
+                replaced atomically (readers never see a partial CSV).
 
         Returns:
             str: The generated filename for the persisted dataset.
@@ -41,27 +50,26 @@ class DataService:
             raise ValueError(f"No historical data found for symbol: {ticker}")
 
         # Construct a standardized filename for internal indexing
-        filename = f"{ticker}_{start_date}_{end_date}.csv"
+        filename = filename or f"{ticker}_{start_date}_{end_date}.csv"
         file_path = os.path.join(self.data_dir, filename)
         
         # Persist to local storage (CSV format)
-        df.to_csv(file_path, index=False)
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, file_path)
+        self.catalog.register(filename)
         logger.info(f"Dataset persisted successfully at: {file_path}")
         
         return filename
 
     def list_datasets(self) -> list:
         """
-        Scans the data directory for available CSV datasets.
+        Lists the datasets registered in the catalog.
 
         Returns:
             list: A collection of filenames currently available for processing.
         """
-        try:
-            return [f for f in os.listdir(self.data_dir) if f.endswith('.csv')]
-        except FileNotFoundError:
-            logger.warning("Target data directory does not exist.")
-            return []
+        return self.catalog.list_filenames()
 
     def load_dataset(self, filename: str) -> pd.DataFrame:
         """
@@ -91,4 +99,138 @@ class DataService:
             # NOTE: Index is not set here to maintain compatibility with 
             # downstream feature engineering modules.
         
-        return df
\ No newline at end of file
+        return df
+
+    # ── Streaming access ─────────────────────────────────────────────────
+    # Datasets are written chronologically (fetch_and_save), so the tail and
+    # any date range can be located by seeking instead of parsing the file.
+
+    def _dataset_path(self, filename: str) -> str:
+        file_path = os.path.join(self.data_dir, filename)
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"Requested dataset not found: {filename}")
+        return file_path
+
+    @staticmethod
+    def _read_header(f) -> tuple:
+        """(column names, byte offset of the first data row)"""
+        f.seek(0)
+        header = f.readline()
+        return header.decode().strip().split(','), f.tell()
+
+    @staticmethod
+    def _rows_back(f, n_rows: int, end: int, floor: int, block: int = 1 << 16) -> int:
+        """Byte offset of the row starting `n_rows` lines before `end` (never below `floor`)"""
+        # Ignore the newline(s) terminating the row that ends at `end`
+        f.seek(max(floor, end - 2))
+        tail = f.read(end - max(floor, end - 2))
+        pos = end - (len(tail) - len(tail.rstrip(b"\r\n")))
+
+        found = 0
+        while pos > floor:
+            start = max(floor, pos - block)
+            f.seek(start)
+            buf = f.read(pos - start)
+            idx = len(buf)
+            while True:
+                idx = buf.rfind(b"\n", 0, idx)
+                if idx < 0:
+                    break
+                found += 1
+                if found == n_rows:
+                    return start + idx + 1
+            pos = start
+        return floor
+
+    @staticmethod
+    def _date_offset(f, date, date_idx: int, floor: int, size: int) -> int:
+        """Byte offset of the first row dated >= `date` (bisection over byte positions)"""
+        def line_start(pos):
+            if pos <= floor:
+                return floor
+            f.seek(pos - 1)
+            f.readline()
+            return f.tell()
+
+        def on_or_after(pos):
+            f.seek(line_start(pos))
+            line = f.readline()
+            if not line.strip():
+                return True
+            return pd.Timestamp(line.decode().split(',')[date_idx].strip('"')) >= date
+
+        lo, hi = floor, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if on_or_after(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return line_start(lo)
+
+    def iter_dataset_chunks(self, filename: str, tail_rows: int = None,  # pyright: ignore[reportArgumentType]
+                            start_date: str = None, end_date: str = None,  # pyright: ignore[reportArgumentType]
+                            warmup_rows: int = 0,
+                            chunksize: int = None):  # pyright: ignore[reportArgumentType]
+        """
+        Yield the dataset in DataFrame chunks without reading the rest of the file.
+
+        Args:
+            tail_rows: Only the last `tail_rows` rows.
+            start_date / end_date: Only rows inside [start_date, end_date].
+            warmup_rows: Extra rows before the selected start (rolling windows).
+            chunksize: Rows per chunk (default STREAM_CHUNK_ROWS).
+
+        Peak memory is one chunk, independent of the file size.
+        """
+        file_path = self._dataset_path(filename)
+        chunksize = chunksize or model_config.STREAM_CHUNK_ROWS
+        end_ts = pd.Timestamp(end_date) if end_date is not None else None
+
+        with open(file_path, 'rb') as f:
+            columns, data_start = self._read_header(f)
+            size = os.fstat(f.fileno()).st_size
+
+            offset = data_start
+            if start_date is not None:
+                offset = self._date_offset(f, pd.Timestamp(start_date), columns.index('Date'), data_start, size)
+            elif tail_rows is not None:
+                offset = self._rows_back(f, tail_rows, size, data_start)
+            if warmup_rows:
+                offset = self._rows_back(f, warmup_rows, offset, data_start)
+
+            f.seek(offset)
+            for chunk in pd.read_csv(f, header=None, names=columns, chunksize=chunksize):
+                if 'Date' in chunk.columns:
+                    chunk['Date'] = pd.to_datetime(chunk['Date'])
+                    if end_ts is not None:
+                        past_end = chunk['Date'] > end_ts
+                        if past_end.any():
+                            chunk = chunk[~past_end]
+                            if len(chunk):
+                                yield chunk
+                            return
+                yield chunk
+
+    def load_dataset_tail(self, filename: str, n_rows: int) -> pd.DataFrame:
+        """
+        Last `n_rows` rows of a dataset (same result as load_dataset().tail()),
+        read by seeking from the end of the file.
+        """
+        chunks = list(self.iter_dataset_chunks(filename, tail_rows=n_rows))
+        if not chunks:
+            raise ValueError(f"Dataset is empty: {filename}")
+        df = pd.concat(chunks, ignore_index=True)
+
+        if 'Date' in df.columns and not df['Date'].is_monotonic_increasing:
+            logger.warning(f"{filename} is not sorted by date; falling back to a full read")
+            return self.load_dataset(filename).tail(n_rows)
+        return df
+
+    def load_dataset_range(self, filename: str, start_date: str = None,  # pyright: ignore[reportArgumentType]
+                           end_date: str = None) -> pd.DataFrame:  # pyright: ignore[reportArgumentType]
+        """Rows dated within [start_date, end_date], located by bisection"""
+        chunks = list(self.iter_dataset_chunks(filename, start_date=start_date, end_date=end_date))
+        if not chunks:
+            raise ValueError(f"No rows in {filename} between {start_date} and {end_date}")
+        return pd.concat(chunks, ignore_index=True)
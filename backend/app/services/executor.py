@@ -0,0 +1,199 @@
+# app/services/executor.py
+"""
+Off-event-loop execution of CPU-bound pipeline work with admission control.
+
+EM fitting holds the GIL for seconds; run in FastAPI's threadpool it slows
+down every other request, including /files and /. PipelineExecutor sends
+that work to a dedicated process pool instead and bounds the load:
+
+    - at most `max_workers` requests run at once,
+    - at most `queue_size` more wait for a worker; beyond that a request
+      is rejected immediately (OverloadedError → 429),
+    - a request not finished within `timeout` seconds (waiting included)
+      is answered with ExecutionTimeout (→ 503). A queued task is dropped;
+      a running one finishes in the background and keeps its slot until
+      then, so timeouts never let more work in than the pool can hold.
+"""
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class OverloadedError(RuntimeError):
+    """Admission refused: every worker is busy and the wait queue is full"""
+
+
+class ExecutionTimeout(RuntimeError):
+    """The request did not complete within its deadline"""
+
+
+# ── Worker-side entry points (must be importable module-level functions) ──
+_worker_pipeline = None
+
+
+def _pipeline():
+    """One PipelineService per worker process, reused across tasks (model cache)"""
+    global _worker_pipeline
+    if _worker_pipeline is None:
+        from app.services.pipeline_service import PipelineService
+        _worker_pipeline = PipelineService()
+    return _worker_pipeline
+
+
+def warm_worker_task() -> int:
+    """Import the engine and build the worker's PipelineService ahead of real work"""
+    import os
+    _pipeline()
+    return os.getpid()
+
+
+def run_analysis_task(filename: str, n_states: int, time_budget: float, feature_set) -> dict:
+    return _pipeline().run_analysis_on_file(filename, n_states=n_states,
+                                            time_budget=time_budget, feature_set=feature_set)
+
+
+def run_walk_forward_task(filename: str, feature_set, time_budget: float) -> dict:
+    return _pipeline().run_walk_forward(filename, feature_set=feature_set, time_budget=time_budget)
+
+
+def run_backtest_task(filename: str, rules: dict, cost_bps: float) -> dict:
+    return _pipeline().run_backtest(filename, rules=rules, cost_bps=cost_bps)
+
+
+def run_panel_task(filenames: list, n_states: int, scaling: str) -> dict:
+    return _pipeline().run_panel_analysis(filenames, n_states=n_states, scaling=scaling)
+
+
+def run_panel_features_task(filenames: list, calendar: str, max_ffill: int, vol_window: int,
+                            benchmark: str) -> dict:
+    return _pipeline().run_panel_features(filenames, calendar=calendar, max_ffill=max_ffill,
+                                          vol_window=vol_window, benchmark=benchmark)
+
+
+def run_bootstrap_task(filename: str, n_states: int, n_replicates: int, mean_block: float,
+                       confidence: float, time_budget: float, feature_set) -> dict:
+    return _pipeline().run_bootstrap(filename, n_states=n_states, n_replicates=n_replicates,
+                                     mean_block=mean_block, confidence=confidence,
+                                     time_budget=time_budget, feature_set=feature_set)
+
+
+def run_profiled_task(label: str, mode: str, task, *args) -> dict:
+    """task(*args) under the profiler (?profile=true); {'result', 'profile'}"""
+    from app.services.profiling import profile_call
+    return profile_call(label, mode, task, *args)
+
+
+class PipelineExecutor:
+    """Bounded process (or thread) pool for pipeline requests"""
+
+    def __init__(self, max_workers: int = None,  # pyright: ignore[reportArgumentType]
+                 queue_size: int = None,  # pyright: ignore[reportArgumentType]
+                 timeout: float = None,  # pyright: ignore[reportArgumentType]
+                 mode: str = None):  # pyright: ignore[reportArgumentType]
+        self.max_workers = max_workers or settings.PIPELINE_WORKERS
+        self.queue_size = settings.PIPELINE_QUEUE_SIZE if queue_size is None else queue_size
+        self.timeout = timeout or settings.PIPELINE_TIMEOUT_S
+        self.mode = mode or settings.PIPELINE_EXECUTOR
+        if self.mode not in ("process", "thread"):
+            raise ValueError(f"Unknown executor mode '{self.mode}', expected 'process' or 'thread'")
+
+        self._pool = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.stats = {'accepted': 0, 'rejected': 0, 'timed_out': 0, 'completed': 0, 'failed': 0}
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.queue_size
+
+    def _get_pool(self):
+        # Created on first use: no worker processes are spawned at import time
+        if self._pool is None:
+            if self.mode == "process":
+                # spawn: workers never inherit the parent's threads, locks or sqlite handles
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="pipeline")
+            logger.info(f"⚙️ Pipeline {self.mode} pool started: {self.max_workers} workers, "
+                        f"queue {self.queue_size}")
+        return self._pool
+
+    def _release(self, future, slots: int = 1):
+        with self._lock:
+            self._in_flight -= slots
+            if future.cancelled():
+                return
+            if future.exception() is None:
+                self.stats['completed'] += 1
+            else:
+                self.stats['failed'] += 1
+                if isinstance(future.exception(), BrokenProcessPool):
+                    logger.error("❌ Pipeline worker died; the pool will be recreated")
+                    self._pool = None
+
+    async def run(self, fn, *args, timeout: float = None,  # pyright: ignore[reportArgumentType]
+                  slots: int = 1):
+        """
+        Run fn(*args) in the pool; raises OverloadedError / ExecutionTimeout.
+        `slots` is the admission capacity the task holds: 1 plus any
+        processes it spreads its own work to (at most the whole capacity).
+        """
+        slots = max(1, min(slots, self.capacity))
+        with self._lock:
+            if self._in_flight + slots > self.capacity:
+                self.stats['rejected'] += 1
+                raise OverloadedError(f"Server busy: {self._in_flight} pipeline requests in flight "
+                                      f"(capacity {self.capacity}). Retry later.")
+            self._in_flight += slots
+            self.stats['accepted'] += 1
+            try:
+                future = self._get_pool().submit(fn, *args)
+            except Exception:
+                self._in_flight -= slots
+                raise
+        future.add_done_callback(lambda f: self._release(f, slots))
+
+        timeout = timeout or self.timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.stats['timed_out'] += 1
+            raise ExecutionTimeout(f"Pipeline request exceeded {timeout:.0f}s") from None
+
+    def warm_up(self) -> int:
+        """
+        Start every worker and let it import the engine, so the first real
+        request does not pay for process spawn + hmmlearn/sklearn imports.
+        Blocks until done; bypasses admission accounting. Returns the
+        number of distinct workers warmed.
+        """
+        pool = self._get_pool()
+        futures = [pool.submit(warm_worker_task) for _ in range(self.max_workers)]
+        warmed = len({f.result() for f in futures})
+        logger.info(f"🔥 Pipeline pool warmed: {warmed}/{self.max_workers} workers ready")
+        return warmed
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'max_workers': self.max_workers,
+                'queue_size': self.queue_size,
+                'timeout_s': self.timeout,
+                'in_flight': self._in_flight,
+                **self.stats,
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
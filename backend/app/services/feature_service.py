@@ -0,0 +1,110 @@
+# app/services/feature_service.py
+import logging
+import pandas as pd
+from collections import OrderedDict
+from app.services.data_service import DataService
+from app.engine.model_config import model_config
+from app.engine.panel_features import build_panel_tensor
+from app.engine.features import FeatureEngine
+from app.engine.feature_bank import resolve_feature_set, compute_feature_frame
+from app.engine.streaming_features import stream_feature_frame
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureService:
+    """
+    Builds feature arrays from stored datasets and keeps the most recent
+    ones in an LRU cache so repeated requests skip loading and alignment.
+    Cache keys include each file's catalog content hash, so re-fetched or
+    rewritten datasets are rebuilt automatically.
+    """
+
+    def __init__(self, data_service: DataService = None,  # pyright: ignore[reportArgumentType]
+                 cache_size: int = None):  # pyright: ignore[reportArgumentType]
+        self.data_service = data_service or DataService()
+        self.cache_size = cache_size or model_config.PANEL_CACHE_SIZE
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _file_version(self, filename: str) -> str:
+        return self.data_service.catalog.content_hash(filename)
+
+    def _cached(self, key: tuple, build):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return self._cache[key]
+
+        self.cache_misses += 1
+        value = build()
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def build_panel(self, filenames: list, calendar: str = "union",
+                    max_ffill: int = None,  # pyright: ignore[reportArgumentType]
+                    vol_window: int = None,  # pyright: ignore[reportArgumentType]
+                    benchmark: str = None) -> dict:  # pyright: ignore[reportArgumentType]
+        """
+        Date-aligned (assets × time × features) tensor for several datasets.
+        Tickers are taken from the filename prefix ("AAPL_2010-...csv" → AAPL);
+        `benchmark` is a ticker, e.g. "^GSPC".
+        """
+        tickers = [f.split('_')[0] for f in filenames]
+        if len(set(tickers)) != len(tickers):
+            raise ValueError(f"Each ticker may appear only once in a panel: {tickers}")
+
+        key = ('panel',
+               tuple((f, self._file_version(f)) for f in filenames),
+               calendar, max_ffill, vol_window, benchmark)
+
+        def build():
+            frames = {t: self.data_service.load_dataset(f) for t, f in zip(tickers, filenames)}
+            return build_panel_tensor(frames, calendar=calendar, max_ffill=max_ffill,
+                                      vol_window=vol_window, benchmark=benchmark)
+
+        return self._cached(key, build)
+
+    def get_features(self, filename: str, feature_set=None) -> dict:
+        """
+        Unscaled feature frame for a whole dataset, cached per
+        (dataset, feature set). Callers truncate and scale it themselves.
+        Returns {'df', 'feature_cols'}.
+        """
+        feature_cols = resolve_feature_set(feature_set)
+        key = ('features', filename, self._file_version(filename), tuple(feature_cols))
+
+        def build():
+            df_clean = FeatureEngine.load_ohlc(self.data_service.load_dataset(filename))
+            return {'df': compute_feature_frame(df_clean, feature_cols), 'feature_cols': feature_cols}
+
+        return self._cached(key, build)
+
+    def stream_features(self, filename: str, tail_rows: int = None,  # pyright: ignore[reportArgumentType]
+                        start_date: str = None, end_date: str = None,  # pyright: ignore[reportArgumentType]
+                        vol_window: int = None) -> pd.DataFrame:  # pyright: ignore[reportArgumentType]
+        """
+        Log_Return / Volatility frame for the last `tail_rows` rows or a date
+        range, computed chunk by chunk. Only the window plus `vol_window`
+        warm-up rows are read, so memory follows the window, not the file.
+        """
+        warmup = vol_window or model_config.VOLATILITY_WINDOW
+        chunks = self.data_service.iter_dataset_chunks(
+            filename,
+            tail_rows=tail_rows + warmup if tail_rows is not None and start_date is None else None,  # pyright: ignore[reportArgumentType]
+            start_date=start_date, end_date=end_date,
+            warmup_rows=warmup if start_date is not None else 0,
+        )
+        return stream_feature_frame(chunks, vol_window=vol_window,
+                                    tail_rows=tail_rows, start_date=start_date)
+
+    def cache_info(self) -> dict:
+        return {
+            'entries': len(self._cache),
+            'max_entries': self.cache_size,
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+        }
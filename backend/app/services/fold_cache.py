@@ -0,0 +1,71 @@
+# app/services/fold_cache.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FOLD_CACHE_FILENAME = "fold_cache.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folds (
+    key       TEXT PRIMARY KEY,
+    value     TEXT NOT NULL,
+    stored_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_folds_stored_at ON folds (stored_at);
+"""
+
+
+class FoldCache:
+    """
+    Persistent store of finished walk-forward folds (see
+    walk_forward_validation's fold_cache). SQLite in WAL mode so every
+    pipeline worker process can read and checkpoint folds concurrently;
+    each put commits at once, which is what lets an interrupted validation
+    resume. Entries are immutable (the key covers the data prefix), so
+    eviction is simply oldest-first beyond max_entries.
+    """
+
+    def __init__(self, data_dir: str, max_entries: int = None):  # pyright: ignore[reportArgumentType]
+        self.db_path = os.path.join(data_dir, FOLD_CACHE_FILENAME)
+        self.max_entries = max_entries or settings.FOLD_CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> dict:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM folds WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None  # pyright: ignore[reportReturnType]
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO folds (key, value, stored_at) VALUES (?, ?, ?)",
+                               (key, json.dumps(value), datetime.now(timezone.utc).isoformat()))
+            excess = self._conn.execute("SELECT COUNT(*) FROM folds").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute("DELETE FROM folds WHERE key IN "
+                                   "(SELECT key FROM folds ORDER BY stored_at LIMIT ?)", (excess,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM folds")
+
+    def status(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM folds").fetchone()[0]
+        return {'entries': entries, 'max_entries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses}
@@ -1,12 +1,29 @@
 # app/services/pipeline_service.py
+import copy
+import hashlib
+import json
 import logging
+import multiprocessing
+import multiprocessing.util
+import time
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 import numpy as np
+from sklearn.preprocessing import StandardScaler
+from app.core.config import settings
 from app.services.data_service import DataService
-from app.engine.features import HMMPreprocessor
+from app.services.feature_service import FeatureService
+from app.services.fold_cache import FoldCache
+from app.services.regime_analytics import bootstrap_summary
+from app.services.timeline_store import RegimeTimelineStore, build_timeline, timeline_history
+from app.engine.features import FeatureEngine
 from app.engine.hmm_model import RegimeDetector, HMMPredictor
 from app.engine.model_config import model_config
 from app.engine.walk_forward import walk_forward_validation
+from app.engine.refit_policy import RefitPolicy
+from app.engine.backtest import build_allocation_grid, backtest_walk_forward
+from app.engine.bootstrap import bootstrap_confidence_intervals
 
 logger = logging.getLogger(__name__)
 
@@ -14,31 +31,155 @@ class PipelineService:
     
     def __init__(self):
         self.data_service = DataService()
+        self.feature_service = FeatureService(self.data_service)
+        self.refit_policy = RefitPolicy()
+        # Finished walk-forward folds, shared by every worker through SQLite
+        self.fold_cache = FoldCache(self.data_service.data_dir)
+        # Decoded regime paths per ticker (range / point-in-time queries)
+        self.timeline_store = RegimeTimelineStore(self.data_service.data_dir)
+        # "<filename>:<n_states>:<features>:<fit settings digest>" → last
+        # fitted detector, its scaler and the training window it saw
+        self._model_cache = {}
+        self._bootstrap_pool = None
     
-    def run_analysis_on_file(self, filename: str, n_states: int = None) -> dict:
+    def _get_or_fit_detector(self, filename: str, df: pd.DataFrame,
+                             prep_result: dict, n_states: int,
+                             deadline: float = None) -> tuple:  # pyright: ignore[reportArgumentType]
+        """
+        Reuse the cached model for this file and these fit settings unless
+        the data it was trained on changed or the refit policy sees drift in
+        the bars it has not been trained on.
+        Returns (detector, scaled_features, refit_decision); a reused
+        detector is a per-request copy (see _reused_detector).
+        """
+        feature_cols = prep_result['feature_cols']
+        fit_json = json.dumps(model_config.fit_fingerprint(), sort_keys=True, default=str)
+        fit_key = hashlib.sha256(fit_json.encode()).hexdigest()[:16]
+        key = f"{filename}:{n_states}:{','.join(feature_cols)}:{fit_key}"
+        content_hash = self.data_service.catalog.content_hash(filename)
+        raw_features = df[feature_cols].to_numpy(dtype=np.float64)
+        cached = self._model_cache.get(key)
+        decision = None
+
+        if cached is not None:
+            last_date = cached['last_date']
+            if self._trained_on(cached, content_hash, df.index, raw_features):
+                features = cached['scaler'].transform(raw_features)
+                n_new = int((df.index > last_date).sum())
+                decision = self.refit_policy.evaluate(
+                    cached['detector'], features, n_new,
+                    cached['train_ll_per_bar'], key=key,
+                )
+                if not decision['refit']:
+                    return self._reused_detector(cached), features, decision
+            else:
+                decision = self.refit_policy.force(key, "data no longer matches the cached model's training window")
+
+        scaled_features = prep_result['scaled_features']
+        detector = RegimeDetector(n_states=n_states)
+        detector.fit(scaled_features, deadline=deadline)
+        detector.training_stats['reused'] = False
+
+        self._model_cache[key] = {
+            'detector': detector,
+            'fitted_at': datetime.now(timezone.utc).isoformat(),
+            'content_hash': content_hash,
+            'scaler': prep_result['scaler'],
+            'last_date': df.index[-1],
+            'train_index': df.index,
+            'train_values': raw_features,
+            'train_ll_per_bar': detector.training_stats['log_likelihood'] / len(scaled_features),
+        }
+        return detector, scaled_features, decision
+    
+    @staticmethod
+    def _trained_on(cached: dict, content_hash: str, index: pd.Index, raw_features: np.ndarray) -> bool:
+        """
+        True when the file still holds the bars the cached model was fitted
+        on: same content, or only bars appended after its last training date
+        (the rows up to that date equal the end of the training window).
+        """
+        if cached['content_hash'] == content_hash:
+            return True
+        seen = index <= cached['last_date']
+        n_seen = int(seen.sum())
+        if n_seen == 0 or n_seen > len(cached['train_index']) or index[n_seen - 1] != cached['last_date']:
+            return False
+        return (cached['train_index'][-n_seen:].equals(index[:n_seen])
+                and np.array_equal(cached['train_values'][-n_seen:], raw_features[:n_seen]))
+
+    @staticmethod
+    def _reused_detector(cached: dict) -> RegimeDetector:
+        """
+        Per-request view of a cached detector. The fitted HMM is shared
+        read-only; regime_mapping (rewritten by assign_regime_meaning) and
+        training_stats are copied, the latter marked reused=True with the
+        original fit's time, so requests never alter the cache entry.
+        """
+        detector = copy.copy(cached['detector'])
+        detector.regime_mapping = dict(detector.regime_mapping)
+        detector.training_stats = {**detector.training_stats, 'reused': True,
+                                   'fitted_at': cached['fitted_at']}
+        return detector
+
+    def _streamed_features(self, filename: str, tail_rows: int) -> dict:
+        """
+        Scaled default features (csv_to_features layout) of the last
+        `tail_rows` bars. Only those bars plus the volatility warm-up are
+        read, and returns/volatility are computed chunk by chunk, so the
+        values equal a whole-file computation.
+        """
+        df = self.feature_service.stream_features(filename, tail_rows=tail_rows)
+        if not df.index.is_monotonic_increasing:
+            logger.warning(f"{filename} is not sorted by date; falling back to a full read")
+            df_clean = FeatureEngine.load_ohlc(self.data_service.load_dataset(filename))
+            df = FeatureEngine.prepare_features(df_clean).tail(tail_rows).copy()
+        scaled, scaler, feature_cols = FeatureEngine.scale_features(df)
+        return {'df': df, 'scaled_features': scaled, 'scaler': scaler,
+                'feature_cols': feature_cols, 'n_samples': len(df)}
+
+    def _training_features(self, filename: str, feature_set=None) -> tuple:
+        """
+        Scaled features of the last MAX_TRAINING_DAYS bars (only that tail
+        is read from disk for the default features). Returns (prep_result,
+        prep_full); prep_full is the cached full-history frame of a custom
+        feature_set, else None.
+        """
+        max_days = model_config.MAX_TRAINING_DAYS
+        if feature_set is None:
+            try:
+                prep_result = self._streamed_features(filename, max_days)
+            except FileNotFoundError as e:
+                logger.error(f"❌ Dataset not found: {e}")
+                raise
+            logger.info(f"📥 Streamed last {prep_result['n_samples']} feature rows (max {max_days})")
+            return prep_result, None
+        prep_full = self.feature_service.get_features(filename, feature_set)
+        df_features = prep_full['df'].tail(max_days).copy()
+        scaled, scaler, feature_cols = FeatureEngine.scale_features(df_features, prep_full['feature_cols'])
+        return {'df': df_features, 'scaled_features': scaled,
+                'scaler': scaler, 'feature_cols': feature_cols}, prep_full
+
+    def run_analysis_on_file(self, filename: str, n_states: int = None,  # pyright: ignore[reportArgumentType]
+                             time_budget: float = None,  # pyright: ignore[reportArgumentType]
+                             feature_set=None) -> dict:
+        """
+        time_budget (seconds) bounds model fitting: the main fit may use
+        MAIN_FIT_BUDGET_SHARE of it, walk-forward folds share what is left.
+        feature_set (FEATURE_SETS name or list of feature-bank names) swaps
+        the default Log_Return/Volatility pair; those frames come from the
+        FeatureService cache and are truncated after feature computation.
+        """
+        started = time.monotonic()
+        deadline = started + time_budget if time_budget is not None else None
+
         logger.info("="*60)
         logger.info(f"🚀 PIPELINE START: {filename}")
         logger.info("="*60)
         
-        # === Step 1: Load Data ===
-        try:
-            df_raw = self.data_service.load_dataset(filename)
-        except FileNotFoundError as e:
-            logger.error(f"❌ Dataset not found: {e}")
-            raise
-        
-        # ✅ FIX 1: Save full data BEFORE truncation
-        df_raw_full = df_raw.copy()
-
+        # === Step 1-3: Load Data + Feature Engineering ===
         max_days = model_config.MAX_TRAINING_DAYS
-        original_length = len(df_raw)
-        
-        if original_length > max_days:
-            logger.info(f"⚠️ Truncating data: {original_length} → {max_days} days")
-            df_raw = df_raw.tail(max_days)
-        
-        # === Step 2-3: Feature Engineering ===
-        prep_result = HMMPreprocessor.csv_to_features(df_raw)
+        prep_result, prep_full = self._training_features(filename, feature_set)
         df = prep_result['df']
         scaled_features = prep_result['scaled_features']
         
@@ -49,9 +190,13 @@ class PipelineService:
         else:
             logger.info(f"📌 Manual override: n_states={n_states}")
         
-        # === Step 5: Train HMM ===
-        detector = RegimeDetector(n_states=n_states)
-        detector.fit(scaled_features)
+        # === Step 5: Train HMM (or reuse the cached one if nothing drifted) ===
+        main_fit_deadline = None
+        if deadline is not None:
+            main_fit_deadline = time.monotonic() + max(0.0, deadline - time.monotonic()) * model_config.MAIN_FIT_BUDGET_SHARE
+        detector, scaled_features, refit_decision = self._get_or_fit_detector(
+            filename, df, prep_result, n_states, deadline=main_fit_deadline
+        )
         
         # === Step 6: Decode States ===
         states = detector.predict_states(scaled_features)
@@ -65,11 +210,15 @@ class PipelineService:
         # ✅ FIX 2: Walk-forward wrapped in try/except so it never breaks /analyze
         wf_summary = None
         try:
-            prep_full = HMMPreprocessor.csv_to_features(df_raw_full)
+            if prep_full is None:
+                # ✅ FIX 1: walk-forward sees the history beyond the training tail
+                prep_full = self._streamed_features(filename, model_config.WALK_FORWARD_MAX_ROWS)
             wf_summary = walk_forward_validation(
                 df=prep_full['df'],
                 feature_cols=prep_full['feature_cols'],
                 n_states=n_states,
+                time_budget=max(0.0, deadline - time.monotonic()) if deadline is not None else None,
+                fold_cache=self.fold_cache,
             )
             logger.info(f"✅ Walk-forward done: {wf_summary['n_folds']} folds")
         except Exception as e:
@@ -86,19 +235,30 @@ class PipelineService:
         current_state = int(states[-1])
         current_regime = detector.regime_mapping.get(current_state, "Unknown")
         
-        recent_states = states          # all states, no cutoff
-        recent_dates = df.index
-        
-        regime_history = [
-    {
-        'date': date.strftime('%Y-%m-%d'),
-        'regime': detector.regime_mapping.get(s, "Unknown"),
-        'close': float(df.loc[date, 'Close']) if 'Close' in df.columns else None
-    }
-    for date, s in zip(recent_dates, recent_states)
-]
+        # The stored timeline is the history: the dashboard reads the same
+        # compact arrays that /timeline queries
+        timeline = build_timeline(
+            df.index, states,
+            posteriors=detector.backend.posteriors(detector.model, scaled_features),
+            labels=[detector.regime_mapping.get(s, "Unknown") for s in range(n_states)],
+            close=df['Close'].values if 'Close' in df.columns else None,
+            meta={'filename': filename, 'n_states': n_states, 'features': prep_result['feature_cols'],
+                  'content_hash': self.data_service.catalog.content_hash(filename)},
+        )
+        try:
+            self.timeline_store.put(filename.split('_')[0], timeline)
+        except OSError as e:
+            logger.warning(f"⚠️ Regime timeline not stored: {e}")
+        regime_history = timeline_history(timeline)
         
         model_params = detector.get_model_params()
+
+        self.data_service.catalog.record_analysis(filename, "analyze", {
+            'n_states': n_states,
+            'features': prep_result['feature_cols'],
+            'max_training_days': max_days,
+            'last_date': df.index[-1],
+        })
         
         logger.info("="*60)
         logger.info("✅ PIPELINE COMPLETE")
@@ -121,6 +281,272 @@ class PipelineService:
             "model_params": {
                 "start_probs": model_params['start_probs'].tolist(),
                 "transition_matrix": model_params['transition_matrix'].tolist(),
+                # Scaled feature space; used for regime signatures
+                "means": model_params['means'].tolist(),
+                "covariances": model_params['covariances'].tolist(),
             },
             "walk_forward": wf_summary,  # ✅ FIX 3: Added to return dict
-        }
\ No newline at end of file
+            "refit_decision": refit_decision,
+        }
+
+    def _get_bootstrap_pool(self):
+        # Created on first use and kept: spawning workers + importing the
+        # engine costs more than a small bootstrap run
+        if self._bootstrap_pool is None and settings.BOOTSTRAP_WORKERS > 0:
+            self._bootstrap_pool = ProcessPoolExecutor(max_workers=settings.BOOTSTRAP_WORKERS,
+                                                       mp_context=multiprocessing.get_context("spawn"))
+            # Inside a pipeline worker, process exit joins child processes
+            # before concurrent.futures' own exit hook could stop them. Shut
+            # the pool down first: priority above the call queue's own close
+            # finalizer (10), or the stop sentinels never reach the workers
+            multiprocessing.util.Finalize(None, self._bootstrap_pool.shutdown,
+                                          kwargs={'wait': True, 'cancel_futures': True},
+                                          exitpriority=100)
+        return self._bootstrap_pool
+
+    def run_bootstrap(self, filename: str, n_states: int = None,  # pyright: ignore[reportArgumentType]
+                      n_replicates: int = None, mean_block: float = None,  # pyright: ignore[reportArgumentType]
+                      confidence: float = None, time_budget: float = None,  # pyright: ignore[reportArgumentType]
+                      feature_set=None) -> dict:
+        """
+        Block-bootstrap confidence intervals around the model /analyze uses
+        (the cached detector when nothing drifted). Replicate refits run in
+        this worker, or in its bootstrap process pool when
+        BOOTSTRAP_WORKERS > 0; time_budget (seconds) bounds them.
+        """
+        n_states = n_states or model_config.DEFAULT_N_STATES
+        time_budget = time_budget or settings.BOOTSTRAP_TIME_BUDGET_S
+        prep_result, _ = self._training_features(filename, feature_set)
+        df = prep_result['df']
+        detector, scaled_features, _ = self._get_or_fit_detector(filename, df, prep_result, n_states)
+        states = detector.predict_states(scaled_features)
+        detector.assign_regime_meaning(df, states)
+
+        scaler = prep_result['scaler']
+        logger.info(f"🎲 Bootstrap: {n_replicates or model_config.BOOTSTRAP_REPLICATES} replicates, "
+                    f"budget {time_budget:.0f}s")
+        result = bootstrap_confidence_intervals(
+            scaled_features, detector.get_model_params(),
+            n_replicates=n_replicates, mean_block=mean_block, confidence=confidence,
+            time_budget=time_budget, executor=self._get_bootstrap_pool(),
+            feature_scale=(scaler.mean_, scaler.scale_),
+            max_in_flight=2 * max(settings.BOOTSTRAP_WORKERS, 1),
+        )
+        logger.info(f"   ✅ {result['n_completed']}/{result['n_requested']} replicates "
+                    f"in {result['elapsed_seconds']:.1f}s")
+        return bootstrap_summary(
+            result,
+            labels=[detector.regime_mapping.get(s, "Unknown") for s in range(n_states)],
+            feature_cols=prep_result['feature_cols'],
+            meta={'filename': filename, 'n_states': n_states, 'total_days': len(df)},
+        )
+
+    def run_walk_forward(self, filename: str, feature_set=None,
+                         time_budget: float = None) -> dict:  # pyright: ignore[reportArgumentType]
+        """
+        Walk-forward validation on the last WALK_FORWARD_MAX_ROWS bars, the
+        history /analyze validates on (expanding window, 500-bar initial
+        train, 60-bar test/step, 3 states). A custom feature_set comes from
+        the FeatureService cache.
+        """
+        max_rows = model_config.WALK_FORWARD_MAX_ROWS
+        if feature_set is None:
+            prep_result = self._streamed_features(filename, max_rows)
+        else:
+            prep_result = self.feature_service.get_features(filename, feature_set)
+
+        return walk_forward_validation(
+            df=prep_result['df'].tail(max_rows),
+            feature_cols=prep_result['feature_cols'],
+            n_states=3,
+            train_size=500,
+            test_size=60,
+            step_size=60,
+            expanding=True,
+            time_budget=time_budget,
+            fold_cache=self.fold_cache,
+        )
+
+    def run_backtest(self, filename: str, rules: dict = None,  # pyright: ignore[reportArgumentType]
+                     cost_bps: float = 0.0) -> dict:
+        """
+        Backtest regime-conditioned allocation rules on the walk-forward
+        out-of-sample regimes (positions lag the regime by one bar).
+        """
+        prep_result = self._streamed_features(filename, model_config.WALK_FORWARD_MAX_ROWS)
+        df = prep_result['df']
+
+        summary = walk_forward_validation(
+            df=df,
+            feature_cols=prep_result['feature_cols'],
+            n_states=3,
+            train_size=500,
+            test_size=60,
+            step_size=60,
+            expanding=True,
+            return_regime_path=True,
+            fold_cache=self.fold_cache,
+        )
+
+        # Regimes the walk-forward models actually produced (their mapping)
+        labels = summary['regime_path']['labels']
+        if rules:
+            rule_names = list(rules)
+            allocations = []
+            for name, rule in rules.items():
+                missing = [label for label in labels if label not in rule]
+                unknown = sorted(set(rule) - set(labels))
+                if missing or unknown:
+                    raise ValueError(f"Rule '{name}' must give a weight for exactly {labels} "
+                                     f"(missing {missing}, unknown {unknown})")
+                allocations.append([rule[label] for label in labels])
+        else:
+            allocations, rule_names = build_allocation_grid(labels)
+
+        return backtest_walk_forward(
+            df, summary, allocations, labels,
+            rule_names=rule_names, cost_bps=cost_bps,
+        )
+
+    def run_panel_analysis(self, filenames: list, n_states: int = None,  # pyright: ignore[reportArgumentType]
+                           scaling: str = "per_ticker") -> dict:
+        """
+        Fit one shared HMM across several tickers (pooled EM over independent
+        sequences: per-ticker forward-backward, one M-step over all of them).
+        Every ticker ends up on the same state definitions.
+
+        scaling:
+            "per_ticker" – each ticker is standardized with its own scaler
+                           (states describe relative conditions).
+            "pooled"     – one scaler over the concatenated raw features
+                           (states keep absolute return/volatility levels).
+        """
+        if scaling not in ("per_ticker", "pooled"):
+            raise ValueError(f"Unknown scaling '{scaling}'. Choose 'per_ticker' or 'pooled'")
+        if len(filenames) < 2:
+            raise ValueError("Panel analysis needs at least 2 datasets")
+        if len(set(filenames)) != len(filenames):
+            raise ValueError("Duplicate datasets in panel")
+
+        n_states = n_states or model_config.DEFAULT_N_STATES
+        logger.info("="*60)
+        logger.info(f"🚀 PANEL PIPELINE START: {len(filenames)} tickers, n_states={n_states}, scaling={scaling}")
+        logger.info("="*60)
+
+        # === Load + engineer features per ticker ===
+        panel = []
+        for filename in filenames:
+            prep_result = self._streamed_features(filename, model_config.MAX_TRAINING_DAYS)
+            panel.append((filename, prep_result))
+
+        feature_cols = panel[0][1]['feature_cols']
+        if scaling == "pooled":
+            raw = np.vstack([prep['df'][feature_cols].values for _, prep in panel])
+            scaler = StandardScaler().fit(raw)
+            sequences = [scaler.transform(prep['df'][feature_cols].values) for _, prep in panel]
+        else:
+            sequences = [prep['scaled_features'] for _, prep in panel]
+
+        lengths = [len(seq) for seq in sequences]
+        X = np.vstack(sequences)
+
+        # === Pooled fit ===
+        detector = RegimeDetector(n_states=n_states)
+        detector.fit(X, lengths=lengths)
+
+        # === Decode each ticker with the shared model ===
+        if len(set(lengths)) == 1:
+            per_ticker_states = list(detector.predict_states_batch(np.stack(sequences)))
+        else:
+            per_ticker_states = [detector.predict_states(seq) for seq in sequences]
+
+        df_all = pd.concat([prep['df'] for _, prep in panel])
+        state_stats = detector.assign_regime_meaning(df_all, np.concatenate(per_ticker_states))
+        predictor = HMMPredictor(detector, state_stats)
+
+        tickers = []
+        for (filename, prep), seq, states in zip(panel, sequences, per_ticker_states):
+            df = prep['df']
+            regimes = [detector.regime_mapping.get(int(s), "Unknown") for s in states]
+            counts = pd.Series(regimes).value_counts()
+            current_state = int(states[-1])
+            tickers.append({
+                "filename": filename,
+                "total_days": len(df),
+                "current_state": current_state,
+                "current_regime": detector.regime_mapping.get(current_state, "Unknown"),
+                "regime_distribution": {r: float(c / len(regimes)) for r, c in counts.items()},
+                "persistence": detector.validate_persistence(states),
+                "prediction": predictor.get_prediction_details(seq),
+                "regime_history": [
+                    {
+                        'date': date.strftime('%Y-%m-%d'),
+                        'regime': regime,
+                        'close': float(close) if close is not None else None,
+                    }
+                    for date, regime, close in zip(
+                        df.index, regimes,
+                        df['Close'] if 'Close' in df.columns else [None] * len(df),
+                    )
+                ],
+            })
+
+        model_params = detector.get_model_params()
+
+        logger.info("="*60)
+        logger.info("✅ PANEL PIPELINE COMPLETE")
+        logger.info("="*60)
+
+        return {
+            "filenames": list(filenames),
+            "n_states": n_states,
+            "scaling": scaling,
+            "total_days": int(sum(lengths)),
+            "features_used": feature_cols,
+            "training_stats": detector.training_stats,
+            "regime_mapping": detector.regime_mapping,
+            "state_statistics": state_stats,
+            "model_params": {
+                "start_probs": model_params['start_probs'].tolist(),
+                "transition_matrix": model_params['transition_matrix'].tolist(),
+            },
+            "tickers": tickers,
+        }
+
+    def run_panel_features(self, filenames: list, calendar: str = "union",
+                           max_ffill: int = None,  # pyright: ignore[reportArgumentType]
+                           vol_window: int = None,  # pyright: ignore[reportArgumentType]
+                           benchmark: str = None) -> dict:  # pyright: ignore[reportArgumentType]
+        """
+        Build (or reuse from this worker's feature cache) the date-aligned
+        multi-ticker feature tensor. Returns its layout, per-ticker coverage
+        and each ticker's latest valid feature row, not the tensor itself.
+        """
+        panel = self.feature_service.build_panel(
+            filenames, calendar=calendar, max_ffill=max_ffill,
+            vol_window=vol_window, benchmark=benchmark,
+        )
+        features, mask, dates = panel['features'], panel['mask'], panel['dates']
+
+        latest = {}
+        for a, ticker in enumerate(panel['tickers']):
+            valid_idx = mask[a].nonzero()[0]
+            if len(valid_idx) == 0:
+                latest[ticker] = None
+                continue
+            t = valid_idx[-1]
+            latest[ticker] = {
+                'date': dates[t].strftime('%Y-%m-%d'),
+                **dict(zip(panel['feature_names'], features[a, t].tolist())),
+            }
+
+        return {
+            "shape": list(features.shape),
+            "tickers": panel['tickers'],
+            "feature_names": panel['feature_names'],
+            "start_date": dates[0].strftime('%Y-%m-%d'),
+            "end_date": dates[-1].strftime('%Y-%m-%d'),
+            "coverage": panel['coverage'],
+            "latest": latest,
+            "cache": self.feature_service.cache_info(),
+        }
@@ -0,0 +1,255 @@
+# app/services/profiling.py
+"""
+On-demand profiling of a single pipeline request (/analyze and /validate
+with ?profile=true and a valid X-Profile-Token header).
+
+The task runs in its pipeline worker under one of two profilers:
+
+    sampling    a daemon thread records the worker thread's Python stack
+                every PROFILE_SAMPLE_INTERVAL_MS; stacks are stored in the
+                collapsed format ("root;caller;callee count" per line) that
+                flamegraph.pl, speedscope and inferno read directly
+    cprofile    deterministic cProfile; the .pstats dump is stored
+                (snakeviz, flameprof, gprof2dot) and the top functions by
+                cumulative time are summarised
+
+Both run with tracemalloc on: peak traced memory and the allocation
+sites still holding the most memory at the end are reported. tracemalloc
+slows allocation-heavy Python code down noticeably, so wall times of a
+profiled request are an upper bound. Files go to DATA_DIR/profiles as
+<id>.json (summary) plus <id>.collapsed or <id>.pstats.
+
+Nothing here is imported or executed unless a request asks for a profile.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("sampling", "cprofile")
+PROFILE_DIRNAME = "profiles"
+TOP_N = 25
+_ID_PATTERN = re.compile(r"^[\w.-]+$")
+
+
+def check_mode(mode: str):
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}', expected one of {PROFILE_MODES}")
+
+
+def authorize(token: str):
+    """PermissionError unless profiling is enabled and `token` matches PROFILING_TOKEN"""
+    expected = settings.PROFILING_TOKEN
+    if not expected:
+        raise PermissionError("Profiling is disabled (PROFILING_TOKEN is not set)")
+    if not token or not hmac.compare_digest(token.encode(), expected.encode()):
+        raise PermissionError("Invalid profiling token")
+
+
+def _frame_label(frame) -> str:
+    module = frame.f_globals.get('__name__', '?')
+    return f"{module}:{frame.f_code.co_name}".replace(";", ":").replace(" ", "_")
+
+
+class StackSampler:
+    """Counts the distinct Python stacks of one thread, sampled from a daemon thread"""
+
+    def __init__(self, thread_id: int, interval: float, root_frame=None, root_label: str = "root"):
+        self.thread_id = thread_id
+        self.interval = interval
+        # Frames at and above root_frame (pool worker machinery) are cut off
+        self.root_frame = root_frame
+        self.root_label = root_label
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and frame is not self.root_frame:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(self.root_label)
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, n: int = TOP_N) -> list:
+        """Hottest functions by self (leaf) samples, with their total (anywhere on the stack) share"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+        samples = max(self.samples, 1)
+        return [{'function': name, 'self_pct': 100.0 * own[name] / samples,
+                 'total_pct': 100.0 * total[name] / samples, 'samples': own[name]}
+                for name in sorted(total, key=lambda name: (own[name], total[name]), reverse=True)[:n]]
+
+
+def _cprofile_functions(profiler: cProfile.Profile, n: int = TOP_N) -> list:
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:n]  # pyright: ignore[reportAttributeAccessIssue]
+    return [{'function': f"{os.path.basename(filename)}:{lineno}({name})", 'ncalls': nc,
+             'tottime': tt, 'cumtime': ct}
+            for (filename, lineno, name), (cc, nc, tt, ct, callers) in rows]
+
+
+def _memory_summary(snapshot: tracemalloc.Snapshot, current: int, peak: int, n: int = TOP_N) -> dict:
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),   # the sampler's own stack table
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ))
+    top = snapshot.statistics("lineno")[:n]
+    return {
+        'peak_mb': peak / 2 ** 20,
+        'retained_mb': current / 2 ** 20,
+        'top_allocations': [{'location': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                             'size_kb': stat.size / 1024, 'count': stat.count} for stat in top],
+    }
+
+
+def profile_dir() -> str:
+    return os.path.join(settings.DATA_DIR, PROFILE_DIRNAME)
+
+
+def _store(summary: dict, sampler: StackSampler = None,  # pyright: ignore[reportArgumentType]
+           profiler: cProfile.Profile = None) -> dict:  # pyright: ignore[reportArgumentType]
+    root = profile_dir()
+    os.makedirs(root, exist_ok=True)
+    base = os.path.join(root, summary['id'])
+    if sampler is not None:
+        with open(f"{base}.collapsed", "w") as f:
+            f.write(sampler.collapsed())
+        summary['file'] = f"{summary['id']}.collapsed"
+    if profiler is not None:
+        profiler.dump_stats(f"{base}.pstats")
+        summary['file'] = f"{summary['id']}.pstats"
+    with open(f"{base}.json", "w") as f:
+        json.dump(summary, f, default=str)
+
+    # Keep the newest PROFILE_MAX_STORED profiles
+    stored = sorted((e for e in os.scandir(root) if e.name.endswith(".json")),
+                    key=lambda e: e.stat().st_mtime)
+    for entry in stored[:max(len(stored) - settings.PROFILE_MAX_STORED, 0)]:
+        stem = entry.path[:-len(".json")]
+        for ext in (".json", ".collapsed", ".pstats"):
+            try:
+                os.remove(stem + ext)
+            except FileNotFoundError:
+                pass
+    return summary
+
+
+def profile_call(label: str, mode: str, fn, *args) -> dict:
+    """
+    Run fn(*args) under the `mode` profiler and tracemalloc (in the
+    calling thread). Returns {'result': fn's result, 'profile': summary};
+    the profile files are stored before returning.
+    """
+    check_mode(mode)
+    safe_label = re.sub(r"[^\w.-]", "_", label)
+    profile_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}_{safe_label}_{uuid.uuid4().hex[:6]}"
+    sampler, profiler = None, None
+    # tracemalloc is process-wide: leave it alone when someone else started it
+    own_tracing = not tracemalloc.is_tracing()
+    if own_tracing:
+        tracemalloc.start()
+    else:
+        tracemalloc.reset_peak()
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    try:
+        if mode == "sampling":
+            sampler = StackSampler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000,
+                                   root_frame=sys._getframe(), root_label=safe_label)
+            sampler.start()
+            try:
+                result = fn(*args)
+            finally:
+                sampler.stop()
+        else:
+            profiler = cProfile.Profile()
+            result = profiler.runcall(fn, *args)
+        wall, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        if own_tracing:
+            tracemalloc.stop()
+
+    summary = {
+        'id': profile_id,
+        'label': label,
+        'mode': mode,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'wall_seconds': wall,
+        'cpu_seconds': cpu,
+        'memory': _memory_summary(snapshot, current, peak),
+    }
+    if sampler is not None:
+        summary.update({'samples': sampler.samples, 'interval_ms': settings.PROFILE_SAMPLE_INTERVAL_MS,
+                        'top_functions': sampler.top_functions()})
+    else:
+        summary['top_functions'] = _cprofile_functions(profiler)  # pyright: ignore[reportArgumentType]
+    summary = _store(summary, sampler, profiler)  # pyright: ignore[reportArgumentType]
+    logger.info(f"🔬 Profile {profile_id}: {wall:.2f}s wall, peak {summary['memory']['peak_mb']:.1f} MB")
+    return {'result': result, 'profile': summary}
+
+
+# ── Reading stored profiles ─────────────────────────────────────────────
+def _profile_base(profile_id: str) -> str:
+    if not _ID_PATTERN.match(profile_id):
+        raise ValueError(f"Invalid profile id '{profile_id}'")
+    return os.path.join(profile_dir(), profile_id)
+
+
+def list_profiles() -> list:
+    """Stored profile summaries, newest first"""
+    root = profile_dir()
+    if not os.path.isdir(root):
+        return []
+    summaries = []
+    for name in sorted((n for n in os.listdir(root) if n.endswith(".json")), reverse=True):
+        try:
+            with open(os.path.join(root, name)) as f:
+                summaries.append(json.load(f))
+        except (OSError, ValueError):
+            continue   # removed or being written concurrently
+    return summaries
+
+
+def profile_file(profile_id: str) -> str:
+    """Path of a stored profile's stacks (.collapsed) or stats (.pstats)"""
+    base = _profile_base(profile_id)
+    for ext in (".collapsed", ".pstats"):
+        if os.path.exists(base + ext):
+            return base + ext
+    raise ValueError(f"No stored profile '{profile_id}'")
@@ -0,0 +1,106 @@
+# app/services/regime_analytics.py
+import numpy as np
+import pandas as pd
+from app.engine.model_config import model_config
+from app.engine.rolling_regimes import rolling_regime_stats
+from app.engine.signature_index import regime_signature
+
+
+def _nullable(values: np.ndarray) -> list:
+    """float array → nested lists with None for NaN/inf (JSON has no NaN)"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), values, None).tolist()
+
+
+def rolling_analytics(analysis: dict, window: int, step: int) -> dict:
+    """
+    Rolling persistence, empirical transition matrices and per-regime
+    return/volatility over the decoded path of an /analyze result.
+    Returns and volatility are rebuilt from the history's closes the same
+    way the feature engine computes them.
+    """
+    mapping = {int(state): label for state, label in analysis['regime_mapping'].items()}
+    n_states = analysis['n_states']
+    to_state = {label: state for state, label in mapping.items()}
+    history = analysis['regime_history']
+    states = np.array([to_state[item['regime']] for item in history], dtype=np.int64)
+    dates = [item['date'] for item in history]
+
+    returns = volatility = None
+    closes = [item.get('close') for item in history]
+    if all(c is not None for c in closes):
+        log_return = np.log(pd.Series(closes, dtype=np.float64)).diff()
+        returns = log_return.to_numpy()
+        volatility = log_return.rolling(model_config.VOLATILITY_WINDOW).std().to_numpy()
+
+    stats = rolling_regime_stats(states, n_states, window, step=step,
+                                 returns=returns, volatility=volatility)  # pyright: ignore[reportArgumentType]
+    result = {
+        'filename': analysis['filename'],
+        'window': window,
+        'step': step,
+        'regimes': [mapping.get(s, f"Regime_{s}") for s in range(n_states)],
+        'dates': [dates[i] for i in stats['ends']],
+        'occupancy': stats['occupancy'].tolist(),
+        'switches': stats['switches'].tolist(),
+        'transition_matrix': _nullable(stats['transition_matrix']),
+        'expected_duration': _nullable(stats['expected_duration']),
+    }
+    for key in ('mean_return', 'std_return', 'mean_volatility'):
+        if key in stats:
+            result[key] = _nullable(stats[key])
+    return result
+
+
+def signature_from_analysis(analysis: dict) -> tuple:
+    """
+    (key, layout, vector, meta) of an /analyze result for the signature
+    index. The key is the ticker: its latest analysis replaces the previous one.
+    """
+    n_states = analysis['n_states']
+    mapping = {int(state): label for state, label in analysis['regime_mapping'].items()}
+    params = analysis['model_params']
+    current = analysis['prediction'].get('current_probabilities')
+    if current is None or 'means' not in params:
+        raise ValueError("Analysis predates regime signatures; rerun it")
+
+    stats = {int(state): s for state, s in analysis['state_statistics'].items()}
+    vector = regime_signature(
+        current_probs=[current[mapping[s]] for s in range(n_states)],
+        means=params['means'],
+        covariances=params['covariances'],
+        transmat=params['transition_matrix'],
+        mean_returns=[stats[s]['mean_return'] for s in range(n_states)],
+    )
+    meta = {
+        'filename': analysis['filename'],
+        'current_regime': analysis['current_regime'],
+        'current_probabilities': current,
+        'next_regime': analysis['prediction']['next_regime'],
+    }
+    return analysis['filename'].split('_')[0], (n_states, tuple(analysis['features_used'])), vector, meta
+
+
+def bootstrap_summary(result: dict, labels: list, feature_cols: list, meta: dict = None) -> dict:  # pyright: ignore[reportArgumentType]
+    """
+    JSON view of bootstrap_confidence_intervals keyed by regime label:
+    transition_matrix as K×K lists per bound, expected_duration per regime,
+    state means per regime and feature (feature units).
+    """
+    def bounds(interval: dict, index=()) -> dict:
+        return {key: _nullable(interval[key][index]) for key in ('estimate', 'lower', 'upper', 'std')}
+
+    means = result['means']
+    return {
+        **(meta or {}),
+        'regimes': list(labels),
+        'features': list(feature_cols),
+        'transition_matrix': bounds(result['transition_matrix']),
+        'expected_duration': {label: bounds(result['expected_duration'], k)
+                              for k, label in enumerate(labels)},
+        'state_means': {label: {feature: bounds(means, (k, j)) for j, feature in enumerate(feature_cols)}
+                        for k, label in enumerate(labels)},
+        **{key: result[key] for key in ('confidence', 'mean_block', 'n_requested', 'n_completed',
+                                        'n_converged', 'mean_refit_iterations', 'timed_out',
+                                        'elapsed_seconds')},
+    }
@@ -0,0 +1,46 @@
+# app/services/result_cache.py
+import threading
+from collections import OrderedDict
+from app.core.config import settings
+
+
+class ResultCache:
+    """
+    LRU cache of finished pipeline responses. Keys come from
+    single_flight.flight_key and embed the dataset's catalog content hash,
+    which is re-checked (size/mtime) on every lookup: a file rewritten by
+    /fetch or behind the service's back gets a new key, and the old
+    entry simply ages out.
+    """
+
+    def __init__(self, max_entries: int = None):  # pyright: ignore[reportArgumentType]
+        self.max_entries = max_entries or settings.ANALYSIS_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
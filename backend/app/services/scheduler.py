@@ -0,0 +1,187 @@
+# app/services/scheduler.py
+"""
+Background precomputation of regimes for the tracked tickers.
+
+Every PRECOMPUTE_INTERVAL_S the scheduler analyzes, for each ticker in
+TRACKED_TICKERS, the newest cataloged dataset of that ticker (the file
+/analyze users request), through the same path as /analyze. A ticker with
+no dataset of its own is fetched through DataService into one stable
+file, {ticker}_precompute.csv, replaced in place (the previous copy is
+analyzed when the fetch fails). Inside the API that path fills the
+response cache and warms the workers' model caches, so the first viewer
+after a data update gets a lookup instead of a full fit; an unchanged
+file keeps its content hash and is a cache hit. Each run is recorded in
+the catalog.
+
+Standalone (no API, from backend/):
+    python -m app.services.scheduler [--once] [--tickers AAPL,NVDA]
+"""
+import argparse
+import asyncio
+import logging
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PRECOMPUTE_FILENAME = "{ticker}_precompute.csv"
+
+
+class PrecomputeScheduler:
+    """
+    Args:
+        data_service: DataService used for fetching and the catalog.
+        analyze: async callable filename -> analysis result (the API passes
+            its cached, coalesced /analyze path).
+        tickers / interval / workers / history_days: default to Settings.
+    """
+
+    def __init__(self, data_service, analyze, tickers: list = None,  # pyright: ignore[reportArgumentType]
+                 interval: float = None, workers: int = None,  # pyright: ignore[reportArgumentType]
+                 history_days: int = None):  # pyright: ignore[reportArgumentType]
+        self.data_service = data_service
+        self.analyze = analyze
+        self.tickers = settings.TRACKED_TICKERS if tickers is None else tickers
+        self.interval = interval or settings.PRECOMPUTE_INTERVAL_S
+        self.workers = workers or settings.PRECOMPUTE_WORKERS
+        self.history_days = history_days or settings.PRECOMPUTE_HISTORY_DAYS
+        self._task = None
+        self.last_cycle = None
+
+    def _latest_cataloged(self, ticker: str) -> str:
+        """Newest dataset of `ticker` other than the scheduler's own file"""
+        own = PRECOMPUTE_FILENAME.format(ticker=ticker)
+        datasets = [r for r in self.data_service.catalog.find(ticker=ticker) if r['filename'] != own]
+        if not datasets:
+            return None  # pyright: ignore[reportReturnType]
+        return max(datasets, key=lambda r: (r['end_date'] or "", r['n_rows']))['filename']
+
+    async def refresh_ticker(self, ticker: str, cycle_id: str) -> dict:
+        """Analyze one ticker (fetching it if nothing is cataloged); never raises, the outcome is recorded"""
+        started_at = datetime.now(timezone.utc).isoformat()
+        t0 = time.monotonic()
+        filename, status, detail = None, "ok", None
+
+        try:
+            filename = self._latest_cataloged(ticker)
+            if filename is None:
+                own = PRECOMPUTE_FILENAME.format(ticker=ticker)
+                end = date.today()
+                start = end - timedelta(days=self.history_days)
+                try:
+                    filename = await asyncio.to_thread(
+                        self.data_service.fetch_and_save, ticker, start.isoformat(), end.isoformat(), own
+                    )
+                except Exception as e:
+                    if self.data_service.catalog.get(own) is None:
+                        raise
+                    filename = own
+                    detail = f"fetch failed ({e}); analyzed cached {filename}"
+
+            result = await self.analyze(filename)
+            detail = detail or f"current regime: {result['current_regime']}"
+        except Exception as e:
+            status, detail = "failed", str(e)
+            logger.warning(f"⚠️ [Precompute] {ticker}: {e}")
+
+        duration = time.monotonic() - t0
+        self.data_service.catalog.record_run(cycle_id, ticker, filename, status,
+                                             started_at, duration, detail)
+        logger.info(f"🗓️ [Precompute] {ticker}: {status} in {duration:.1f}s ({detail})")
+        return {'ticker': ticker, 'filename': filename, 'status': status,
+                'detail': detail, 'duration_s': duration}
+
+    async def run_cycle(self) -> dict:
+        """Refresh every tracked ticker, at most `workers` at a time"""
+        cycle_id = uuid.uuid4().hex[:8]
+        semaphore = asyncio.Semaphore(self.workers)
+        t0 = time.monotonic()
+
+        async def bounded(ticker):
+            async with semaphore:
+                return await self.refresh_ticker(ticker, cycle_id)
+
+        runs = await asyncio.gather(*[bounded(t) for t in self.tickers])
+        self.last_cycle = {
+            'cycle_id': cycle_id,
+            'finished_at': datetime.now(timezone.utc).isoformat(),
+            'duration_s': time.monotonic() - t0,
+            'ok': sum(r['status'] == "ok" for r in runs),
+            'failed': sum(r['status'] != "ok" for r in runs),
+        }
+        return {**self.last_cycle, 'runs': runs}
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_cycle()
+            except Exception as e:
+                logger.error(f"❌ [Precompute] Cycle crashed: {e}", exc_info=True)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        """Start the periodic loop on the running event loop (no-op without tickers)"""
+        if not self.tickers:
+            logger.info("🗓️ [Precompute] No TRACKED_TICKERS configured; scheduler disabled")
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+            logger.info(f"🗓️ [Precompute] Tracking {self.tickers} every {self.interval:.0f}s "
+                        f"({self.workers} at a time)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            'tickers': self.tickers,
+            'interval_s': self.interval,
+            'workers': self.workers,
+            'running': self._task is not None and not self._task.done(),
+            'last_cycle': self.last_cycle,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="run one cycle and exit")
+    parser.add_argument("--tickers", help="comma-separated, overrides TRACKED_TICKERS")
+    args = parser.parse_args()
+
+    from app.services.data_service import DataService
+    from app.services.executor import PipelineExecutor, run_analysis_task
+
+    executor = PipelineExecutor()
+
+    async def analyze(filename):
+        return await executor.run(run_analysis_task, filename, None, None, None)
+
+    tickers = [t.strip() for t in args.tickers.split(',')] if args.tickers else None
+    scheduler = PrecomputeScheduler(DataService(), analyze, tickers=tickers)  # pyright: ignore[reportArgumentType]
+
+    async def run():
+        if args.once:
+            cycle = await scheduler.run_cycle()
+            for r in cycle['runs']:
+                print(f"{r['ticker']:<10} {r['status']:<7} {r['duration_s']:>7.1f}s  {r['detail']}")
+        else:
+            scheduler.start()
+            await asyncio.Event().wait()
+
+    try:
+        asyncio.run(run())
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
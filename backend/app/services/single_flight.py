@@ -0,0 +1,66 @@
+# app/services/single_flight.py
+import asyncio
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def flight_key(content_hash: str, **params) -> str:
+    """Coalescing key: dataset content hash + canonical JSON of the parameters"""
+    return f"{content_hash}:{json.dumps(params, sort_keys=True, default=str)}"
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical async computations.
+
+    The first caller for a key (the leader) starts the computation; callers
+    arriving while it is in flight await the same task and receive the
+    same result or exception. Nothing is cached once the flight lands:
+    the next call after completion computes afresh.
+
+    The shared task is shielded, so one caller disconnecting or timing out
+    does not cancel the computation the others are waiting on.
+    """
+
+    def __init__(self, name: str = "flights"):
+        self.name = name
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.stats = {'computations': 0, 'coalesced': 0}
+
+    async def run(self, key: str, factory):
+        """`factory()` returns the awaitable to run when no flight is in progress for `key`"""
+        with self._lock:
+            task = self._flights.get(key)
+            if task is None:
+                task = asyncio.ensure_future(factory())
+                self._flights[key] = task
+                task.add_done_callback(lambda _, k=key: self._land(k))
+                self.stats['computations'] += 1
+            else:
+                self.stats['coalesced'] += 1
+                logger.info(f"🔗 [{self.name}] Joined in-flight computation "
+                            f"({self.stats['coalesced']} saved so far)")
+        return await asyncio.shield(task)
+
+    def _land(self, key: str):
+        with self._lock:
+            self._flights.pop(key, None)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'computations': self.stats['computations'],
+                'computations_saved': self.stats['coalesced'],
+            }
+
+
+def analysis_key(content_hash: str, filename: str, time_budget: float = None,  # pyright: ignore[reportArgumentType]
+                 feature_set=None) -> str:
+    """Key shared by /analyze coalescing, its response cache and the precompute scheduler"""
+    return flight_key(content_hash, kind="analyze", filename=filename,
+                      time_budget=time_budget, feature_set=feature_set)
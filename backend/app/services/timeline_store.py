@@ -0,0 +1,211 @@
+# app/services/timeline_store.py
+"""
+Persistent, compact per-ticker regime timelines.
+
+One .npz per ticker under DATA_DIR/timelines holding:
+    days        int32   bar dates as days since 1970-01-01
+    states      uint8   decoded state per bar
+    run_starts  int32   first bar of each run of identical states (RLE)
+    run_states  uint8   state of each run
+    posteriors  float16 (or float32) smoothed state probabilities (T, K)
+    close       float32 closing price per bar (NaN when unknown)
+    labels      str     regime label of each state
+    meta        str     JSON: filename, content hash, n_states, ...
+
+Ten years of daily bars with 3 states is ~40 KB including posteriors,
+against ~140 KB of per-day JSON dicts without them. Range queries are a
+searchsorted over the days; point-in-time lookups are a searchsorted
+over the run starts, so no model is refit and no CSV is read to answer
+"regime of AAPL on 2020-03-16". Files are replaced atomically, so the
+API process can read while pipeline workers write.
+"""
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TIMELINE_DIRNAME = "timelines"
+
+
+def _to_days(dates) -> np.ndarray:
+    return pd.DatetimeIndex(dates).values.astype("datetime64[D]").astype(np.int32)
+
+
+def _day(value) -> int:
+    return int(np.datetime64(pd.Timestamp(value).date(), "D").astype(np.int32))
+
+
+def _iso(days) -> list:
+    return np.asarray(days, dtype=np.int32).astype("datetime64[D]").astype(str).tolist()
+
+
+def build_timeline(dates, states, posteriors, labels: list, close=None,  # pyright: ignore[reportArgumentType]
+                   meta: dict = None, posterior_dtype: str = None) -> dict:  # pyright: ignore[reportArgumentType]
+    """Compact in-memory timeline (the arrays that get persisted)"""
+    states = np.asarray(states)
+    if len(states) == 0:
+        raise ValueError("Cannot store an empty timeline")
+    if states.max() > 255:
+        raise ValueError("uint8 timelines support at most 256 states")
+    states = states.astype(np.uint8)
+    change = np.flatnonzero(np.diff(states)) + 1
+    run_starts = np.concatenate([[0], change]).astype(np.int32)
+    return {
+        'days': _to_days(dates),
+        'states': states,
+        'run_starts': run_starts,
+        'run_states': states[run_starts],
+        'posteriors': np.asarray(posteriors).astype(posterior_dtype or settings.TIMELINE_POSTERIOR_DTYPE),
+        'close': (np.full(len(states), np.nan, dtype=np.float32) if close is None
+                  else np.asarray(close, dtype=np.float32)),
+        'labels': np.asarray(labels, dtype=str),
+        'meta': {**(meta or {}), 'stored_at': datetime.now(timezone.utc).isoformat()},
+    }
+
+
+def timeline_history(timeline: dict, start: int = 0, end: int = None) -> list:  # pyright: ignore[reportArgumentType]
+    """Per-bar [{date, regime, close}] rows (the dashboard's regime_history format)"""
+    sl = slice(start, end)
+    labels = timeline['labels'][timeline['states'][sl]].tolist()
+    close = timeline['close'][sl].astype(np.float64)
+    close = np.where(np.isfinite(close), close, None).tolist()
+    return [{'date': d, 'regime': r, 'close': c}
+            for d, r, c in zip(_iso(timeline['days'][sl]), labels, close)]
+
+
+class RegimeTimelineStore:
+
+    def __init__(self, data_dir: str, cache_size: int = 32):
+        self.root = os.path.join(data_dir, TIMELINE_DIRNAME)
+        os.makedirs(self.root, exist_ok=True)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()   # ticker → (mtime_ns, timeline)
+        self._lock = threading.Lock()
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker.replace(os.sep, '_')}.npz")
+
+    # ── Writing ──────────────────────────────────────────────────────────
+    def put(self, ticker: str, timeline: dict) -> dict:
+        """Persist a timeline from build_timeline (atomic replace); returns a size summary"""
+        path = self._path(ticker)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, **{k: v for k, v in timeline.items() if k != 'meta'},
+                     meta=np.array(json.dumps(timeline['meta'], default=str)))
+        os.replace(tmp, path)
+        with self._lock:
+            self._cache.pop(ticker, None)
+        return {'ticker': ticker, 'n_bars': len(timeline['states']),
+                'n_segments': len(timeline['run_starts']), 'bytes': os.path.getsize(path)}
+
+    # ── Reading ──────────────────────────────────────────────────────────
+    def load(self, ticker: str) -> dict:
+        path = self._path(ticker)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            raise ValueError(f"No stored regime timeline for {ticker}; run /analyze first") from None
+
+        with self._lock:
+            hit = self._cache.get(ticker)
+            if hit is not None and hit[0] == mtime:
+                self._cache.move_to_end(ticker)
+                return hit[1]
+
+        with np.load(path, allow_pickle=False) as npz:
+            timeline = {k: npz[k] for k in npz.files}
+        timeline['meta'] = json.loads(str(timeline['meta']))
+        with self._lock:
+            self._cache[ticker] = (mtime, timeline)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return timeline
+
+    def tickers(self) -> list:
+        return sorted(f[:-4] for f in os.listdir(self.root) if f.endswith('.npz'))
+
+    def _bounds(self, timeline: dict, start_date=None, end_date=None) -> tuple:
+        days = timeline['days']
+        lo = 0 if start_date is None else int(np.searchsorted(days, _day(start_date), side='left'))
+        hi = len(days) if end_date is None else int(np.searchsorted(days, _day(end_date), side='right'))
+        return lo, hi
+
+    def segments(self, ticker: str, start_date: str = None,  # pyright: ignore[reportArgumentType]
+                 end_date: str = None) -> list:  # pyright: ignore[reportArgumentType]
+        """Regime runs overlapping [start_date, end_date], clipped to it"""
+        timeline = self.load(ticker)
+        lo, hi = self._bounds(timeline, start_date, end_date)
+        if lo >= hi:
+            return []
+        starts = timeline['run_starts']
+        ends = np.append(starts[1:], len(timeline['states']))
+        first = int(np.searchsorted(starts, lo, side='right')) - 1
+        last = int(np.searchsorted(starts, hi, side='left'))
+        seg_start = np.maximum(starts[first:last], lo)
+        seg_end = np.minimum(ends[first:last], hi)
+        labels = timeline['labels'][timeline['run_states'][first:last]].tolist()
+        days = timeline['days']
+        return [{'start': s, 'end': e, 'regime': r, 'bars': int(n)}
+                for s, e, r, n in zip(_iso(days[seg_start]), _iso(days[seg_end - 1]),
+                                      labels, seg_end - seg_start)]
+
+    def history(self, ticker: str, start_date: str = None,  # pyright: ignore[reportArgumentType]
+                end_date: str = None) -> list:  # pyright: ignore[reportArgumentType]
+        """Per-bar rows in [start_date, end_date] (dashboard history)"""
+        timeline = self.load(ticker)
+        lo, hi = self._bounds(timeline, start_date, end_date)
+        return timeline_history(timeline, lo, hi)
+
+    def at(self, ticker: str, date: str) -> dict:
+        """
+        Regime as of `date`: the last stored bar on or before it, with its
+        posterior and the run it belongs to.
+        """
+        timeline = self.load(ticker)
+        days = timeline['days']
+        i = int(np.searchsorted(days, _day(date), side='right')) - 1
+        if i < 0:
+            raise ValueError(f"{ticker} timeline starts on {_iso(days[:1])[0]}, after {date}")
+
+        starts = timeline['run_starts']
+        run = int(np.searchsorted(starts, i, side='right')) - 1
+        run_end = int(starts[run + 1]) - 1 if run + 1 < len(starts) else len(days) - 1
+        labels = timeline['labels'].tolist()
+        state = int(timeline['states'][i])
+        close = float(timeline['close'][i])
+        return {
+            'ticker': ticker,
+            'requested_date': str(pd.Timestamp(date).date()),
+            'date': _iso(days[i:i + 1])[0],
+            'state': state,
+            'regime': labels[state],
+            'probabilities': dict(zip(labels, timeline['posteriors'][i].astype(float).tolist())),
+            'close': close if np.isfinite(close) else None,
+            'segment_start': _iso(days[starts[run]:starts[run] + 1])[0],
+            'segment_end': _iso(days[run_end:run_end + 1])[0],
+            'days_in_regime': i - int(starts[run]) + 1,
+            'filename': timeline['meta'].get('filename'),
+        }
+
+    def summary(self, ticker: str) -> dict:
+        timeline = self.load(ticker)
+        days = timeline['days']
+        return {
+            'ticker': ticker,
+            'start_date': _iso(days[:1])[0],
+            'end_date': _iso(days[-1:])[0],
+            'n_bars': len(days),
+            'n_segments': len(timeline['run_starts']),
+            'labels': timeline['labels'].tolist(),
+            'posterior_dtype': str(timeline['posteriors'].dtype),
+            'bytes': os.path.getsize(self._path(ticker)),
+            **timeline['meta'],
+        }
@@ -0,0 +1,73 @@
+# benchmarks/bench_initialization.py
+"""
+EM initialization benchmark: hmmlearn default KMeans vs subsampled
+k-means++ vs Log_Return quantile seeds, over every bundled dataset.
+
+Usage (from backend/):
+    python -m benchmarks.bench_initialization [--states 2 3 4] [--repeats 3]
+"""
+import argparse
+import logging
+import time
+import numpy as np
+from app.core.config import settings
+from app.engine.features import HMMPreprocessor
+from app.engine.hmm_model import RegimeDetector
+from app.engine.initialization import INIT_METHODS
+from app.engine.model_config import model_config
+from app.services.data_service import DataService
+
+
+def run(n_states_list: list[int], repeats: int) -> list[dict]:
+    data_service = DataService()
+    rows = []
+
+    for filename in sorted(data_service.list_datasets()):
+        df_raw = data_service.load_dataset(filename).tail(model_config.MAX_TRAINING_DAYS)
+        X = HMMPreprocessor.csv_to_features(df_raw)['scaled_features']
+
+        for n_states in n_states_list:
+            for method in INIT_METHODS:
+                times, iters, lls = [], [], []
+                for r in range(repeats):
+                    detector = RegimeDetector(n_states=n_states, random_state=model_config.RANDOM_STATE + r,
+                                              init_method=method)
+                    t0 = time.perf_counter()
+                    detector.fit(X, verbose=False)
+                    times.append(time.perf_counter() - t0)
+                    iters.append(detector.training_stats['n_iter'])
+                    lls.append(detector.training_stats['log_likelihood'])
+
+                rows.append({
+                    'dataset': filename, 'n_states': n_states, 'method': method,
+                    'seconds': float(np.median(times)), 'em_iters': float(np.mean(iters)),
+                    'log_likelihood': float(np.mean(lls)),
+                })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--states", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    print(f"Datasets from {settings.DATA_DIR}")
+    rows = run(args.states, args.repeats)
+
+    print(f"{'dataset':<34} {'K':>2} {'method':<20} {'sec':>8} {'EM iters':>9} {'logL':>11}")
+    for row in rows:
+        print(f"{row['dataset']:<34} {row['n_states']:>2} {row['method']:<20} "
+              f"{row['seconds']:>8.3f} {row['em_iters']:>9.1f} {row['log_likelihood']:>11.1f}")
+
+    print("\nTotals per method:")
+    for method in INIT_METHODS:
+        sub = [r for r in rows if r['method'] == method]
+        print(f"  {method:<20} {sum(r['seconds'] for r in sub):8.2f}s  "
+              f"{sum(r['em_iters'] for r in sub):8.0f} EM iters  "
+              f"mean logL {np.mean([r['log_likelihood'] for r in sub]):.1f}")
+
+
+if __name__ == "__main__":
+    main()
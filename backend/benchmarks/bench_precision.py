@@ -0,0 +1,83 @@
+# benchmarks/bench_precision.py
+"""
+float64 vs float32 compute mode: memory footprint, speed and regime-path
+agreement for batched inference on the NumPy backend.
+
+One model is fitted (float64) on a bundled dataset; its scaled features
+are cut into N overlapping windows of T bars and every window is decoded,
+filtered and smoothed in a single batched call per dtype.
+
+Usage (from backend/):
+    python -m benchmarks.bench_precision [--file AAPL_2010-01-01_2026-01-01.csv]
+                                         [--windows 64] [--length 1000]
+"""
+import argparse
+import logging
+import time
+import tracemalloc
+import numpy as np
+from app.engine.backends import NumpyBackend
+from app.engine.features import HMMPreprocessor
+from app.engine.hmm_model import RegimeDetector
+from app.services.data_service import DataService
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--file", default="AAPL_2010-01-01_2026-01-01.csv")
+    parser.add_argument("--windows", type=int, default=64)
+    parser.add_argument("--length", type=int, default=1000)
+    parser.add_argument("--states", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    df_raw = DataService().load_dataset(args.file)
+    X = HMMPreprocessor.csv_to_features(df_raw)['scaled_features'].astype(np.float64)
+    detector = RegimeDetector(n_states=args.states, random_state=42).fit(X, verbose=False)
+    model = detector.model
+    backend = NumpyBackend()
+
+    starts = np.linspace(0, len(X) - args.length, args.windows).astype(int)
+    windows64 = np.stack([X[s:s + args.length] for s in starts])
+    print(f"{args.file}: {args.windows} windows × {args.length} bars × {X.shape[1]} features, K={args.states}\n")
+
+    results = {}
+    print(f"{'dtype':<8} {'features MB':>11} {'emissions MB':>12} {'op':<10} {'seconds':>8} {'peak MB':>8}")
+    for dtype in (np.float64, np.float32):
+        windows = windows64.astype(dtype)
+        log_b = backend.log_emissions(model, windows)
+        ops = {
+            'decode': lambda: backend.decode(model, windows),
+            'filter': lambda: backend.forward_filter(model, windows),
+            'smooth': lambda: backend.posteriors(model, windows),
+        }
+        results[dtype] = {}
+        for op, fn in ops.items():
+            fn()    # warm-up
+            out, seconds, peak = _measure(fn)
+            results[dtype][op] = out
+            print(f"{np.dtype(dtype).name:<8} {windows.nbytes / 2**20:>11.2f} {log_b.nbytes / 2**20:>12.2f} "
+                  f"{op:<10} {seconds:>8.3f} {peak:>8.1f}")
+
+    ref, low = results[np.float64], results[np.float32]
+    agreement = (ref['decode'] == low['decode']).mean()
+    filt_err = np.abs(np.exp(ref['filter'][0]) - np.exp(low['filter'][0])).max()
+    ll_err = np.abs(ref['filter'][1].sum(axis=1) - low['filter'][1].sum(axis=1)).max()
+    smooth_err = np.abs(ref['smooth'] - low['smooth']).max()
+    print(f"\nViterbi path agreement: {agreement:.5%}")
+    print(f"max |Δ filtered prob|: {filt_err:.2e}   max |Δ smoothed prob|: {smooth_err:.2e}")
+    print(f"max |Δ window log-likelihood|: {ll_err:.2e} nats")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/bench_similarity.py
+"""
+Signature index: bulk build, in-place refresh and k-NN query latency for
+a universe of synthetic tickers (K states, F features).
+
+Usage (from backend/):
+    python -m benchmarks.bench_similarity [--tickers 5000] [--states 3] [--features 2]
+"""
+import argparse
+import time
+import numpy as np
+from app.engine.signature_index import SignatureIndex, regime_signature
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=5000)
+    parser.add_argument("--states", type=int, default=3)
+    parser.add_argument("--features", type=int, default=2)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    K, F = args.states, args.features
+    layout = (K, tuple(f"f{i}" for i in range(F)))
+
+    def signature():
+        A = rng.normal(size=(K, F, F))
+        means = rng.normal(size=(K, F))
+        return regime_signature(rng.dirichlet(np.ones(K)), means, A @ A.transpose(0, 2, 1),
+                                rng.dirichlet(np.ones(K), size=K), means[:, 0])
+
+    vectors = [signature() for _ in range(args.tickers)]
+    index = SignatureIndex()
+    t0 = time.perf_counter()
+    for i, v in enumerate(vectors):
+        index.upsert(f"T{i}", layout, v)
+    build = time.perf_counter() - t0
+
+    keys = rng.integers(0, args.tickers, args.queries)
+    t0 = time.perf_counter()
+    for i in keys:
+        index.upsert(f"T{i}", layout, vectors[i] + rng.normal(0, 1e-3, vectors[i].size))
+    refresh = (time.perf_counter() - t0) / args.queries
+
+    latencies = []
+    for i in keys:
+        t0 = time.perf_counter()
+        index.query_key(f"T{i}", k=10)
+        latencies.append(time.perf_counter() - t0)
+    latencies = np.array(latencies) * 1000
+
+    print(f"{args.tickers:,} tickers, K={K}, F={F}, signature dim {vectors[0].size}")
+    print(f"  build            {build * 1000:8.1f} ms total")
+    print(f"  refresh (upsert) {refresh * 1e6:8.1f} µs each")
+    print(f"  query k=10       {np.median(latencies):8.3f} ms median, {np.percentile(latencies, 99):.3f} ms p99")
+
+
+if __name__ == "__main__":
+    main()
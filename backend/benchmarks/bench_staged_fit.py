@@ -0,0 +1,53 @@
+# benchmarks/bench_staged_fit.py
+"""
+Direct full-covariance EM vs staged fit (diagonal prefit on a decimated
+series → full-covariance refinement), over every bundled dataset.
+
+Usage (from backend/):
+    python -m benchmarks.bench_staged_fit [--states 2 3 4]
+"""
+import argparse
+import logging
+import time
+from app.engine.features import HMMPreprocessor
+from app.engine.hmm_model import RegimeDetector
+from app.engine.model_config import model_config
+from app.services.data_service import DataService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--states", type=int, nargs="+", default=[2, 3, 4])
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    data_service = DataService()
+    totals = {"direct": [0.0, 0], "staged": [0.0, 0]}
+
+    print(f"{'dataset':<34} {'K':>2} {'direct s':>9} {'iters':>6} {'staged s':>9} "
+          f"{'iters (diag+full[+fb])':>24} {'ΔlogL':>8}")
+    for filename in sorted(data_service.list_datasets()):
+        df_raw = data_service.load_dataset(filename).tail(model_config.MAX_TRAINING_DAYS)
+        X = HMMPreprocessor.csv_to_features(df_raw)['scaled_features']
+
+        for n_states in args.states:
+            results = {}
+            for mode in ("direct", "staged"):
+                detector = RegimeDetector(n_states=n_states, fit_mode=mode)
+                t0 = time.perf_counter()
+                detector.fit(X, verbose=False)
+                results[mode] = (time.perf_counter() - t0, detector.training_stats)
+                totals[mode][0] += results[mode][0]
+                totals[mode][1] += detector.training_stats['n_iter']
+
+            (t_d, st_d), (t_s, st_s) = results["direct"], results["staged"]
+            stage_iters = "+".join(str(st['n_iter']) for st in st_s['stages'])
+            print(f"{filename:<34} {n_states:>2} {t_d:>9.3f} {st_d['n_iter']:>6} {t_s:>9.3f} "
+                  f"{stage_iters:>24} {st_s['log_likelihood'] - st_d['log_likelihood']:>8.2f}")
+
+    print(f"\nTotal direct: {totals['direct'][0]:.2f}s, {totals['direct'][1]} EM iters")
+    print(f"Total staged: {totals['staged'][0]:.2f}s, {totals['staged'][1]} EM iters")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start cost of the API: `import app.main` time and which heavy
+libraries it pulls in, then latency of the first requests with and
+without the startup warm-up (WARMUP_ON_STARTUP). Every measurement runs
+in a fresh interpreter; the median over --repeats runs is reported.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup [--repeats 3] [--rows 1500]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HEAVY = ("numpy", "pandas", "scipy", "sklearn", "hmmlearn", "yfinance")
+
+
+def _child(warm: bool):
+    """Runs inside a fresh interpreter; prints one JSON line of timings"""
+    t0 = time.perf_counter()
+    import app.main
+    timings = {'import_s': time.perf_counter() - t0,
+               'heavy_loaded': [m for m in HEAVY if m in sys.modules]}
+
+    from fastapi.testclient import TestClient
+    with TestClient(app.main.app) as client:
+        if warm:
+            # The lifespan warm-up runs in the background; time it to completion here
+            from app.api.deps import warm_up
+            t0 = time.perf_counter()
+            warm_up()
+            timings['warm_up_s'] = time.perf_counter() - t0
+
+        for name, method, path, body in [
+            ('first GET /', "get", "/", None),
+            ('first GET /files', "get", "/api/v1/market/files", None),
+            ('second GET /files', "get", "/api/v1/market/files", None),
+            ('first POST /analyze', "post", "/api/v1/market/analyze", {'filename': "SYN_daily.csv"}),
+        ]:
+            t0 = time.perf_counter()
+            response = getattr(client, method)(path, json=body) if body else getattr(client, method)(path)
+            assert response.status_code == 200, response.text
+            timings[name] = time.perf_counter() - t0
+
+    print(json.dumps(timings))
+
+
+def _run_child(warm: bool, data_dir: str) -> dict:
+    env = {**os.environ, 'DATA_DIR': data_dir, 'WARMUP_ON_STARTUP': "0"}
+    args = [sys.executable, "-m", "benchmarks.bench_startup", "--child"] + (["--warm"] if warm else [])
+    out = subprocess.run(args, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--rows", type=int, default=1500)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--warm", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        import logging
+        logging.disable(logging.WARNING)
+        _child(args.warm)
+        return
+
+    import numpy as np
+    import pandas as pd
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rng = np.random.default_rng(0)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, args.rows)))
+        pd.DataFrame({
+            'Date': pd.bdate_range("2015-01-01", periods=args.rows),
+            'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+            'Volume': rng.integers(1_000, 10_000, args.rows),
+        }).to_csv(os.path.join(tmp, "SYN_daily.csv"), index=False)
+
+        for warm in (False, True):
+            runs = []
+            for _ in range(args.repeats):
+                # A fresh data dir per run: no catalog database left by the previous one
+                catalog = os.path.join(tmp, "catalog.sqlite3")
+                if os.path.exists(catalog):
+                    os.remove(catalog)
+                runs.append(_run_child(warm, tmp))
+
+            print(f"\n{'warm-up before first request' if warm else 'cold (lazy services)'}"
+                  f" — median of {args.repeats}")
+            print(f"  heavy modules after import: {runs[0]['heavy_loaded'] or 'none'}")
+            for key in runs[0]:
+                if key != 'heavy_loaded':
+                    print(f"  {key:<22} {statistics.median(r[key] for r in runs) * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# benchmarks/bench_streaming.py
+"""
+Full CSV read + tail() vs streaming tail / date-range ingestion on a
+synthetic minute-bar file (peak traced memory and wall time).
+
+Usage (from backend/):
+    python -m benchmarks.bench_streaming [--rows 2000000] [--tail 2520]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from app.services.data_service import DataService
+from app.services.feature_service import FeatureService
+
+
+def _measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return out, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--tail", type=int, default=2520)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as tmp:
+        rng = np.random.default_rng(0)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 5e-4, args.rows)))
+        pd.DataFrame({
+            'Date': pd.date_range("2015-01-01", periods=args.rows, freq="min"),
+            'Open': close, 'High': close * 1.0005, 'Low': close * 0.9995, 'Close': close,
+            'Volume': rng.integers(100, 10_000, args.rows),
+        }).to_csv(os.path.join(tmp, "SYN_minute.csv"), index=False)
+        size_mb = os.path.getsize(os.path.join(tmp, "SYN_minute.csv")) / 2**20
+
+        data_service = DataService(tmp)
+        feature_service = FeatureService(data_service)
+        mid = pd.Timestamp("2015-01-01") + pd.Timedelta(minutes=args.rows // 2)
+
+        cases = {
+            'full read + tail': lambda: data_service.load_dataset("SYN_minute.csv").tail(args.tail),
+            'load_dataset_tail': lambda: data_service.load_dataset_tail("SYN_minute.csv", args.tail),
+            'stream_features tail': lambda: feature_service.stream_features("SYN_minute.csv", tail_rows=args.tail),
+            'stream_features 1-day range': lambda: feature_service.stream_features(
+                "SYN_minute.csv", start_date=str(mid), end_date=str(mid + pd.Timedelta(days=1))),
+        }
+
+        print(f"{args.rows:,} rows, {size_mb:.0f} MB on disk, tail={args.tail}\n")
+        print(f"{'method':<30} {'rows':>8} {'seconds':>8} {'peak MB':>8}")
+        for name, fn in cases.items():
+            out, seconds, peak = _measure(fn)
+            print(f"{name:<30} {len(out):>8} {seconds:>8.3f} {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
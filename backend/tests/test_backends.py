@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+import pytest
+from hmmlearn import hmm
+from app.engine.backends import HMMBackend, HmmlearnBackend, NumpyBackend
+from app.engine.features import HMMPreprocessor
+from app.engine.hmm_model import RegimeDetector
+from app.engine.model_config import model_config
+
+
+def _sample_batch(n_seq=4, n_steps=150, seed=0):
+    """Equal-length sequences from a known 3-state, 2-feature HMM"""
+    truth = hmm.GaussianHMM(n_components=3, covariance_type="full", random_state=seed)
+    truth.startprob_ = np.array([0.6, 0.3, 0.1])
+    truth.transmat_ = np.array([[0.95, 0.04, 0.01], [0.03, 0.94, 0.03], [0.02, 0.03, 0.95]])
+    truth.means_ = np.array([[-1.0, 1.0], [0.0, -0.5], [1.0, 0.5]])
+    truth.covars_ = np.array([np.eye(2) * 0.2, [[0.3, 0.1], [0.1, 0.2]], np.eye(2) * 0.4])
+    return np.stack([truth.sample(n_steps, random_state=seed + i)[0] for i in range(n_seq)])
+
+
+def _start_model(covariance_type, X_flat):
+    model = hmm.GaussianHMM(n_components=3, covariance_type=covariance_type,
+                            n_iter=8, tol=-np.inf, random_state=1, init_params="")
+    model.startprob_ = np.full(3, 1 / 3)
+    model.transmat_ = np.full((3, 3), 0.05) + np.eye(3) * 0.85
+    model.means_ = X_flat[[0, len(X_flat) // 2, -1]]
+    cov = np.cov(X_flat.T) + 1e-3 * np.eye(2)
+    model.covars_ = cov[None].repeat(3, 0) if covariance_type == "full" else np.diag(cov)[None].repeat(3, 0)
+    return model
+
+
+@pytest.mark.parametrize("covariance_type", ["full", "diag"])
+def test_numpy_fit_matches_hmmlearn(covariance_type):
+    X = _sample_batch()
+    X_flat = X.reshape(-1, 2)
+
+    reference = _start_model(covariance_type, X_flat)
+    reference.fit(X_flat, [X.shape[1]] * X.shape[0])
+
+    candidate = _start_model(covariance_type, X_flat)
+    NumpyBackend().fit(candidate, X)
+
+    np.testing.assert_allclose(candidate.startprob_, reference.startprob_, atol=1e-8)
+    np.testing.assert_allclose(candidate.transmat_, reference.transmat_, atol=1e-8)
+    np.testing.assert_allclose(candidate.means_, reference.means_, atol=1e-8)
+    np.testing.assert_allclose(candidate.covars_, reference.covars_, atol=1e-8)
+    np.testing.assert_allclose(list(candidate.monitor_.history), list(reference.monitor_.history), rtol=1e-10)
+
+
+def test_numpy_inference_matches_hmmlearn_batched():
+    X = _sample_batch(n_seq=5)
+    detector = RegimeDetector(n_states=3, random_state=42)
+    detector.fit(X[0], verbose=False)
+    model = detector.model
+    ref, fast = HmmlearnBackend(), NumpyBackend()
+
+    np.testing.assert_allclose(fast.score(model, X), ref.score(model, X), rtol=1e-10)
+    np.testing.assert_allclose(fast.posteriors(model, X), ref.posteriors(model, X), atol=1e-10)
+    np.testing.assert_array_equal(fast.decode(model, X), ref.decode(model, X))
+
+    fast_filtered, fast_norms = fast.forward_filter(model, X)
+    ref_filtered, ref_norms = ref.forward_filter(model, X)
+    np.testing.assert_allclose(np.exp(fast_filtered), np.exp(ref_filtered), atol=1e-10)
+    np.testing.assert_allclose(fast_norms, ref_norms, rtol=1e-10)
+
+    # Single (T, d) input keeps its shape
+    assert fast.decode(model, X[0]).shape == (X.shape[1],)
+    np.testing.assert_allclose(fast_norms[0].sum(), model.score(X[0]), rtol=1e-10)
+
+
+def test_regime_detector_numpy_backend_end_to_end():
+    X = _sample_batch(n_seq=1, n_steps=400)[0]
+    fast = RegimeDetector(n_states=3, random_state=42, backend="numpy").fit(X, verbose=False)
+    ref = RegimeDetector(n_states=3, random_state=42, backend="hmmlearn").fit(X, verbose=False)
+
+    assert fast.training_stats['n_iter'] == ref.training_stats['n_iter']
+    np.testing.assert_allclose(fast.training_stats['log_likelihood'], ref.training_stats['log_likelihood'], rtol=1e-8)
+    np.testing.assert_array_equal(fast.predict_states(X), ref.predict_states(X))
+
+
+def test_float32_mode_matches_float64_within_tolerance(monkeypatch):
+    X = _sample_batch(n_seq=6, n_steps=300)
+    detector = RegimeDetector(n_states=3, random_state=42).fit(X[0], verbose=False)
+    model, backend = detector.model, NumpyBackend()
+    X32 = X.astype(np.float32)
+
+    log_b = backend.log_emissions(model, X32)
+    assert log_b.dtype == np.float32
+    np.testing.assert_allclose(log_b, backend.log_emissions(model, X), atol=1e-4)
+
+    # Recursions accumulate in float64 even for float32 emissions
+    filtered32, norms32 = backend.forward_filter(model, X32)
+    filtered64, norms64 = backend.forward_filter(model, X)
+    assert filtered32.dtype == np.float64
+    np.testing.assert_allclose(np.exp(filtered32), np.exp(filtered64), atol=1e-4)
+    np.testing.assert_allclose(norms32.sum(axis=1), norms64.sum(axis=1), rtol=1e-5)
+    assert (backend.decode(model, X32) == backend.decode(model, X)).mean() > 0.99
+
+    # The config switch flows through feature engineering
+    monkeypatch.setattr(model_config, "COMPUTE_DTYPE", "float32")
+    rng = np.random.default_rng(0)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 300)))
+    df = pd.DataFrame({'Date': pd.bdate_range("2020-01-01", periods=300), 'Open': close,
+                       'High': close, 'Low': close, 'Close': close, 'Volume': 1e6})
+    prep = HMMPreprocessor.csv_to_features(df)
+    assert prep['scaled_features'].dtype == np.float32
+    assert prep['df']['Log_Return'].dtype == np.float32
+
+
+def test_banded_transitions_use_sparse_recursions_and_survive_em():
+    from app.engine.initialization import banded_transmat
+
+    K, n_seq = 12, 32   # n_seq·K² above SPARSE_MIN_WORK: the gather path runs
+    rng = np.random.default_rng(7)
+    truth = hmm.GaussianHMM(n_components=K, covariance_type="full", random_state=0)
+    truth.startprob_ = np.full(K, 1 / K)
+    truth.transmat_ = banded_transmat(K, 0.9, 2)
+    truth.means_ = np.column_stack([np.linspace(-3, 3, K), rng.normal(0, 0.3, K)])
+    truth.covars_ = np.stack([np.eye(2) * 0.1] * K)
+    X = np.stack([truth.sample(80, random_state=i)[0] for i in range(n_seq)])
+
+    with np.errstate(divide="ignore"):
+        log_A = np.log(truth.transmat_)
+    assert NumpyBackend._transition_plan(log_A, n_seq)[0].shape == (K, 5)
+    ref, fast = HmmlearnBackend(), NumpyBackend()
+    np.testing.assert_allclose(fast.score(truth, X), ref.score(truth, X), rtol=1e-10)
+    np.testing.assert_allclose(fast.posteriors(truth, X), ref.posteriors(truth, X), atol=1e-10)
+    np.testing.assert_array_equal(fast.decode(truth, X), ref.decode(truth, X))
+
+    detector = RegimeDetector(n_states=K, random_state=0, backend="numpy", init_method="quantile",
+                              transition_structure="banded", bandwidth=2)
+    detector.fit(X.reshape(-1, 2), verbose=False, lengths=[80] * n_seq)
+    band = banded_transmat(K, 0.9, 2) > 0
+    assert np.all(detector.model.transmat_[~band] == 0)
+    dense = RegimeDetector(n_states=K, random_state=0, init_method="quantile")
+    dense.model.n_features = 2
+    assert detector._count_parameters() == dense._count_parameters() - (K * K - band.sum())
+
+
+def test_incomplete_backend_fails_at_construction():
+    class DecodeOnly(HMMBackend):
+        def decode(self, model, X):
+            return NumpyBackend().decode(model, X)
+
+    with pytest.raises(TypeError, match="abstract"):
+        DecodeOnly()
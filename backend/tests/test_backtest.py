@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+from app.engine.backtest import build_allocation_grid, run_vectorized_backtest
+
+
+def test_allocation_grid_shape():
+    allocations, names = build_allocation_grid(["Bear", "Sideways", "Bull"])
+    assert allocations.shape == (27, 3)
+    assert len(names) == 27
+
+
+def test_backtest_uses_previous_bar_regime():
+    """Position over bar t must come from the regime known at t-1 (no look-ahead)"""
+    returns = np.array([0.0, 0.10, -0.10, 0.10])
+    codes = np.array([1, 0, 1, 0])          # regime flips every bar
+    allocations = np.array([[0.0, 1.0]])    # long only in regime 1
+
+    net = run_vectorized_backtest(codes, returns, allocations)["net_returns"][0]
+
+    # held: [0, 1, 0, 1] → earns bar 1 and bar 3
+    np.testing.assert_allclose(net, [0.0, np.expm1(0.10), 0.0, np.expm1(0.10)])
+
+
+def test_backtest_costs_and_drawdown():
+    rng = np.random.default_rng(0)
+    returns = rng.normal(0, 0.01, 500)
+    codes = rng.integers(0, 3, 500)
+    allocations, _ = build_allocation_grid(["Bear", "Sideways", "Bull"])
+
+    free = run_vectorized_backtest(codes, returns, allocations)
+    costly = run_vectorized_backtest(codes, returns, allocations, cost_bps=10)
+
+    assert np.all(costly["total_return"] <= free["total_return"] + 1e-12)
+    assert np.all(free["max_drawdown"] <= 0)
+    # The all-flat rule never trades
+    assert free["turnover"][0] == 0
+
+    # Positions of -100% or beyond would take log1p of -1 or less
+    with pytest.raises(ValueError):
+        run_vectorized_backtest(codes, returns, [[-1.0, 0.0, 1.0]])
+
+
+def test_backtest_rules_must_name_every_regime(tmp_path, monkeypatch):
+    import pandas as pd
+    from app.core.config import settings
+    from app.services.pipeline_service import PipelineService
+
+    rng = np.random.default_rng(5)
+    vol = np.where(np.arange(800) % 150 < 75, 0.005, 0.02)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, vol)))
+    pd.DataFrame({'Date': pd.bdate_range("2018-01-01", periods=800), 'Open': close, 'High': close,
+                  'Low': close, 'Close': close, 'Volume': 1000}).to_csv(tmp_path / "SYN_a.csv", index=False)
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    service = PipelineService()
+
+    labels = ["Bear", "Sideways", "Bull"]
+    result = service.run_backtest("SYN_a.csv", rules={"long": dict(zip(labels, [0.0, 0.5, 1.0]))})
+    assert result['results'][0]['allocation'] == {"Bear": 0.0, "Sideways": 0.5, "Bull": 1.0}
+    for bad in ({"Bear": 0.0, "Bull": 1.0}, {"Bear": 0.0, "Sideways": 0.5, "Bul": 1.0, "Bull": 1.0}):
+        with pytest.raises(ValueError, match="exactly"):
+            service.run_backtest("SYN_a.csv", rules={"bad": bad})
+
+
+def test_walk_forward_reuses_cached_folds_when_data_grows(tmp_path, monkeypatch):
+    import pandas as pd
+    from app.engine.walk_forward import walk_forward_validation
+    from app.services.fold_cache import FoldCache
+
+    rng = np.random.default_rng(3)
+    vol = np.where(np.arange(560) % 120 < 60, 0.005, 0.02)
+    returns = rng.normal(0, vol)
+    df = pd.DataFrame({'Log_Return': returns,
+                       'Volatility': pd.Series(returns).rolling(10, min_periods=1).std().fillna(0).values},
+                      index=pd.bdate_range("2020-01-01", periods=560))
+    params = dict(feature_cols=["Log_Return", "Volatility"], n_states=2,
+                  train_size=200, test_size=60, step_size=60, return_regime_path=True)
+    cache = FoldCache(str(tmp_path))
+
+    first = walk_forward_validation(df.iloc[:440], fold_cache=cache, **params)
+    grown = walk_forward_validation(df, fold_cache=cache, **params)
+    fresh = walk_forward_validation(df, **params)
+
+    # Only the trailing folds over the new bars are fitted; the result is unchanged
+    assert (first['n_folds'], first['reused_folds']) == (4, 0)
+    assert (grown['n_folds'], grown['reused_folds']) == (6, 4)
+    assert grown['fold_results'] == fresh['fold_results']
+    assert grown['regime_path'] == fresh['regime_path']
+    assert grown['regime_path']['labels'] == ["Bear", "Bull"]
+    assert grown['mean_bic'] == fresh['mean_bic']
+
+    # Changing a bar inside the history invalidates every fold that read it
+    edited = df.copy()
+    edited.iloc[330, 0] += 0.01     # read by folds whose test ends after bar 330
+    assert walk_forward_validation(edited, fold_cache=cache, **params)['reused_folds'] == 2
+
+    # So does any engine setting that changes a fit
+    from app.engine.model_config import model_config
+    monkeypatch.setattr(model_config, "INIT_STICKY_PROB", 0.9)
+    assert walk_forward_validation(df, fold_cache=cache, **params)['reused_folds'] == 0
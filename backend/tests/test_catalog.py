@@ -0,0 +1,137 @@
+import os
+import numpy as np
+import pandas as pd
+from app.services.catalog import DatasetCatalog, CATALOG_FILENAME
+
+
+def _write(path, start, periods):
+    dates = pd.bdate_range(start, periods=periods)
+    close = np.linspace(100, 110, periods)
+    pd.DataFrame({'Date': dates, 'Open': close, 'High': close, 'Low': close,
+                  'Close': close, 'Volume': 1000}).to_csv(path, index=False)
+
+
+def test_catalog_rebuilds_and_answers_indexed_queries(tmp_path):
+    _write(tmp_path / "AAPL_a.csv", "2020-01-01", 500)
+    _write(tmp_path / "AAPL_b.csv", "2021-06-01", 100)
+    _write(tmp_path / "NVDA_a.csv", "2020-01-01", 50)
+
+    catalog = DatasetCatalog(str(tmp_path))
+    assert os.path.exists(tmp_path / CATALOG_FILENAME)
+    assert catalog.list_filenames() == ["AAPL_a.csv", "AAPL_b.csv", "NVDA_a.csv"]
+
+    row = catalog.get("AAPL_a.csv")
+    assert (row['ticker'], row['n_rows'], row['start_date']) == ("AAPL", 500, "2020-01-01")
+    assert row['end_date'] == pd.bdate_range("2020-01-01", periods=500)[-1].strftime('%Y-%m-%d')
+
+    covering = catalog.find(ticker="AAPL", start_date="2021-07-01", end_date="2021-08-01")
+    assert [r['filename'] for r in covering] == ["AAPL_a.csv", "AAPL_b.csv"]
+    assert catalog.find(ticker="AAPL", start_date="2019-01-01") == []
+
+    # Fingerprints go stale when the content changes; sync picks up edits and deletions
+    catalog.record_analysis("AAPL_b.csv", "analyze", {'n_states': 3})
+    assert catalog.last_analysis("AAPL_b.csv")['stale'] is False
+    _write(tmp_path / "AAPL_b.csv", "2021-06-01", 120)
+    os.remove(tmp_path / "NVDA_a.csv")
+    changes = catalog.sync()
+    assert changes['updated'] == ["AAPL_b.csv"] and changes['removed'] == ["NVDA_a.csv"]
+    assert catalog.last_analysis("AAPL_b.csv")['stale'] is True
+
+    # Files copied into DATA_DIR after startup show up in listings and lookups
+    _write(tmp_path / "MSFT_a.csv", "2020-01-01", 30)
+    assert "MSFT_a.csv" in catalog.list_filenames()
+    assert [r['filename'] for r in catalog.find(ticker="MSFT")] == ["MSFT_a.csv"]
+    os.remove(tmp_path / "MSFT_a.csv")
+    assert "MSFT_a.csv" not in catalog.list_filenames()
+
+    # Files rewritten after indexing get a fresh key without waiting for sync()
+    stale_hash = catalog.content_hash("AAPL_a.csv")
+    _write(tmp_path / "AAPL_a.csv", "2020-01-01", 510)
+    assert catalog.content_hash("AAPL_a.csv") != stale_hash
+    assert catalog.get("AAPL_a.csv")['n_rows'] == 510
+
+    # Deleting the database rebuilds it from the directory
+    os.remove(tmp_path / CATALOG_FILENAME)
+    assert DatasetCatalog(str(tmp_path)).list_filenames() == ["AAPL_a.csv", "AAPL_b.csv"]
+
+
+def test_scheduler_falls_back_to_catalog_and_records_runs(tmp_path):
+    import asyncio
+    from app.services.data_service import DataService
+    from app.services.scheduler import PrecomputeScheduler
+
+    _write(tmp_path / "AAPL_old.csv", "2020-01-01", 100)
+    _write(tmp_path / "AAPL_new.csv", "2020-01-01", 300)
+    service = DataService(str(tmp_path))
+
+    class OfflineClient:
+        def get_historical_data(self, ticker, start_date, end_date):
+            raise ConnectionError("offline")
+
+    service.client = OfflineClient()
+    analyzed = []
+
+    async def analyze(filename):
+        analyzed.append(filename)
+        return {'current_regime': "Bull"}
+
+    scheduler = PrecomputeScheduler(service, analyze, tickers=["AAPL", "MSFT"], workers=2)
+    cycle = asyncio.run(scheduler.run_cycle())
+
+    # AAPL's newest cataloged file (the one /analyze is asked for) is analyzed;
+    # MSFT has no dataset and its fetch fails
+    assert analyzed == ["AAPL_new.csv"]
+    assert (cycle['ok'], cycle['failed']) == (1, 1)
+    runs = {r['ticker']: r for r in service.catalog.runs()}
+    assert runs['AAPL']['status'] == "ok" and runs['AAPL']['filename'] == "AAPL_new.csv"
+    assert runs['MSFT']['status'] == "failed" and runs['MSFT']['duration_s'] >= 0
+    assert [r['ticker'] for r in service.catalog.runs(ticker="AAPL")] == ["AAPL"]
+
+    # Online, a ticker without datasets gets one stable file, refreshed in place
+    class OnlineClient:
+        def get_historical_data(self, ticker, start_date, end_date):
+            dates = pd.bdate_range(end=end_date, periods=50)
+            return pd.DataFrame({'Date': dates, 'Close': np.linspace(1, 2, 50)})
+
+    service.client = OnlineClient()
+    analyzed.clear()
+    for _ in range(2):
+        asyncio.run(scheduler.run_cycle())
+    assert sorted(analyzed) == ["AAPL_new.csv"] * 2 + ["MSFT_precompute.csv"] * 2
+    assert sorted(f for f in os.listdir(tmp_path) if f.endswith(".csv")) == [
+        "AAPL_new.csv", "AAPL_old.csv", "MSFT_precompute.csv"]
+
+    # A failed refresh falls back to the previous copy
+    service.client = OfflineClient()
+    analyzed.clear()
+    cycle = asyncio.run(scheduler.run_cycle())
+    assert sorted(analyzed) == ["AAPL_new.csv", "MSFT_precompute.csv"] and cycle['failed'] == 0
+
+
+def test_timeline_store_range_and_point_in_time_queries(tmp_path):
+    from app.services.timeline_store import RegimeTimelineStore, build_timeline, timeline_history
+
+    dates = pd.bdate_range("2020-03-02", periods=10)
+    states = np.array([0, 0, 0, 2, 2, 1, 1, 1, 1, 0])
+    posteriors = np.eye(3)[states] * 0.9 + 0.1 / 3
+    timeline = build_timeline(dates, states, posteriors, ["Bear", "Sideways", "Bull"],
+                              close=np.arange(10) + 100.0, meta={'filename': "AAPL_x.csv"})
+    store = RegimeTimelineStore(str(tmp_path))
+    assert store.put("AAPL", timeline)['n_segments'] == 4
+
+    loaded = store.load("AAPL")
+    assert loaded['states'].dtype == np.uint8 and loaded['posteriors'].dtype == np.float16
+    assert timeline_history(loaded)[3] == {'date': "2020-03-05", 'regime': "Bull", 'close': 103.0}
+
+    # Segments are clipped to the range; lookups on a weekend use the last bar before it
+    assert store.segments("AAPL", "2020-03-04", "2020-03-10") == [
+        {'start': "2020-03-04", 'end': "2020-03-04", 'regime': "Bear", 'bars': 1},
+        {'start': "2020-03-05", 'end': "2020-03-06", 'regime': "Bull", 'bars': 2},
+        {'start': "2020-03-09", 'end': "2020-03-10", 'regime': "Sideways", 'bars': 2},
+    ]
+    point = store.at("AAPL", "2020-03-15")
+    assert (point['date'], point['regime'], point['days_in_regime']) == ("2020-03-13", "Bear", 1)
+    point = store.at("AAPL", "2020-03-11")
+    assert (point['regime'], point['segment_start'], point['segment_end']) == ("Sideways", "2020-03-09", "2020-03-12")
+    assert abs(point['probabilities']['Sideways'] - (0.9 + 0.1 / 3)) < 1e-3
+    assert [row['date'] for row in store.history("AAPL", "2020-03-12")] == ["2020-03-12", "2020-03-13"]
@@ -0,0 +1,137 @@
+import asyncio
+import time
+import pytest
+from app.services.executor import PipelineExecutor, OverloadedError, ExecutionTimeout
+from app.services.single_flight import SingleFlight, flight_key
+
+
+def test_admission_control_rejects_overload_and_times_out():
+    executor = PipelineExecutor(max_workers=1, queue_size=1, timeout=30, mode="process")
+
+    async def scenario():
+        running = asyncio.create_task(executor.run(time.sleep, 1.0))
+        queued = asyncio.create_task(executor.run(time.sleep, 0.1))
+        await asyncio.sleep(0.05)
+
+        # One running + one queued = capacity: the next request is refused at once
+        started = time.monotonic()
+        with pytest.raises(OverloadedError):
+            await executor.run(time.sleep, 0.1)
+        assert time.monotonic() - started < 0.1
+
+        await asyncio.gather(running, queued)
+
+        # A deadline shorter than the work gives ExecutionTimeout; the slot is
+        # held until the worker actually finishes
+        with pytest.raises(ExecutionTimeout):
+            await executor.run(time.sleep, 0.5, timeout=0.1)
+        assert executor.status()['in_flight'] == 1
+        await asyncio.sleep(0.6)
+        assert executor.status()['in_flight'] == 0
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    stats = executor.status()
+    assert (stats['accepted'], stats['rejected'], stats['timed_out']) == (3, 1, 1)
+    assert stats['completed'] == 3
+
+
+
+def test_multi_slot_request_counts_against_capacity():
+    executor = PipelineExecutor(max_workers=2, queue_size=1, timeout=30, mode="thread")
+
+    async def scenario():
+        # A bootstrap-style request holding 2 of the 3 slots leaves room for one more
+        wide = asyncio.create_task(executor.run(time.sleep, 0.3, slots=2))
+        await asyncio.sleep(0.05)
+        assert executor.status()['in_flight'] == 2
+        with pytest.raises(OverloadedError):
+            await executor.run(time.sleep, 0.1, slots=2)
+        await executor.run(time.sleep, 0.1)
+        await wide
+        assert executor.status()['in_flight'] == 0
+        # Never more than the whole capacity, so it is admitted on an idle pool
+        await executor.run(time.sleep, 0.01, slots=10)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+def test_single_flight_shares_one_computation():
+    flights = SingleFlight("test")
+    calls = []
+
+    async def compute(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return {'value': value}
+
+    async def scenario():
+        key_a, key_b = flight_key("hash-a", n_states=3), flight_key("hash-b", n_states=3)
+        results = await asyncio.gather(
+            *[flights.run(key_a, lambda: compute("a")) for _ in range(4)],
+            flights.run(key_b, lambda: compute("b")),
+        )
+        # Landed flights are not cached: the next call recomputes
+        again = await flights.run(key_a, lambda: compute("a"))
+        return results, again
+
+    results, again = asyncio.run(scenario())
+    assert [r['value'] for r in results] == ["a"] * 4 + ["b"]
+    assert results[0] is results[3]
+    assert again == {'value': "a"} and calls == ["a", "b", "a"]
+    assert flights.status() == {'in_flight': 0, 'computations': 3, 'computations_saved': 3}
+
+
+def _busy(n: int) -> list:
+    blocks = [list(range(1000)) for _ in range(n)]
+    time.sleep(0.05)
+    return [sum(b) for b in blocks]
+
+
+@pytest.mark.parametrize("mode", ["sampling", "cprofile"])
+def test_profile_call_stores_stacks_and_allocations(tmp_path, monkeypatch, mode):
+    from app.core.config import settings
+    from app.services import profiling
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profile_sample_interval_ms", 1.0)
+
+    out = profiling.profile_call("unit test", mode, _busy, 200)
+    assert out['result'] == [499500] * 200
+    profile = out['profile']
+    assert profile['mode'] == mode and profile['memory']['peak_mb'] > 0
+    assert any("test_executor.py" in a['location'] for a in profile['memory']['top_allocations'])
+    assert [p['id'] for p in profiling.list_profiles()] == [profile['id']]
+
+    path = profiling.profile_file(profile['id'])
+    if mode == "sampling":
+        lines = open(path).read().splitlines()
+        assert profile['samples'] == sum(int(line.rsplit(" ", 1)[1]) for line in lines) > 0
+        # Rooted at the label, worker machinery above the call cut off
+        assert all(line.rsplit(" ", 1)[0].split(";")[0] == "unit_test" for line in lines)
+        assert any(line.startswith("unit_test;tests.test_executor:_busy") for line in lines)
+    else:
+        assert path.endswith(".pstats")
+        assert any("_busy" in f['function'] for f in profile['top_functions'])
+    with pytest.raises(ValueError):
+        profiling.profile_file("../secrets")
+
+
+def test_profiling_requires_token(monkeypatch):
+    from fastapi.testclient import TestClient
+    from app.core.config import settings
+    from app.main import app
+    client = TestClient(app)
+    body = {"filename": "missing.csv"}
+
+    monkeypatch.setattr(settings, "profiling_token", "")
+    assert client.post("/api/v1/market/analyze?profile=true", json=body).status_code == 403
+    monkeypatch.setattr(settings, "profiling_token", "s3cret")
+    response = client.post("/api/v1/market/validate?profile=true", json=body,
+                           headers={"X-Profile-Token": "wrong"})
+    assert response.status_code == 403
+    assert client.get("/api/v1/market/profiles").status_code == 403
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.engine.features import FeatureEngine
+from app.engine.feature_bank import compute_feature_frame, resolve_feature_set
+from app.engine.model_config import model_config
+from app.services.data_service import DataService
+from app.services.feature_service import FeatureService
+from app.engine.panel_features import build_panel_tensor
+
+
+def _ohlcv(dates, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+    return pd.DataFrame({
+        'Date': dates, 'Open': close, 'High': close * 1.01,
+        'Low': close * 0.99, 'Close': close, 'Volume': rng.integers(1_000, 2_000, len(dates)),
+    })
+
+
+def test_panel_tensor_matches_pandas_and_masks_gaps():
+    dates = pd.bdate_range("2020-01-01", periods=120)
+    a = _ohlcv(dates, 0)
+    b = _ohlcv(dates, 1).drop(index=[50, 51, 80, 81, 82, 83, 84])   # short gap + long gap
+
+    panel = build_panel_tensor({'A': a, 'B': b}, calendar="union", max_ffill=2,
+                               vol_window=20, min_coverage=0.8, benchmark='A')
+    features, mask = panel['features'], panel['mask']
+
+    assert features.shape == (2, 120, 4) and features.flags['C_CONTIGUOUS']
+    assert panel['feature_names'] == ['Log_Return', 'Volatility', 'Excess_Return', 'Relative_Volatility']
+
+    # Gap-free asset: identical to the single-frame pandas computation
+    ref_ret = np.log(a['Close']).diff()
+    ref_vol = ref_ret.rolling(20).std()
+    full = mask[0] & ref_vol.notna().to_numpy()
+    np.testing.assert_allclose(features[0, full, 0], ref_ret.to_numpy()[full], atol=1e-12)
+    np.testing.assert_allclose(features[0, full, 1], ref_vol.to_numpy()[full], atol=1e-10)
+
+    # Missing bars are masked; the bar after a bridged gap carries the 3-day return
+    assert not mask[1, [50, 51, 80, 84]].any()
+    expected = np.log(b['Close'].loc[52] / b['Close'].loc[49])
+    assert np.isclose(features[1, 52, 0], expected)
+    # Gap longer than max_ffill: no return across it
+    assert not mask[1, 85]
+    assert np.all(features[~mask] == 0.0)
+
+
+def test_feature_bank_matches_pandas_rolling():
+    df = FeatureEngine.load_ohlc(_ohlcv(pd.bdate_range("2020-01-01", periods=200), 3))
+    df['High'] = df[['Open', 'Close']].max(axis=1) * 1.004
+    df['Low'] = df[['Open', 'Close']].min(axis=1) * 0.996
+    names = ['Log_Return', 'Realized_Vol_5', 'Realized_Vol_30', 'Parkinson_Vol_10',
+             'Garman_Klass_Vol_10', 'Volume_Z_20', 'Drawdown_15']
+    out = compute_feature_frame(df, names)
+
+    r = np.log(df['Close']).diff()
+    hl = np.log(df['High'] / df['Low']) ** 2
+    co = np.log(df['Close'] / df['Open']) ** 2
+    lv = np.log(df['Volume'])
+    expected = {
+        'Realized_Vol_5': r.rolling(5).std(),
+        'Realized_Vol_30': r.rolling(30).std(),
+        'Volatility': r.rolling(60).std(),
+        'Parkinson_Vol_10': np.sqrt((hl / (4 * np.log(2))).rolling(10).mean()),
+        'Garman_Klass_Vol_10': np.sqrt((0.5 * hl - (2 * np.log(2) - 1) * co).rolling(10).mean()),
+        'Volume_Z_20': (lv - lv.rolling(20).mean()) / lv.rolling(20).std(),
+        'Drawdown_15': df['Close'] / df['Close'].rolling(15).max() - 1,
+    }
+    assert len(out) == 200 - 60     # longest warm-up: Volatility (60 bars incl. first diff)
+    for name, ref in expected.items():
+        np.testing.assert_allclose(out[name], ref.loc[out.index], rtol=1e-7, atol=1e-10, err_msg=name)
+
+
+def test_feature_set_resolution():
+    assert resolve_feature_set("range") == ['Log_Return', 'Parkinson_Vol_20', 'Garman_Klass_Vol_20']
+    assert resolve_feature_set(None) == ['Log_Return', 'Volatility']
+    for bad in ("nope", ["Realized_Vol"], ["Realized_Vol_x"], ["Log_Return", "Log_Return"]):
+        with pytest.raises(ValueError):
+            resolve_feature_set(bad)
+
+
+def test_streaming_ingestion_matches_full_read(tmp_path, monkeypatch):
+    _ohlcv(pd.bdate_range("2015-01-01", periods=1500), 5).to_csv(tmp_path / "TEST_x.csv", index=False)
+    data_service = DataService(str(tmp_path))
+    monkeypatch.setattr(model_config, "STREAM_CHUNK_ROWS", 37)     # many chunk boundaries
+
+    full = data_service.load_dataset("TEST_x.csv")
+    pd.testing.assert_frame_equal(data_service.load_dataset_tail("TEST_x.csv", 400),
+                                  full.tail(400).reset_index(drop=True))
+
+    reference = FeatureEngine.prepare_features(FeatureEngine.load_ohlc(full), vol_window=20)
+    service = FeatureService(data_service)
+
+    tail = service.stream_features("TEST_x.csv", tail_rows=300, vol_window=20)
+    pd.testing.assert_frame_equal(tail, reference.tail(300), check_exact=False, rtol=1e-8)
+
+    window = service.stream_features("TEST_x.csv", start_date="2017-03-01", end_date="2018-06-30", vol_window=20)
+    expected = reference.loc["2017-03-01":"2018-06-30"]
+    pd.testing.assert_frame_equal(window, expected, check_exact=False, rtol=1e-8)
+
+
+def test_pipelines_stream_only_the_window_they_use(tmp_path, monkeypatch):
+    from app.core.config import settings
+    from app.engine.features import HMMPreprocessor
+    from app.services.pipeline_service import PipelineService
+
+    _ohlcv(pd.bdate_range("2015-01-01", periods=1500), 6).to_csv(tmp_path / "TEST_x.csv", index=False)
+    monkeypatch.setattr(settings, "data_dir", str(tmp_path))
+    monkeypatch.setattr(model_config, "STREAM_CHUNK_ROWS", 200)
+    monkeypatch.setattr(model_config, "WALK_FORWARD_MAX_ROWS", 700)
+    service = PipelineService()
+    reference = HMMPreprocessor.csv_to_features(service.data_service.load_dataset("TEST_x.csv"))
+
+    def full_read(filename):
+        raise AssertionError(f"{filename} was read in full")
+
+    monkeypatch.setattr(service.data_service, "load_dataset", full_read)
+    streamed = service._streamed_features("TEST_x.csv", 700)
+    pd.testing.assert_frame_equal(streamed['df'], reference['df'].tail(700), check_exact=False, rtol=1e-8)
+
+    summary = service.run_walk_forward("TEST_x.csv")
+    assert summary['n_folds'] == (700 - 500) // 60
@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 import pytest
 from app.engine.hmm_model import RegimeDetector 
 
@@ -41,4 +42,318 @@ def test_hmm_parameter_counting():
     detector.model.n_features = 1
     n_params = detector._count_parameters()
     
-    assert n_params == 7
\ No newline at end of file
+    assert n_params == 7
+
+def test_online_em_tracks_full_refit():
+    rng = np.random.default_rng(7)
+    X = np.concatenate([rng.normal(-1, 0.3, (200, 1)), rng.normal(1, 0.3, (200, 1))])
+    new_bars = np.concatenate([rng.normal(-1, 0.3, (15, 1)), rng.normal(1, 0.3, (15, 1))])
+
+    detector = RegimeDetector(n_states=2, random_state=42)
+    detector.fit(X, verbose=False)
+    online = detector.enable_online_updates(X, refit_every=1000)
+
+    probs = detector.partial_fit(new_bars)
+
+    assert probs.shape == (30, 2)
+    np.testing.assert_allclose(probs.sum(axis=1), 1.0)
+    np.testing.assert_allclose(detector.model.transmat_.sum(axis=1), 1.0)
+    drift = online.drift_against_refit()
+    assert drift['max_mean_diff'] < 0.2
+
+    # The retained history is the most recent max_history bars, in order
+    from app.engine.online_em import OnlineEM
+    small = OnlineEM(detector, X[:50], refit_every=1000, max_history=40)
+    np.testing.assert_array_equal(small.history, X[10:50])
+    small.update_many(new_bars)
+    np.testing.assert_array_equal(small.history, np.concatenate([X[40:50], new_bars]))
+
+
+def test_refit_policy_reuses_model_without_drift():
+    from app.engine.refit_policy import RefitPolicy
+
+    rng = np.random.default_rng(3)
+    X = np.concatenate([rng.normal(-1, 0.3, (300, 2)), rng.normal(1, 0.3, (300, 2))])
+    detector = RegimeDetector(n_states=2, random_state=42)
+    detector.fit(X, verbose=False)
+    train_ll = detector.training_stats['log_likelihood'] / len(X)
+    policy = RefitPolicy(max_stale_bars=1000)
+
+    same = np.vstack([X, rng.normal(1, 0.3, (20, 2))])
+    shifted = np.vstack([X, rng.normal(6, 0.3, (20, 2))])
+
+    assert not policy.evaluate(detector, same, 20, train_ll)['refit']
+    decision = policy.evaluate(detector, shifted, 20, train_ll)
+    assert decision['refit']
+    assert len(decision['reasons']) == 3
+    assert len(policy.audit_log) == 2
+
+    # A reused model is reported as such and requests never alter the cached detector
+    from app.services.pipeline_service import PipelineService
+    detector.training_stats['reused'] = False
+    cached = {'detector': detector, 'fitted_at': "2026-01-02T00:00:00+00:00"}
+    view = PipelineService._reused_detector(cached)
+    view.regime_mapping[0] = "Changed"
+    assert view.training_stats['reused'] and view.training_stats['fitted_at'] == cached['fitted_at']
+    assert detector.training_stats['reused'] is False and detector.regime_mapping.get(0) != "Changed"
+    assert view.model is detector.model
+
+
+
+def test_cached_model_requires_unchanged_training_bars():
+    from app.services.pipeline_service import PipelineService
+
+    index = pd.date_range("2024-01-01", periods=10, freq="D")
+    values = np.arange(20, dtype=np.float64).reshape(10, 2)
+    cached = {'content_hash': "a", 'last_date': index[-1], 'train_index': index, 'train_values': values}
+    grown_index = pd.date_range("2024-01-03", periods=10, freq="D")
+    grown = np.vstack([values[2:], [[50.0, 51.0], [52.0, 53.0]]])
+
+    assert PipelineService._trained_on(cached, "a", index, values)
+    # Same window of a file that only gained new bars
+    assert PipelineService._trained_on(cached, "b", grown_index, grown)
+    edited = grown.copy()
+    edited[3, 0] = -1.0
+    assert not PipelineService._trained_on(cached, "b", grown_index, edited)
+    assert not PipelineService._trained_on(cached, "b", index + pd.Timedelta(days=30), values)
+
+def test_fit_stops_at_deadline_and_records_trace():
+    rng = np.random.default_rng(11)
+    X = rng.normal(0, 1, (2000, 2))
+
+    detector = RegimeDetector(n_states=3, random_state=42)
+    detector.fit(X, verbose=False, time_budget=0.0)
+    stats = detector.training_stats
+
+    assert stats['timed_out']
+    assert not stats['converged']
+    assert stats['n_iter'] == 1
+    assert len(stats['log_likelihood_trace']) == stats['n_iter']
+
+    unbounded = RegimeDetector(n_states=3, random_state=42).fit(X, verbose=False)
+    assert not unbounded.training_stats['timed_out']
+    assert len(unbounded.training_stats['log_likelihood_trace']) == unbounded.training_stats['n_iter']
+
+
+def test_custom_initializers_seed_em():
+    from app.engine.initialization import quantile_init, sticky_transmat
+
+    rng = np.random.default_rng(5)
+    X = np.concatenate([rng.normal(-2, 0.5, (150, 2)), rng.normal(2, 0.5, (150, 2))])
+
+    params = quantile_init(X, 2)
+    assert params['means'][0, 0] < params['means'][1, 0]
+    np.testing.assert_allclose(sticky_transmat(3, 0.9).sum(axis=1), 1.0)
+
+    for method in ("kmeans++_subsample", "quantile"):
+        detector = RegimeDetector(n_states=2, random_state=42, init_method=method)
+        detector.fit(X, verbose=False)
+        assert detector.training_stats['converged']
+        assert sorted(np.round(detector.model.means_[:, 0])) == [-2, 2]
+
+
+def test_staged_fit_reports_stages():
+    rng = np.random.default_rng(9)
+    X = np.concatenate([rng.normal(-1, 0.4, (300, 2)), rng.normal(1, 0.4, (300, 2))])
+
+    staged = RegimeDetector(n_states=2, random_state=42, fit_mode="staged").fit(X, verbose=False)
+    direct = RegimeDetector(n_states=2, random_state=42, fit_mode="direct").fit(X, verbose=False)
+
+    stages = staged.training_stats['stages']
+    assert [st['stage'] for st in stages[:2]] == ['diag_prefit', 'full_refine']
+    assert stages[0]['n_samples'] < stages[1]['n_samples']
+    assert staged.training_stats['n_iter'] == sum(st['n_iter'] for st in stages)
+    assert staged.training_stats['log_likelihood'] >= direct.training_stats['log_likelihood'] - 1.0
+
+
+def test_pooled_fit_respects_sequence_boundaries():
+    rng = np.random.default_rng(4)
+    seqs = [rng.normal(-1, 0.5, (200, 2)), rng.normal(1, 0.5, (150, 2)), rng.normal(0, 0.5, (180, 2))]
+    X = np.vstack(seqs)
+    lengths = [len(s) for s in seqs]
+
+    detector = RegimeDetector(n_states=3, random_state=42).fit(X, verbose=False, lengths=lengths)
+
+    per_sequence = sum(detector.model.score(s) for s in seqs)
+    assert np.isclose(detector.score(X, lengths=lengths), per_sequence)
+    assert np.isclose(detector.training_stats['log_likelihood'], per_sequence)
+
+
+def test_rolling_regime_stats_match_per_window_slices():
+    from app.engine.rolling_regimes import rolling_regime_stats
+
+    rng = np.random.default_rng(5)
+    K, T, window, step = 3, 400, 50, 7
+    states = np.repeat(rng.integers(0, K, 40), rng.integers(1, 20, 40))[:T]
+    returns = rng.normal(0, 0.01, len(states))
+    returns[:3] = np.nan
+    stats = rolling_regime_stats(states, K, window, step=step, returns=returns)
+
+    assert stats['ends'][-1] == len(states) - 1
+    for n, end in enumerate(stats['ends']):
+        s, r = states[end - window + 1:end + 1], returns[end - window + 1:end + 1]
+        counts = np.zeros((K, K))
+        np.add.at(counts, (s[:-1], s[1:]), 1)
+        np.testing.assert_allclose(stats['occupancy'][n], np.bincount(s, minlength=K) / window)
+        np.testing.assert_array_equal(stats['transition_counts'][n], counts)
+        assert stats['switches'][n] == np.sum(np.diff(s) != 0)
+        for k in range(K):
+            sub = r[(s == k) & np.isfinite(r)]
+            expected_mean = sub.mean() if len(sub) else np.nan
+            expected_std = sub.std(ddof=1) if len(sub) > 1 else np.nan
+            np.testing.assert_allclose(stats['mean_return'][n, k], expected_mean, atol=1e-12)
+            np.testing.assert_allclose(stats['std_return'][n, k], expected_std, atol=1e-10)
+
+
+def test_signature_index_matches_brute_force_and_updates_in_place():
+    from app.engine.signature_index import SignatureIndex, regime_signature
+
+    rng = np.random.default_rng(11)
+    K, F = 3, 2
+
+    def random_signature():
+        probs = rng.dirichlet(np.ones(K))
+        means = rng.normal(size=(K, F))
+        A = rng.normal(size=(K, F, F))
+        covs = A @ A.transpose(0, 2, 1) + np.eye(F)
+        transmat = rng.dirichlet(np.ones(K) * 5, size=K)
+        mean_returns = means[:, 0]
+        return probs, means, covs, transmat, mean_returns
+
+    # Relabelling the states of a model does not change its signature
+    probs, means, covs, transmat, mr = random_signature()
+    perm = np.array([2, 0, 1])
+    np.testing.assert_allclose(
+        regime_signature(probs, means, covs, transmat, mr),
+        regime_signature(probs[perm], means[perm], covs[perm], transmat[np.ix_(perm, perm)], mr[perm]),
+    )
+
+    index = SignatureIndex(initial_capacity=4)      # forces growth
+    layout = (K, ("Log_Return", "Volatility"))
+    vectors = {f"T{i}": regime_signature(*random_signature()) for i in range(50)}
+    for key, vector in vectors.items():
+        index.upsert(key, layout, vector, {'i': key})
+    index.remove("T7")
+    index.upsert("T3", layout, vectors["T9"] + 1e-6, {'i': "T3"})   # refreshed model, updated in place
+    vectors.pop("T7")
+    vectors["T3"] = vectors["T9"] + 1e-6
+
+    keys = sorted(k for k in vectors if k != "T9")
+    brute = sorted(keys, key=lambda k: np.linalg.norm(vectors[k] - vectors["T9"]))[:5]
+    found = index.query_key("T9", k=5)
+    assert [key for key, _, _ in found] == brute
+    assert found[0][0] == "T3" and found[0][2] == {'i': "T3"}
+    assert len(index) == 49
+    assert index.query(vectors["T9"], (2, ("Log_Return",))) == []
+
+
+def test_breadth_running_totals_match_full_aggregation():
+    from app.engine.breadth import RegimeBreadth
+
+    breadth = RegimeBreadth(initial_capacity=2)
+    breadth.update("AAPL", {'Bear': 0.1, 'Sideways': 0.2, 'Bull': 0.7}, {'Bear': 0.2, 'Sideways': 0.2, 'Bull': 0.6})
+    breadth.update("NVDA", {'Bear': 0.8, 'Bull': 0.2}, {'Bear': 0.7, 'Bull': 0.3})
+    breadth.update("XOM", {'Bear': 0.3, 'Sideways': 0.6, 'Bull': 0.1}, {'Bear': 0.3, 'Sideways': 0.5, 'Bull': 0.2})
+    breadth.update("AAPL", {'Bear': 0.6, 'Sideways': 0.3, 'Bull': 0.1}, {'Bear': 0.5, 'Sideways': 0.3, 'Bull': 0.2})
+
+    fast = breadth.aggregate()
+    full = breadth.aggregate(weights={'AAPL': 1, 'NVDA': 1, 'XOM': 1})
+    assert fast['n_tickers'] == full['n_tickers'] == 3
+    for key in ('current', 'next', 'dominant'):
+        assert fast[key] == pytest.approx(full[key])
+    assert fast['current']['Bear'] == pytest.approx((0.6 + 0.8 + 0.3) / 3)
+    assert fast['dominant'] == pytest.approx({'Bear': 2 / 3, 'Sideways': 1 / 3, 'Bull': 0.0})
+
+    grouped = breadth.aggregate(weights={'AAPL': 3, 'NVDA': 1, 'XOM': 1},
+                                groups={'AAPL': "Tech", 'NVDA': "Tech", 'XOM': "Energy"})
+    assert grouped['groups']['Tech']['current']['Bear'] == pytest.approx((3 * 0.6 + 0.8) / 4)
+    assert grouped['groups']['Energy']['current']['Sideways'] == pytest.approx(0.6)
+    assert breadth.aggregate(tickers=["XOM"])['net_breadth'] == pytest.approx(0.1 - 0.3)
+
+
+def test_block_bootstrap_intervals_cover_base_fit():
+    from concurrent.futures import ThreadPoolExecutor
+    from app.engine.bootstrap import bootstrap_confidence_intervals, stationary_block_indices
+
+    rng = np.random.default_rng(3)
+    indices, lengths = stationary_block_indices(100, 10, rng)
+    assert len(indices) == 100 and lengths.sum() == 100 and lengths.min() >= 1
+    starts = np.cumsum(lengths) - lengths
+    for s, n in zip(starts, lengths):
+        # Consecutive bars (mod T) inside every block
+        assert np.all(np.diff(indices[s:s + n]) % 100 == 1)
+
+    states = np.repeat(np.tile([0, 1], 10), 30)
+    X = np.column_stack([np.where(states == 0, -1.0, 1.0), np.where(states == 0, 0.5, -0.5)])
+    X = X + rng.normal(0, 0.3, X.shape)
+    detector = RegimeDetector(n_states=2, random_state=0)
+    detector.fit(X, verbose=False)
+    base = detector.get_model_params()
+
+    class CountingPool(ThreadPoolExecutor):
+        in_flight = peak = 0
+
+        def submit(self, fn, *args):
+            CountingPool.in_flight += 1
+            CountingPool.peak = max(CountingPool.peak, CountingPool.in_flight)
+            future = super().submit(fn, *args)
+            future.add_done_callback(lambda f: setattr(CountingPool, "in_flight", CountingPool.in_flight - 1))
+            return future
+
+    with CountingPool(2) as pool:
+        result = bootstrap_confidence_intervals(X, base, n_replicates=12, mean_block=40,
+                                                confidence=0.9, executor=pool, max_in_flight=3,
+                                                feature_scale=(np.array([1.0, 0.0]), np.array([2.0, 1.0])))
+    assert result['n_completed'] == 12 and not result['timed_out']
+    # Replicates are fed to the pool in a bounded window, not all up front
+    assert CountingPool.peak <= 3
+    for key in ('transition_matrix', 'expected_duration', 'means'):
+        ci = result[key]
+        assert np.all(ci['lower'] <= ci['upper'])
+    # Labels stay aligned with the base fit: well-separated means, tight intervals
+    means = result['means']
+    np.testing.assert_allclose(means['estimate'], base['means'] * [2.0, 1.0] + [1.0, 0.0])
+    assert np.all(np.abs(means['upper'] - means['lower']) < 0.5)
+    assert np.all(result['transition_matrix']['lower'].diagonal() > 0.8)
+
+    # An exhausted budget returns what finished, never more than requested
+    quick = bootstrap_confidence_intervals(X, base, n_replicates=500, mean_block=40, time_budget=0.3)
+    assert quick['timed_out'] and 0 < quick['n_completed'] < 500
+
+    from pydantic import ValidationError
+    from app.schemas.request import BootstrapRequest
+    for bad in ({'n_replicates': 0}, {'n_replicates': 10 ** 8}, {'confidence': 1.0}, {'mean_block': -5}):
+        with pytest.raises(ValidationError):
+            BootstrapRequest(filename="X.csv", **bad)
+
+
+def test_regime_meaning_and_persistence_for_many_states():
+    import itertools
+    import pandas as pd
+
+    rng = np.random.default_rng(11)
+    K = 12
+    states = np.repeat(rng.integers(0, K - 1, 200), rng.integers(1, 12, 200))   # state K-1 never occurs
+    df = pd.DataFrame({'Log_Return': rng.normal(0, 0.01, len(states)),
+                       'Volatility': rng.uniform(0.005, 0.03, len(states))})
+    df.iloc[:4, 0] = np.nan
+    detector = RegimeDetector(n_states=K)
+    stats = detector.assign_regime_meaning(df, states)
+
+    for state, group in df.groupby(states):
+        assert stats[state]['count'] == len(group)
+        np.testing.assert_allclose(
+            [stats[state][k] for k in ('mean_return', 'std_return', 'mean_volatility', 'std_volatility')],
+            [group.Log_Return.mean(), group.Log_Return.std(), group.Volatility.mean(), group.Volatility.std()],
+            rtol=1e-9)
+    assert stats[K - 1]['count'] == 0
+    ranked = sorted(range(K), key=lambda s: stats[s]['mean_return'])
+    assert [detector.regime_mapping[s] for s in ranked] == [f"Regime_{i}" for i in range(K)]
+
+    persistence = detector.validate_persistence(states)
+    runs = [len(list(g)) for _, g in itertools.groupby(states)]
+    assert persistence['total_switches'] == len(runs) - 1
+    assert persistence['max_duration'] == max(runs)
+    by_regime = persistence['duration_by_regime']
+    assert sum(v['count'] for v in by_regime.values()) == len(runs)
+    assert f"Regime_{ranked.index(K - 1)}" not in by_regime
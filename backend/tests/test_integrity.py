@@ -3,12 +3,14 @@ from app.main import app
 
 client = TestClient(app)
 
+
 def test_root_endpoint():
     """Kiểm tra server có thực sự 'UP' như bro viết không"""
     response = client.get("/")
     assert response.status_code == 200
     assert response.json() == {"message": "Server is UP"}
 
+
 def test_prediction_endpoint_exists():
     # Thử gọi vào root của market router xem nó có nhận không
     response = client.get("/api/v1/market/?ticker=AAPL") 
@@ -17,4 +19,33 @@ def test_prediction_endpoint_exists():
     if response.status_code == 404:
         response = client.get("/api/v1/market?ticker=AAPL")
 
-    assert response.status_code != 404
\ No newline at end of file
+    assert response.status_code != 404
+
+
+def test_app_import_defers_heavy_dependencies():
+    """Services are built on first use, so importing the app loads no ML/data stack"""
+    import subprocess, sys
+    code = ("import sys, app.main; "
+            "print(','.join(m for m in ('pandas', 'sklearn', 'hmmlearn', 'yfinance') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""
+
+
+def test_refit_decisions_reach_refit_log(monkeypatch):
+    """Decisions returned by pipeline workers are recorded and served by /refit-log"""
+    import asyncio
+    from app.api.v1.endpoints import market
+
+    class StubExecutor:
+        async def run(self, fn, *args, **kwargs):
+            return {'filename': 'X.csv', 'refit_decision': {'ticker': 'X', 'action': 'reuse'}}
+
+    monkeypatch.setattr(market, "get_pipeline_executor", lambda: StubExecutor())
+    monkeypatch.setattr(market, "_index_analysis", lambda result: None)
+    monkeypatch.setattr(market, "refit_decisions", market.deque(maxlen=500))
+    result = asyncio.run(market._run_analysis("refit-log-test", "X.csv", None, None))  # pyright: ignore[reportArgumentType]
+    assert market.analysis_cache.get("refit-log-test") is result
+
+    response = client.get("/api/v1/market/refit-log")
+    assert response.status_code == 200
+    assert response.json()["decisions"] == [{'ticker': 'X', 'action': 'reuse'}]